@@ -59,9 +59,49 @@ CREATE TRIGGER update_products_modtime
     FOR EACH ROW
     EXECUTE FUNCTION update_modified_column();
 
+-- Bookkeeping table for incremental Elasticsearch -> PostgreSQL syncs
+-- (transfer_from_elasticsearch with incremental=true; the MCP server also creates it on demand)
+CREATE TABLE IF NOT EXISTS etl_checkpoints (
+    source_index TEXT NOT NULL,
+    target_table TEXT NOT NULL,
+    checkpoint_field TEXT NOT NULL,
+    high_water_mark JSONB, -- sort values of the last committed document
+    documents_synced BIGINT NOT NULL DEFAULT 0,
+    status TEXT NOT NULL, -- 'running' until a run completes
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source_index, target_table)
+);
+
+-- Indexes and triggers set aside by an index-deferred bulk load (defer_indexes=true);
+-- rows left here after a crash are rebuilt by the next deferred load of the same table
+CREATE TABLE IF NOT EXISTS etl_deferred_objects (
+    target_table TEXT NOT NULL,
+    kind TEXT NOT NULL, -- 'index' or 'trigger'
+    name TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    deferred_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (target_table, kind, name)
+);
+
+-- Rows bulk_insert could not load (validation rejects and rows PostgreSQL refused), with the error
+CREATE TABLE IF NOT EXISTS etl_dead_letters (
+    id BIGSERIAL PRIMARY KEY,
+    load_id TEXT NOT NULL,
+    target_table TEXT NOT NULL,
+    stage TEXT NOT NULL, -- 'validation' or 'load'
+    error TEXT NOT NULL,
+    sqlstate TEXT,
+    row_data JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS etl_dead_letters_load_idx ON etl_dead_letters (target_table, load_id);
+
 -- Grant necessary permissions (adjust as needed)
 GRANT ALL PRIVILEGES ON TABLE products TO admin;
 GRANT SELECT ON product_stats TO admin;
+GRANT ALL PRIVILEGES ON TABLE etl_checkpoints TO admin;
+GRANT ALL PRIVILEGES ON TABLE etl_deferred_objects TO admin;
+GRANT ALL PRIVILEGES ON TABLE etl_dead_letters TO admin;
 
 -- Insert a sample record to verify table creation
 INSERT INTO products (
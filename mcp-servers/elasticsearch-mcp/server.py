@@ -4,33 +4,333 @@ Elasticsearch MCP Server
 Provides tools for interacting with Elasticsearch through the Model Context Protocol
 """
 
+import asyncio
+import base64
+import functools
+import inspect
 import json
 import os
-import sys
+import time
 from typing import Any, Sequence
-from datetime import datetime
 
-from elasticsearch import Elasticsearch
 from mcp.server import Server
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 from mcp.server.stdio import stdio_server
 
+from cache import TTLCache
+from encoding import DEFAULT_FORMAT, FORMAT_PROPERTY, FORMATS, dumps, encode, response_format
+from metrics import MetricsExporter, ToolMetrics, record_error, serializer, tool_phase
+
+# Serializing a tool's response is booked to the calling tool's "serialize" phase
+encode = serializer(encode)
+
+
+class TimedClient:
+    """Proxy for AsyncElasticsearch that books every request to the current tool call's query phase."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def options(self, **kwargs):
+        return TimedClient(self._client.options(**kwargs))
+
+    @property
+    def indices(self):
+        return TimedClient(self._client.indices)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        # The client's API methods are plain functions returning coroutines, so judge by the result
+        @functools.wraps(attribute)
+        def timed(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            return _timed_query(result) if inspect.isawaitable(result) else result
+        return timed
+
+
+async def _timed_query(awaitable):
+    with tool_phase("query"):
+        return await awaitable
+
+
+class LazyClient:
+    """Stands in for a client until its first use, so startup never imports or builds it."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+
+
 # Initialize Elasticsearch client
 ES_URL = os.getenv("ELASTICSEARCH_URL", "http://elasticsearch:9200")
-# ES 8.x Python client handles compatibility mode automatically by default
-es_client = Elasticsearch([ES_URL])
+# Per-request timeouts in seconds; exports get a longer budget than interactive calls
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", "30"))
+ES_EXPORT_TIMEOUT = float(os.getenv("ES_EXPORT_TIMEOUT", "120"))
+
+
+def create_es_client():
+    """Build the shared AsyncElasticsearch client.
+
+    ES 8.x Python client handles compatibility mode automatically by default.
+    One shared async client keeps a pool of HTTP connections open so concurrent
+    tool calls overlap their network waits instead of blocking the event loop.
+    The elasticsearch package is imported here rather than at module level:
+    it is the slowest import of the server, and initialize / tools/list never
+    need it.
+    """
+    from elasticsearch import AsyncElasticsearch
+
+    return AsyncElasticsearch(
+        [ES_URL],
+        connections_per_node=int(os.getenv("ES_CONNECTIONS_PER_NODE", "16")),
+        request_timeout=ES_REQUEST_TIMEOUT,
+        max_retries=int(os.getenv("ES_MAX_RETRIES", "3")),
+        retry_on_timeout=True,
+        http_compress=os.getenv("ES_HTTP_COMPRESS", "false").lower() == "true"
+    )
+
+
+# Created on the first tool call that talks to Elasticsearch
+es_client = TimedClient(LazyClient(create_es_client))
+
+# Hard cap on serialized documents returned by a single bulk_export call
+EXPORT_MAX_BYTES = int(os.getenv("ES_EXPORT_MAX_BYTES", "1000000"))
+
+# Metadata cache: entries live METADATA_CACHE_TTL seconds, LRU-evicted beyond METADATA_CACHE_SIZE
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "300"))
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "256"))
+
+# Prometheus metrics export: textfile path and/or local /metrics port (both off by default)
+METRICS_FILE = os.getenv("MCP_METRICS_FILE") or None
+METRICS_PORT = int(os.getenv("MCP_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("MCP_METRICS_HOST", "127.0.0.1")
+METRICS_INTERVAL = float(os.getenv("MCP_METRICS_INTERVAL", "15"))
 
 # Initialize MCP server
 app = Server("elasticsearch-mcp")
 
+# Per-tool call counts, latency, phase timings, rows and bytes
+tool_metrics = ToolMetrics("elasticsearch-mcp")
+
+# Serialized get_mapping / list_indices responses, keyed by (tool, index, response format)
+metadata_cache = TTLCache(maxsize=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL)
+
+
+def metadata_key(name: str, index: str | None, arguments: Any) -> tuple:
+    """Cache key for a get_mapping / list_indices response."""
+    return (name, index, (arguments or {}).get("format") or DEFAULT_FORMAT)
+
+
+def invalidate_metadata(name: str, index: str | None) -> None:
+    """Drop a cached metadata response in every format."""
+    metadata_cache.invalidate(*[(name, index, fmt) for fmt in FORMATS])
+
+
+# Field projection arguments shared by search_documents and bulk_export
+PROJECTION_PROPERTIES = {
+    "source_includes": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Only return these _source fields (wildcards allowed), e.g. ['id', 'price']"
+    },
+    "source_excludes": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Drop these _source fields (wildcards allowed), e.g. ['description']"
+    },
+    "include_source": {
+        "type": "boolean",
+        "description": "Set to false to skip _source entirely and return only docvalue/stored fields (default: true)",
+        "default": True
+    },
+    "docvalue_fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Read these fields from doc values (keyword, numeric and date fields) instead of _source"
+    },
+    "stored_fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Return these stored fields"
+    }
+}
+
+
+def projection_kwargs(arguments: Any) -> dict:
+    """Translate projection arguments into search() keyword arguments."""
+    kwargs = {}
+    includes = arguments.get("source_includes") or []
+    excludes = arguments.get("source_excludes") or []
+    if arguments.get("include_source", True) is False:
+        kwargs["source"] = False
+    elif includes or excludes:
+        kwargs["source"] = {"includes": includes, "excludes": excludes}
+    elif arguments.get("stored_fields"):
+        # Asking for stored fields turns _source off unless it is requested explicitly
+        kwargs["source"] = True
+    if arguments.get("docvalue_fields"):
+        kwargs["docvalue_fields"] = arguments["docvalue_fields"]
+    if arguments.get("stored_fields"):
+        kwargs["stored_fields"] = arguments["stored_fields"]
+    return kwargs
+
+
+def hit_document(hit: dict) -> dict:
+    """Build the returned document from a hit's (filtered) _source plus any docvalue/stored fields.
+
+    Elasticsearch returns those fields as arrays; single values are unwrapped,
+    and a field already present in _source keeps its _source value.
+    """
+    document = dict(hit.get("_source") or {})
+    for field, values in hit.get("fields", {}).items():
+        document.setdefault(field, values[0] if len(values) == 1 else values)
+    return document
+
+
+def mget_kwargs(arguments: Any) -> dict:
+    """Projection keyword arguments for mget(), which filters _source with query parameters."""
+    kwargs = {}
+    if arguments.get("include_source", True) is False:
+        kwargs["source"] = False
+    elif arguments.get("stored_fields") and not (arguments.get("source_includes") or arguments.get("source_excludes")):
+        kwargs["source"] = True
+    if arguments.get("source_includes"):
+        kwargs["source_includes"] = arguments["source_includes"]
+    if arguments.get("source_excludes"):
+        kwargs["source_excludes"] = arguments["source_excludes"]
+    if arguments.get("stored_fields"):
+        kwargs["stored_fields"] = arguments["stored_fields"]
+    return kwargs
+
+
+def search_body(search: dict) -> dict:
+    """Build one _msearch request body from search_documents-style arguments."""
+    body = {
+        "query": search.get("query", {"match_all": {}}),
+        "size": search.get("size", 10),
+        "from": search.get("from_", 0)
+    }
+    for key, value in projection_kwargs(search).items():
+        body["_source" if key == "source" else key] = value
+    return body
+
+
+def item_error(error: Any) -> str:
+    """Render the error of one _mget/_msearch item."""
+    if isinstance(error, dict):
+        return f"{error.get('type', 'error')}: {error.get('reason', '')}"
+    return str(error)
+
+
+AGGREGATION_TYPES = ["terms", "stats", "histogram", "composite"]
+
+
+def build_aggregation(arguments: Any) -> dict:
+    """Build the aggregation body for the aggregate tool."""
+    kind = arguments["type"]
+    if kind not in AGGREGATION_TYPES:
+        raise ValueError(f"Unknown aggregation type '{kind}'; expected one of {AGGREGATION_TYPES}")
+    field = arguments.get("field")
+    fields = arguments.get("fields") or ([field] if field else [])
+    if not fields:
+        raise ValueError(f"A {kind} aggregation needs a field")
+    
+    if kind == "stats":
+        return {"stats": {"field": fields[0]}}
+    if kind == "terms":
+        aggregation = {"terms": {"field": fields[0], "size": arguments.get("size", 10)}}
+    elif kind == "histogram":
+        if not arguments.get("interval"):
+            raise ValueError("A histogram aggregation needs an interval")
+        aggregation = {"histogram": {
+            "field": fields[0],
+            "interval": arguments["interval"],
+            "min_doc_count": arguments.get("min_doc_count", 0)
+        }}
+    else:
+        aggregation = {"composite": {
+            "sources": [{name: {"terms": {"field": name}}} for name in fields],
+            "size": arguments.get("size", 100)
+        }}
+        if arguments.get("after"):
+            aggregation["composite"]["after"] = arguments["after"]
+    
+    # Per-bucket stats for each metric field
+    metrics = arguments.get("metrics") or []
+    if metrics:
+        aggregation["aggs"] = {metric: {"stats": {"field": metric}} for metric in metrics}
+    return aggregation
+
+
+def bucket_summary(bucket: dict, metrics: list) -> dict:
+    """Reduce one aggregation bucket to its key, document count and metric stats."""
+    summary = {"key": bucket["key"], "doc_count": bucket["doc_count"]}
+    if "key_as_string" in bucket:
+        summary["key_as_string"] = bucket["key_as_string"]
+    if metrics:
+        summary["metrics"] = {metric: bucket[metric] for metric in metrics}
+    return summary
+
+
+def encode_cursor(state: dict) -> str:
+    """Pack export state into an opaque continuation token."""
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(token: str) -> dict:
+    """Unpack a continuation token produced by encode_cursor."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError as e:
+        raise ValueError(f"Invalid export cursor: {e}") from e
+
+
+async def fetch_slice_page(state: dict, slice_state: dict, batch_size: int, keep_alive: str,
+                           limit: asyncio.Semaphore) -> tuple[dict, float]:
+    """Fetch the next page of one export slice; returns the response and its wall time."""
+    search_kwargs = {
+        "pit": {"id": state["pit_id"], "keep_alive": keep_alive},
+        "query": state["query"],
+        "size": batch_size,
+        "sort": [{"_shard_doc": "asc"}],
+        "track_total_hits": state["total"] is None,
+        **state.get("projection", {})
+    }
+    if state["slice_count"] > 1:
+        search_kwargs["slice"] = {"id": slice_state["id"], "max": state["slice_count"]}
+    if slice_state["search_after"] is not None:
+        search_kwargs["search_after"] = slice_state["search_after"]
+    
+    async with limit:
+        started = time.perf_counter()
+        result = await es_client.options(request_timeout=ES_EXPORT_TIMEOUT).search(**search_kwargs)
+        return result, time.perf_counter() - started
+
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """List available Elasticsearch tools."""
-    return [
+    tools = [
         Tool(
             name="search_documents",
-            description="Search documents in Elasticsearch using query DSL. Returns matching documents.",
+            description="Search documents in Elasticsearch using query DSL. Returns matching documents; use source_includes/source_excludes or docvalue_fields to return only the fields you need.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -51,7 +351,8 @@ async def list_tools() -> list[Tool]:
                         "type": "integer",
                         "description": "Starting offset for pagination (default: 0)",
                         "default": 0
-                    }
+                    },
+                    **PROJECTION_PROPERTIES
                 },
                 "required": ["index"]
             }
@@ -74,12 +375,76 @@ async def list_tools() -> list[Tool]:
                 "required": ["index", "doc_id"]
             }
         ),
+        Tool(
+            name="multi_get",
+            description="Retrieve many documents by ID in one request (_mget). Results come back in request order; missing documents and per-item errors are reported without failing the call.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "string",
+                        "description": "Default index for the requested documents"
+                    },
+                    "ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Document IDs to fetch from the default index"
+                    },
+                    "docs": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "index": {"type": "string"},
+                                "id": {"type": "string"}
+                            },
+                            "required": ["id"]
+                        },
+                        "description": "Documents to fetch, each {index, id}; index defaults to the top-level index"
+                    },
+                    **{key: value for key, value in PROJECTION_PROPERTIES.items() if key != "docvalue_fields"}
+                }
+            }
+        ),
+        Tool(
+            name="multi_search",
+            description="Run many searches in one request (_msearch). Results come back in request order; a failing search reports its error without failing the others.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "string",
+                        "description": "Default index for searches that do not name one"
+                    },
+                    "searches": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "description": "Same arguments as search_documents: index, query, size, from_ and projection options"
+                        },
+                        "description": "Searches to run; top-level projection options apply to every search unless overridden"
+                    },
+                    "max_concurrent_searches": {
+                        "type": "integer",
+                        "description": "Maximum searches Elasticsearch runs at the same time (default: chosen by the cluster)"
+                    },
+                    **PROJECTION_PROPERTIES
+                },
+                "required": ["searches"]
+            }
+        ),
         Tool(
             name="list_indices",
             description="List all available indices in Elasticsearch.",
             inputSchema={
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "refresh": {
+                        "type": "boolean",
+                        "description": "Bypass the metadata cache and list indices again (default: false)",
+                        "default": False
+                    }
+                }
             }
         ),
         Tool(
@@ -91,6 +456,11 @@ async def list_tools() -> list[Tool]:
                     "index": {
                         "type": "string",
                         "description": "Name of the index"
+                    },
+                    "refresh": {
+                        "type": "boolean",
+                        "description": "Bypass the metadata cache and fetch the mapping again (default: false)",
+                        "default": False
                     }
                 },
                 "required": ["index"]
@@ -98,7 +468,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="bulk_export",
-            description="Export documents from an index in batches using scroll API.",
+            description="Export documents from an index one bounded page at a time. Pass the returned cursor back to fetch the next page; a null cursor means the export is complete. Projection options are fixed when the export starts.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -108,13 +478,36 @@ async def list_tools() -> list[Tool]:
                     },
                     "query": {
                         "type": "object",
-                        "description": "Elasticsearch query DSL to filter documents (default: match_all)"
+                        "description": "Elasticsearch query DSL to filter documents (default: match_all). Ignored when a cursor is given."
                     },
                     "batch_size": {
                         "type": "integer",
-                        "description": "Number of documents per batch (default: 100)",
+                        "description": "Maximum number of documents per page, per slice (default: 100)",
                         "default": 100
-                    }
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Continuation token returned by the previous bulk_export call"
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": f"Cap on serialized document bytes per page (default and maximum: {EXPORT_MAX_BYTES})"
+                    },
+                    "keep_alive": {
+                        "type": "string",
+                        "description": "How long the point-in-time stays open between pages (default: '2m')",
+                        "default": "2m"
+                    },
+                    "slices": {
+                        "type": "integer",
+                        "description": "Split the export into N sliced scans read in parallel; match the index's shard count for best throughput (default: 1). Fixed when the export starts.",
+                        "default": 1
+                    },
+                    "concurrency": {
+                        "type": "integer",
+                        "description": "Maximum slices fetched at the same time (default: number of slices)"
+                    },
+                    **PROJECTION_PROPERTIES
                 },
                 "required": ["index"]
             }
@@ -136,118 +529,395 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["index"]
             }
+        ),
+        Tool(
+            name="aggregate",
+            description="Compute statistics inside Elasticsearch and return only numbers, never documents: terms (top values), stats (count/min/max/avg/sum), histogram, or composite buckets paged with the returned 'after' key.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "string",
+                        "description": "Name of the index"
+                    },
+                    "type": {
+                        "type": "string",
+                        "description": "Aggregation type",
+                        "enum": AGGREGATION_TYPES
+                    },
+                    "field": {
+                        "type": "string",
+                        "description": "Field to aggregate (keyword, numeric or date fields)"
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Composite only: fields whose value combinations form the buckets (default: [field])"
+                    },
+                    "query": {
+                        "type": "object",
+                        "description": "Elasticsearch query DSL restricting the aggregated documents (default: match_all)"
+                    },
+                    "metrics": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Numeric fields to summarize (count/min/max/avg/sum) within each bucket, e.g. ['price']"
+                    },
+                    "size": {
+                        "type": "integer",
+                        "description": "Terms: number of top buckets (default: 10). Composite: buckets per page (default: 100)."
+                    },
+                    "interval": {
+                        "type": "number",
+                        "description": "Histogram bucket width"
+                    },
+                    "min_doc_count": {
+                        "type": "integer",
+                        "description": "Histogram: omit buckets with fewer documents (default: 0)",
+                        "default": 0
+                    },
+                    "after": {
+                        "type": "object",
+                        "description": "Composite: the 'after' value returned by the previous page"
+                    }
+                },
+                "required": ["index", "type"]
+            }
+        ),
+        Tool(
+            name="server_stats",
+            description="Show per-tool call metrics (latency percentiles, phase timings, rows, bytes, error classes) and metadata cache hit/miss metrics for this server.",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
         )
     ]
+    
+    for tool in tools:
+        tool.inputSchema["properties"]["format"] = FORMAT_PROPERTY
+    return tools
 
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
-    """Handle tool execution."""
+    """Handle tool execution, recording per-tool metrics."""
+    with tool_metrics.track(name) as call:
+        return call.respond(await run_tool(name, arguments))
+
+
+async def run_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    """Execute one tool."""
     
     try:
-        if name == "search_documents":
+        # Reject an unknown format before any work is done
+        response_format(arguments)
+        
+        if name == "server_stats":
+            return [TextContent(
+                type="text",
+                text=encode({
+                    "tools": tool_metrics.snapshot(),
+                    "metadata_cache": metadata_cache.stats()
+                }, arguments)
+            )]
+        
+        elif name == "search_documents":
             index = arguments["index"]
             query = arguments.get("query", {"match_all": {}})
             size = arguments.get("size", 10)
             from_ = arguments.get("from_", 0)
             
-            result = es_client.search(
+            result = await es_client.search(
                 index=index,
                 query=query,
                 size=size,
-                from_=from_
+                from_=from_,
+                **projection_kwargs(arguments)
             )
             
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=encode({
                     "total": result["hits"]["total"]["value"],
-                    "documents": [hit["_source"] for hit in result["hits"]["hits"]],
+                    "documents": [hit_document(hit) for hit in result["hits"]["hits"]],
                     "took_ms": result["took"]
-                }, indent=2)
+                }, arguments)
             )]
         
         elif name == "get_document":
             index = arguments["index"]
             doc_id = arguments["doc_id"]
             
-            result = es_client.get(index=index, id=doc_id)
+            result = await es_client.get(index=index, id=doc_id)
+            
+            return [TextContent(
+                type="text",
+                text=encode(result["_source"], arguments)
+            )]
+        
+        elif name == "multi_get":
+            index = arguments.get("index")
+            docs = [{"index": index, "id": doc_id} for doc_id in arguments.get("ids", [])]
+            docs += [{"index": doc.get("index", index), "id": doc["id"]} for doc in arguments.get("docs", [])]
+            if not docs:
+                raise ValueError("multi_get needs at least one entry in ids or docs")
+            for doc in docs:
+                if not doc["index"]:
+                    raise ValueError(f"No index given for document {doc['id']}")
+            
+            result = await es_client.mget(
+                docs=[{"_index": doc["index"], "_id": str(doc["id"])} for doc in docs],
+                **mget_kwargs(arguments)
+            )
+            
+            items = []
+            for doc in result["docs"]:
+                item = {"index": doc["_index"], "id": doc["_id"]}
+                if "error" in doc:
+                    item["error"] = item_error(doc["error"])
+                else:
+                    item["found"] = doc.get("found", False)
+                    if item["found"]:
+                        item["document"] = hit_document(doc)
+                items.append(item)
+            
+            return [TextContent(
+                type="text",
+                text=encode({
+                    "requested": len(items),
+                    "found": sum(1 for item in items if item.get("found")),
+                    "missing": sum(1 for item in items if item.get("found") is False),
+                    "errors": sum(1 for item in items if "error" in item),
+                    "documents": items
+                }, arguments)
+            )]
+        
+        elif name == "multi_search":
+            searches = arguments.get("searches") or []
+            if not searches:
+                raise ValueError("multi_search needs at least one search")
+            
+            # Each search inherits the top-level index and projection unless it sets its own
+            shared = {key: value for key, value in arguments.items() if key not in ("searches", "max_concurrent_searches")}
+            lines = []
+            for position, search in enumerate(searches):
+                search = {**shared, **search}
+                if not search.get("index"):
+                    raise ValueError(f"No index given for search {position}")
+                lines.append({"index": search["index"]})
+                lines.append(search_body(search))
+            
+            msearch_kwargs = {}
+            if arguments.get("max_concurrent_searches"):
+                msearch_kwargs["max_concurrent_searches"] = arguments["max_concurrent_searches"]
+            result = await es_client.msearch(searches=lines, **msearch_kwargs)
+            
+            results = []
+            for position, response in enumerate(result["responses"]):
+                if "error" in response:
+                    results.append({
+                        "search": position,
+                        "status": response.get("status"),
+                        "error": item_error(response["error"])
+                    })
+                else:
+                    results.append({
+                        "search": position,
+                        "total": response["hits"]["total"]["value"],
+                        "documents": [hit_document(hit) for hit in response["hits"]["hits"]],
+                        "took_ms": response.get("took")
+                    })
             
             return [TextContent(
                 type="text",
-                text=json.dumps(result["_source"], indent=2)
+                text=encode({
+                    "searches": len(results),
+                    "errors": sum(1 for item in results if "error" in item),
+                    "took_ms": result["took"],
+                    "results": results
+                }, arguments)
             )]
         
         elif name == "list_indices":
-            indices = es_client.indices.get_alias(index="*")
-            index_list = [
-                {
-                    "name": idx,
-                    "aliases": list(info.get("aliases", {}).keys())
-                }
-                for idx, info in indices.items()
-                if not idx.startswith(".")  # Filter out system indices
-            ]
+            cache_key = metadata_key(name, None, arguments)
+            if arguments and arguments.get("refresh"):
+                invalidate_metadata(name, None)
+            text = metadata_cache.get(cache_key)
+            
+            if text is None:
+                indices = await es_client.indices.get_alias(index="*")
+                index_list = [
+                    {
+                        "name": idx,
+                        "aliases": list(info.get("aliases", {}).keys())
+                    }
+                    for idx, info in indices.items()
+                    if not idx.startswith(".")  # Filter out system indices
+                ]
+                text = encode(index_list, arguments)
+                metadata_cache.set(cache_key, text)
             
             return [TextContent(
                 type="text",
-                text=json.dumps(index_list, indent=2)
+                text=text
             )]
         
         elif name == "get_mapping":
             index = arguments["index"]
-            mapping = es_client.indices.get_mapping(index=index)
+            cache_key = metadata_key(name, index, arguments)
+            if arguments.get("refresh"):
+                invalidate_metadata(name, index)
+            text = metadata_cache.get(cache_key)
+            
+            if text is None:
+                mapping = await es_client.indices.get_mapping(index=index)
+                # Cache the serialized form so hits skip both the request and serialization
+                text = encode(mapping.body, arguments)
+                metadata_cache.set(cache_key, text)
             
             return [TextContent(
                 type="text",
-                text=json.dumps(mapping, indent=2)
+                text=text
             )]
         
         elif name == "bulk_export":
             index = arguments["index"]
-            query = arguments.get("query", {"match_all": {}})
             batch_size = arguments.get("batch_size", 100)
+            keep_alive = arguments.get("keep_alive", "2m")
+            max_bytes = min(arguments.get("max_bytes", EXPORT_MAX_BYTES), EXPORT_MAX_BYTES)
             
-            # Use scroll API for efficient bulk export
-            result = es_client.search(
-                index=index,
-                query=query,
-                scroll='2m',
-                size=batch_size
-            )
+            if arguments.get("cursor"):
+                state = decode_cursor(arguments["cursor"])
+            else:
+                slice_count = max(1, arguments.get("slices", 1))
+                # Point-in-time gives every page (and every slice) the same consistent view
+                pit = await es_client.open_point_in_time(index=index, keep_alive=keep_alive)
+                state = {
+                    "pit_id": pit["id"],
+                    "query": arguments.get("query", {"match_all": {}}),
+                    "projection": projection_kwargs(arguments),
+                    "slice_count": slice_count,
+                    "slices": [{"id": i, "search_after": None} for i in range(slice_count)],
+                    "exported": 0,
+                    "total": None
+                }
+            
+            # Fan the open slices out over parallel workers
+            active = state["slices"]
+            concurrency = max(1, min(arguments.get("concurrency", len(active)), len(active)))
+            limit = asyncio.Semaphore(concurrency)
+            results = await asyncio.gather(*[
+                fetch_slice_page(state, slice_state, batch_size, keep_alive, limit)
+                for slice_state in active
+            ])
+            
+            if state["total"] is None:
+                state["total"] = sum(result["hits"]["total"]["value"] for result, _ in results)
             
-            scroll_id = result['_scroll_id']
-            documents = [hit["_source"] for hit in result["hits"]["hits"]]
-            total = result["hits"]["total"]["value"]
+            # Measure one document at a time so the byte cap is enforced exactly
+            documents = []
+            used_bytes = 0
+            truncated = False
+            slice_stats = []
+            remaining = []
+            for slice_state, (result, took) in zip(active, results):
+                state["pit_id"] = result.get("pit_id", state["pit_id"])
+                hits = result["hits"]["hits"]
+                emitted = 0
+                for hit in hits:
+                    if truncated:
+                        break
+                    document = hit_document(hit)
+                    size = len(dumps(document).encode())
+                    if documents and used_bytes + size > max_bytes:
+                        truncated = True
+                        break
+                    documents.append(document)
+                    used_bytes += size + 1
+                    slice_state["search_after"] = hit["sort"]
+                    emitted += 1
+                
+                slice_stats.append({
+                    "slice": slice_state["id"],
+                    "fetched": len(hits),
+                    "emitted": emitted,
+                    "took_ms": round(took * 1000, 2),
+                    "docs_per_sec": round(len(hits) / took, 1) if took > 0 else None
+                })
+                # A slice is exhausted once a short page has been fully emitted
+                if emitted < len(hits) or len(hits) == batch_size:
+                    remaining.append(slice_state)
             
-            # Get all remaining documents
-            while len(result["hits"]["hits"]) > 0:
-                result = es_client.scroll(scroll_id=scroll_id, scroll='2m')
-                documents.extend([hit["_source"] for hit in result["hits"]["hits"]])
+            state["slices"] = remaining
+            state["exported"] += len(documents)
+            finished = not remaining
             
-            # Clear scroll
-            es_client.clear_scroll(scroll_id=scroll_id)
+            if finished:
+                await es_client.close_point_in_time(id=state["pit_id"])
             
             return [TextContent(
                 type="text",
-                text=json.dumps({
-                    "total": total,
+                text=encode({
+                    "total": state["total"],
                     "exported": len(documents),
+                    "exported_so_far": state["exported"],
+                    "bytes": used_bytes,
+                    "truncated_by_bytes": truncated,
+                    "slices": state["slice_count"],
+                    "slice_stats": slice_stats,
+                    "cursor": None if finished else encode_cursor(state),
                     "documents": documents
-                }, indent=2)
+                }, arguments)
             )]
         
         elif name == "count_documents":
             index = arguments["index"]
             query = arguments.get("query", {"match_all": {}})
             
-            result = es_client.count(index=index, query=query)
+            result = await es_client.count(index=index, query=query)
             
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=encode({
                     "count": result["count"]
-                }, indent=2)
+                }, arguments)
+            )]
+        
+        elif name == "aggregate":
+            index = arguments["index"]
+            kind = arguments["type"]
+            metrics = arguments.get("metrics") or []
+            
+            result = await es_client.search(
+                index=index,
+                query=arguments.get("query", {"match_all": {}}),
+                size=0,
+                track_total_hits=True,
+                aggs={"result": build_aggregation(arguments)}
+            )
+            aggregation = result["aggregations"]["result"]
+            
+            summary = {
+                "type": kind,
+                "matched": result["hits"]["total"]["value"],
+                "took_ms": result["took"]
+            }
+            if kind == "stats":
+                summary["stats"] = dict(aggregation)
+            else:
+                summary["buckets"] = [bucket_summary(bucket, metrics) for bucket in aggregation["buckets"]]
+            if kind == "terms":
+                summary["other_doc_count"] = aggregation.get("sum_other_doc_count", 0)
+                summary["doc_count_error_upper_bound"] = aggregation.get("doc_count_error_upper_bound", 0)
+            if kind == "composite":
+                # A full page means there may be more buckets after this one
+                page_full = len(aggregation["buckets"]) == arguments.get("size", 100)
+                summary["after"] = aggregation.get("after_key") if page_full else None
+            
+            return [TextContent(
+                type="text",
+                text=encode(summary, arguments)
             )]
         
         else:
@@ -257,6 +927,7 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageCo
             )]
     
     except Exception as e:
+        record_error(e)
         return [TextContent(
             type="text",
             text=f"Error executing {name}: {str(e)}"
@@ -265,14 +936,20 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageCo
 
 async def main():
     """Run the MCP server."""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    exporter = MetricsExporter(
+        tool_metrics, path=METRICS_FILE, port=METRICS_PORT, host=METRICS_HOST, interval=METRICS_INTERVAL
+    ).start()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream,
+                write_stream,
+                app.create_initialization_options()
+            )
+    finally:
+        exporter.close()
+        await es_client.close()
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
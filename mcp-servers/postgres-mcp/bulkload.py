@@ -0,0 +1,141 @@
+"""
+Bulk loading helpers for the PostgreSQL MCP server
+Streams rows into PostgreSQL with COPY FROM STDIN instead of row-by-row INSERTs
+"""
+
+import io
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from psycopg2.extras import execute_batch
+
+# Rows encoded into a single in-memory COPY buffer before it is flushed
+COPY_CHUNK_ROWS = 10000
+
+
+def _array_literal(values):
+    """Encode a Python sequence as a PostgreSQL array literal, e.g. {"a","b"}."""
+    items = []
+    for item in values:
+        if item is None:
+            items.append("NULL")
+        elif isinstance(item, (list, tuple)):
+            items.append(_array_literal(item))
+        else:
+            text = _text(item)
+            items.append('"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"')
+    return "{" + ",".join(items) + "}"
+
+
+def _text(value):
+    """Render a non-null value the way PostgreSQL's input functions expect it."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_field(value):
+    """Encode one value as a CSV field for COPY; unquoted empty means NULL."""
+    if value is None:
+        return ""
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return str(value)
+    return '"' + _text(value).replace('"', '""') + '"'
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def copy_rows(cursor, table, columns, rows, chunk_rows=COPY_CHUNK_ROWS):
+    """COPY value sequences into ``table``; returns the number of rows written.
+
+    Rows are encoded as CSV into an in-memory buffer of at most ``chunk_rows``
+    rows at a time, so memory stays bounded for arbitrarily large inputs.
+    """
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    copied = 0
+
+    for chunk in _chunks(rows, chunk_rows):
+        buffer = io.StringIO()
+        for values in chunk:
+            buffer.write(",".join(csv_field(value) for value in values))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        cursor.copy_expert(copy_sql, buffer)
+        copied += cursor.rowcount if cursor.rowcount >= 0 else len(chunk)
+
+    return copied
+
+
+def conflict_clause(columns, on_conflict):
+    """Build the ON CONFLICT clause; the first column is assumed to be the primary key."""
+    if on_conflict == "ignore":
+        return " ON CONFLICT DO NOTHING"
+    if on_conflict == "update":
+        update_cols = ", ".join([f"{col} = EXCLUDED.{col}" for col in columns[1:]])
+        if not update_cols:
+            return f" ON CONFLICT ({columns[0]}) DO NOTHING"
+        return f" ON CONFLICT ({columns[0]}) DO UPDATE SET {update_cols}"
+    return ""
+
+
+def copy_insert(cursor, table, columns, rows, on_conflict="error", chunk_rows=COPY_CHUNK_ROWS):
+    """Load rows with COPY, honouring the bulk_insert conflict strategies.
+
+    ``error`` copies straight into the target table. ``ignore`` and ``update``
+    copy into a temporary staging table first and merge it with a single
+    ``INSERT ... SELECT ... ON CONFLICT`` statement. Returns the affected row count.
+    """
+    if on_conflict == "error":
+        return copy_rows(cursor, table, columns, rows, chunk_rows)
+
+    columns_str = ", ".join(columns)
+    stage = f"_bulk_stage_{uuid.uuid4().hex[:12]}"
+
+    # Staging table has the target's column types but none of its constraints
+    cursor.execute(
+        f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+        f"SELECT {columns_str} FROM {table} WITH NO DATA"
+    )
+    copy_rows(cursor, stage, columns, rows, chunk_rows)
+
+    if on_conflict == "update":
+        # ON CONFLICT DO UPDATE cannot touch the same row twice, keep the last occurrence per key
+        select = (
+            f"SELECT DISTINCT ON ({columns[0]}) {columns_str} FROM {stage} "
+            f"ORDER BY {columns[0]}, ctid DESC"
+        )
+    else:
+        select = f"SELECT {columns_str} FROM {stage}"
+
+    cursor.execute(f"INSERT INTO {table} ({columns_str}) {select}{conflict_clause(columns, on_conflict)}")
+    affected = cursor.rowcount
+    cursor.execute(f"DROP TABLE {stage}")
+    return affected
+
+
+def batch_insert(cursor, table, columns, rows, on_conflict="error", page_size=100):
+    """Load rows with parameterized INSERTs via execute_batch (the pre-COPY path)."""
+    placeholders = ", ".join(["%s"] * len(columns))
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    query += conflict_clause(columns, on_conflict)
+
+    execute_batch(cursor, query, rows, page_size=page_size)
+    return cursor.rowcount
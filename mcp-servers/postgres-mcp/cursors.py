@@ -0,0 +1,161 @@
+"""
+Server-side query cursors for the PostgreSQL MCP server
+Lets execute_query hand back large result sets one page at a time
+"""
+
+import threading
+import time
+import uuid
+
+from psycopg2.extras import RealDictCursor
+
+
+class QueryCursors:
+    """Named (server-side) cursors that stay open between tool calls.
+
+    Each open cursor pins one pooled connection inside its transaction, so the
+    number of open cursors is capped at ``max_open``. Cursors idle longer than
+    ``idle_timeout`` seconds are closed, and when the cap is reached the least
+    recently used cursor is evicted to make room.
+    """
+
+    def __init__(self, pool, max_open=4, idle_timeout=120.0):
+        self.pool = pool
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self._sessions = {}  # cursor id -> session dict
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "completed": 0, "closed": 0, "expired": 0, "evicted": 0}
+
+    def execute(self, query, page_size, max_rows=None, statement_timeout_ms=None):
+        """Run ``query`` on a named cursor and return its first page."""
+        self._reap()
+        conn = self.pool.getconn()
+        try:
+            if statement_timeout_ms is not None:
+                with conn.cursor() as setup:
+                    setup.execute("SET statement_timeout = %s", (statement_timeout_ms,))
+            cursor_id = uuid.uuid4().hex[:16]
+            cursor = conn.cursor(name=f"mcp_query_{cursor_id}", cursor_factory=RealDictCursor)
+            cursor.itersize = page_size
+            cursor.execute(query)
+        except Exception:
+            self.pool.putconn(conn)
+            raise
+
+        session = {
+            "id": cursor_id,
+            "conn": conn,
+            "cursor": cursor,
+            "lookahead": [],
+            "fetched": 0,
+            "max_rows": max_rows,
+            "last_used": time.monotonic(),
+            "lock": threading.Lock()
+        }
+        with self._lock:
+            self._stats["opened"] += 1
+        try:
+            return self._next_page(session, page_size, register=True)
+        except Exception:
+            self._release(session)
+            raise
+
+    def fetch(self, cursor_id, page_size):
+        """Return the next page of an open cursor."""
+        self._reap()
+        with self._lock:
+            session = self._sessions.get(cursor_id)
+        if session is None:
+            raise ValueError(f"Query cursor {cursor_id} is not open (it may have completed, expired or been evicted)")
+        try:
+            return self._next_page(session, page_size, register=False)
+        except Exception:
+            # A failed fetch aborts the cursor's transaction, so the cursor is unusable
+            self.close(cursor_id)
+            raise
+
+    def close(self, cursor_id):
+        """Close an open cursor early; returns False if it was not open."""
+        with self._lock:
+            session = self._sessions.pop(cursor_id, None)
+            if session is not None:
+                self._stats["closed"] += 1
+        if session is None:
+            return False
+        self._release(session)
+        return True
+
+    def close_all(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            self._release(session)
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({"open": len(self._sessions), "max_open": self.max_open})
+        return snapshot
+
+    def _next_page(self, session, page_size, register):
+        with session["lock"]:
+            if session["max_rows"] is not None:
+                page_size = max(0, min(page_size, session["max_rows"] - session["fetched"]))
+
+            # Read one row past the page so "more rows" is exact, not a guess
+            rows = session["lookahead"] + session["cursor"].fetchmany(page_size + 1 - len(session["lookahead"]))
+            session["lookahead"] = rows[page_size:]
+            rows = rows[:page_size]
+            session["fetched"] += len(rows)
+            session["last_used"] = time.monotonic()
+
+            more = bool(session["lookahead"])
+            limit_reached = session["max_rows"] is not None and session["fetched"] >= session["max_rows"]
+            keep_open = more and not limit_reached
+
+        if keep_open:
+            if register:
+                self._register(session)
+        else:
+            with self._lock:
+                self._sessions.pop(session["id"], None)
+                self._stats["completed"] += 1
+            self._release(session)
+
+        return {
+            "rows": [dict(row) for row in rows],
+            "fetched_so_far": session["fetched"],
+            "truncated": more,
+            "cursor": session["id"] if keep_open else None
+        }
+
+    def _register(self, session):
+        evicted = []
+        with self._lock:
+            while len(self._sessions) >= self.max_open:
+                oldest = min(self._sessions.values(), key=lambda item: item["last_used"])
+                evicted.append(self._sessions.pop(oldest["id"]))
+                self._stats["evicted"] += 1
+            self._sessions[session["id"]] = session
+        for old in evicted:
+            self._release(old)
+
+    def _reap(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [s for s in self._sessions.values() if s["last_used"] < cutoff]
+            for session in expired:
+                del self._sessions[session["id"]]
+            self._stats["expired"] += len(expired)
+        for session in expired:
+            self._release(session)
+
+    def _release(self, session):
+        with session["lock"]:
+            try:
+                session["cursor"].close()
+            except Exception:
+                pass
+            # Ending the transaction drops the server-side cursor
+            self.pool.putconn(session["conn"])
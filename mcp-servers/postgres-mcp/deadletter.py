@@ -0,0 +1,118 @@
+"""
+Dead-letter handling for the PostgreSQL MCP server
+Isolates the rows a load cannot write by bisecting under savepoints and keeps them, with the error, in a dead-letter table
+"""
+
+import json
+import uuid
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+DEAD_LETTER_TABLE = "etl_dead_letters"
+
+# Errors caused by the rows themselves (data exceptions, constraint violations);
+# anything else (timeouts, lost connections, missing tables) fails the load as before
+ROW_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError)
+
+
+def ensure_dead_letter_table(cursor):
+    """Create the table that keeps rows a load could not write if needed."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DEAD_LETTER_TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            load_id TEXT NOT NULL,
+            target_table TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            error TEXT NOT NULL,
+            sqlstate TEXT,
+            row_data JSONB NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {DEAD_LETTER_TABLE}_load_idx ON {DEAD_LETTER_TABLE} (target_table, load_id)"
+    )
+
+
+def new_load_id():
+    return uuid.uuid4().hex[:16]
+
+
+def load_isolating(cursor, rows, load):
+    """Run ``load(cursor, rows)``, bisecting around rows PostgreSQL refuses.
+
+    Each batch is attempted under a savepoint. When it fails with a row-level
+    error the savepoint is rolled back and the two halves are tried on their
+    own, down to single rows, so k bad rows cost O(k log n) extra attempts and
+    every other row is written in the surrounding transaction. Returns
+    (rows written, [(row, error), ...]) for the caller to commit.
+    """
+    written = 0
+    failures = []
+    pending = [rows]
+    while pending:
+        batch = pending.pop()
+        cursor.execute("SAVEPOINT mcp_load_batch")
+        try:
+            written += load(cursor, batch)
+        except ROW_ERRORS as e:
+            # ROLLBACK TO keeps the savepoint; release it so bisecting does not stack one per attempt
+            cursor.execute("ROLLBACK TO SAVEPOINT mcp_load_batch")
+            cursor.execute("RELEASE SAVEPOINT mcp_load_batch")
+            if len(batch) == 1:
+                failures.append((batch[0], e))
+                continue
+            middle = len(batch) // 2
+            # Left half first so failures come back in input order
+            pending.append(batch[middle:])
+            pending.append(batch[:middle])
+        else:
+            cursor.execute("RELEASE SAVEPOINT mcp_load_batch")
+    return written, failures
+
+
+def load_failure(columns, row, error):
+    """Dead-letter entry for a row the database refused."""
+    return {
+        "stage": "load",
+        "key": row[0],
+        "error": str(error).strip(),
+        "sqlstate": getattr(error, "pgcode", None),
+        "row": dict(zip(columns, row))
+    }
+
+
+def validation_failure(record, reject):
+    """Dead-letter entry for a row the transform engine rejected before loading."""
+    return {
+        "stage": "validation",
+        "key": reject["key"],
+        "error": f"{reject['column']}: {reject['reason']}",
+        "row": record
+    }
+
+
+def save_dead_letters(cursor, table, load_id, entries):
+    """Insert dead-letter entries (dicts with stage, error, sqlstate and row) for one load."""
+    if not entries:
+        return 0
+    ensure_dead_letter_table(cursor)
+    execute_values(
+        cursor,
+        f"INSERT INTO {DEAD_LETTER_TABLE} (load_id, target_table, stage, error, sqlstate, row_data) VALUES %s",
+        [
+            (load_id, table, entry["stage"], entry["error"], entry.get("sqlstate"),
+             json.dumps(entry["row"], default=str))
+            for entry in entries
+        ]
+    )
+    return len(entries)
+
+
+def summary(entries):
+    """Dead-letter entries as reported in a tool result (without the row data)."""
+    return [
+        {key: entry[key] for key in ("stage", "key", "error", "sqlstate") if entry.get(key) is not None}
+        for entry in entries
+    ]
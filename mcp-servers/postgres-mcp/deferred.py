@@ -0,0 +1,274 @@
+"""
+Deferred index maintenance for the PostgreSQL MCP server
+Drops secondary indexes and disables triggers for the length of a large load, then rebuilds them
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+DEFERRED_TABLE = "etl_deferred_objects"
+
+
+def ensure_deferred_table(cursor):
+    """Create the table that remembers dropped indexes and disabled triggers if needed."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DEFERRED_TABLE} (
+            target_table TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            definition TEXT NOT NULL,
+            deferred_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (target_table, kind, name)
+        )
+    """)
+
+
+def secondary_indexes(cursor, table):
+    """Indexes that can be rebuilt after a load: not primary keys, unique or constraint-backed.
+
+    Unique indexes stay in place because ON CONFLICT and data integrity depend on them.
+    """
+    cursor.execute("""
+        SELECT quote_ident(n.nspname) || '.' || quote_ident(i.relname), pg_get_indexdef(x.indexrelid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_namespace n ON n.oid = i.relnamespace
+        WHERE x.indrelid = %s::regclass
+          AND NOT x.indisprimary
+          AND NOT x.indisunique
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+        ORDER BY i.relname
+    """, (table,))
+    return cursor.fetchall()
+
+
+def enabled_triggers(cursor, table):
+    """User-defined triggers on ``table`` that are currently enabled."""
+    cursor.execute("""
+        SELECT quote_ident(tgname), pg_get_triggerdef(oid)
+        FROM pg_trigger
+        WHERE tgrelid = %s::regclass AND NOT tgisinternal AND tgenabled <> 'D'
+        ORDER BY tgname
+    """, (table,))
+    return cursor.fetchall()
+
+
+def existing_triggers(cursor, table, names):
+    """The ones of ``names`` (quoted trigger names) that still exist on ``table``."""
+    cursor.execute("""
+        SELECT quote_ident(tgname)
+        FROM pg_trigger
+        WHERE tgrelid = %s::regclass AND NOT tgisinternal AND quote_ident(tgname) = ANY(%s)
+    """, (table, list(names)))
+    return {name for name, in cursor.fetchall()}
+
+
+def reset_settings(conn, settings):
+    """Put session settings back to their defaults before ``conn`` returns to the pool."""
+    if conn.closed:
+        return
+    try:
+        if not conn.autocommit:
+            conn.rollback()
+        conn.cursor().execute("; ".join(f"RESET {setting}" for setting in settings))
+        if not conn.autocommit:
+            conn.commit()
+    except Exception:
+        pass
+
+
+def create_statement(definition, concurrently):
+    """Turn a pg_get_indexdef() result into an idempotent CREATE INDEX statement."""
+    prefix = "CREATE INDEX CONCURRENTLY IF NOT EXISTS " if concurrently else "CREATE INDEX IF NOT EXISTS "
+    return prefix + definition[len("CREATE INDEX "):]
+
+
+class DeferredIndexes:
+    """Context manager that takes a table's secondary indexes and triggers out of a load.
+
+    On entry the index and trigger definitions are saved to ``etl_deferred_objects``
+    and committed before anything is dropped, so a crashed load can be repaired:
+    the next deferred load of the same table picks up and rebuilds anything
+    still recorded there. On exit (also when the load failed) the indexes are
+    rebuilt on ``parallelism`` connections, the triggers re-enabled and the table
+    analyzed; ``report()`` returns the per-phase timings. Recorded triggers that
+    have since been dropped are skipped and reported as ``missing_triggers``.
+
+    Disabled triggers do not fire for rows written by the load, e.g. an
+    ``updated_at`` trigger will not stamp upserted rows.
+    """
+
+    def __init__(self, pool, table, concurrently=True, parallelism=2, statement_timeout_ms=None,
+                 build_timeout_ms=None, maintenance_work_mem=None):
+        self.pool = pool
+        self.table = table
+        self.concurrently = concurrently
+        self.parallelism = max(1, parallelism)
+        self.statement_timeout_ms = statement_timeout_ms
+        self.build_timeout_ms = build_timeout_ms
+        self.maintenance_work_mem = maintenance_work_mem
+        self.indexes = {}  # qualified name -> definition
+        self.triggers = {}  # quoted name -> definition
+        self.missing_triggers = []  # recorded triggers that no longer exist, so were not re-enabled
+        self.rebuilds = []
+        self.phases = {}
+        self._mark = None
+
+    def __enter__(self):
+        started = time.perf_counter()
+        with self._connection() as (conn, cursor):
+            ensure_deferred_table(cursor)
+            cursor.execute(
+                f"SELECT kind, name, definition FROM {DEFERRED_TABLE} WHERE target_table = %s",
+                (self.table,)
+            )
+            # Objects left behind by an interrupted load are restored along with the current ones
+            for kind, name, definition in cursor.fetchall():
+                (self.indexes if kind == "index" else self.triggers)[name] = definition
+            self.indexes.update(secondary_indexes(cursor, self.table))
+            self.triggers.update(enabled_triggers(cursor, self.table))
+            self._forget_dropped_triggers(cursor)
+
+            for kind, objects in (("index", self.indexes), ("trigger", self.triggers)):
+                for name, definition in objects.items():
+                    cursor.execute(
+                        f"INSERT INTO {DEFERRED_TABLE} (target_table, kind, name, definition) "
+                        f"VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                        (self.table, kind, name, definition)
+                    )
+            conn.commit()
+            self.phases["capture_s"] = time.perf_counter() - started
+
+            phase = time.perf_counter()
+            for name in self.indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {name}")
+            for name in self.triggers:
+                cursor.execute(f"ALTER TABLE {self.table} DISABLE TRIGGER {name}")
+            conn.commit()
+            self.phases["drop_s"] = time.perf_counter() - phase
+
+        self._mark = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.phases["load_s"] = time.perf_counter() - self._mark
+
+        phase = time.perf_counter()
+        self._rebuild_indexes()
+        self.phases["rebuild_s"] = time.perf_counter() - phase
+
+        with self._connection() as (conn, cursor):
+            phase = time.perf_counter()
+            self._forget_dropped_triggers(cursor)
+            for name in self.triggers:
+                cursor.execute(f"ALTER TABLE {self.table} ENABLE TRIGGER {name}")
+            cursor.execute(
+                f"DELETE FROM {DEFERRED_TABLE} WHERE target_table = %s AND kind = 'trigger'",
+                (self.table,)
+            )
+            rebuilt = [item["index"] for item in self.rebuilds if "error" not in item]
+            if rebuilt:
+                cursor.execute(
+                    f"DELETE FROM {DEFERRED_TABLE} WHERE target_table = %s AND kind = 'index' AND name = ANY(%s)",
+                    (self.table, rebuilt)
+                )
+            conn.commit()
+            self.phases["enable_triggers_s"] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            cursor.execute(f"ANALYZE {self.table}")
+            conn.commit()
+            self.phases["analyze_s"] = time.perf_counter() - phase
+        return False
+
+    def report(self):
+        failed = [item["index"] for item in self.rebuilds if "error" in item]
+        return {
+            "status": "incomplete" if failed else "restored",
+            "indexes": sorted(self.indexes),
+            "triggers": sorted(self.triggers),
+            "missing_triggers": sorted(self.missing_triggers),
+            "concurrently": self.concurrently,
+            "phases": {key: round(value, 3) for key, value in self.phases.items()},
+            "rebuilds": self.rebuilds,
+            "pending_indexes": failed
+        }
+
+    @contextmanager
+    def _connection(self):
+        """A pooled connection and cursor under the load's statement_timeout, reset before it goes back."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            if self.statement_timeout_ms is None:
+                yield conn, cursor
+                return
+            cursor.execute("SET statement_timeout = %s", (self.statement_timeout_ms,))
+            try:
+                yield conn, cursor
+            finally:
+                reset_settings(conn, ["statement_timeout"])
+
+    def _forget_dropped_triggers(self, cursor):
+        """Leave out recorded triggers dropped since they were recorded (e.g. by an interrupted load)."""
+        existing = existing_triggers(cursor, self.table, self.triggers)
+        for name in sorted(set(self.triggers) - existing):
+            del self.triggers[name]
+            self.missing_triggers.append(name)
+
+    def _rebuild_indexes(self):
+        """Build the recorded indexes, several at a time on separate connections."""
+        todo = queue.Queue()
+        for name, definition in sorted(self.indexes.items()):
+            todo.put((name, definition))
+        lock = threading.Lock()
+
+        def builder():
+            conn = self.pool.getconn()
+            try:
+                # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+                conn.autocommit = True
+                if self.build_timeout_ms is not None:
+                    conn.cursor().execute("SET statement_timeout = %s", (self.build_timeout_ms,))
+                if self.maintenance_work_mem:
+                    conn.cursor().execute("SET maintenance_work_mem = %s", (self.maintenance_work_mem,))
+                while True:
+                    try:
+                        name, definition = todo.get_nowait()
+                    except queue.Empty:
+                        return
+                    started = time.perf_counter()
+                    item = {"index": name}
+                    try:
+                        conn.cursor().execute(create_statement(definition, self.concurrently))
+                    except Exception as e:
+                        item["error"] = f"{type(e).__name__}: {e}"
+                        if self.concurrently:
+                            # A failed concurrent build leaves an INVALID index behind
+                            try:
+                                conn.cursor().execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                            except Exception:
+                                pass
+                    item["seconds"] = round(time.perf_counter() - started, 3)
+                    with lock:
+                        self.rebuilds.append(item)
+            finally:
+                reset_settings(conn, ["statement_timeout", "maintenance_work_mem"])
+                if not conn.closed:
+                    conn.autocommit = False
+                self.pool.putconn(conn, discard=bool(conn.closed))
+
+        threads = [
+            threading.Thread(target=builder, name=f"pg-index-builder-{number}", daemon=True)
+            for number in range(min(self.parallelism, todo.qsize()))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Builders that could not get a connection leave their indexes queued
+        while not todo.empty():
+            name, _ = todo.get_nowait()
+            self.rebuilds.append({"index": name, "error": "not rebuilt: no connection was available", "seconds": 0.0})
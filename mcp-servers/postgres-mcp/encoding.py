@@ -0,0 +1,75 @@
+"""
+Response encoding for the PostgreSQL MCP server
+Serializes tool payloads as compact, pretty or columnar JSON, using orjson when it is installed
+Both servers carry this module, as each image builds from its own directory; tests/test_shared_modules.py keeps the copies identical
+"""
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder produces equivalent output
+    orjson = None
+
+FORMATS = ["compact", "pretty", "columnar"]
+DEFAULT_FORMAT = os.getenv("MCP_RESPONSE_FORMAT", "compact")
+USE_ORJSON = orjson is not None and os.getenv("MCP_FAST_JSON", "true").lower() == "true"
+
+# Schema fragment added to every tool so callers can pick the format per call
+FORMAT_PROPERTY = {
+    "type": "string",
+    "description": "Response encoding: 'compact' JSON, 'pretty' (indented) JSON, or 'columnar' (lists of records become column names plus value arrays)",
+    "enum": FORMATS
+}
+
+
+def response_format(arguments):
+    """Return the output format requested by a tool call, falling back to the server default."""
+    fmt = (arguments or {}).get("format") or DEFAULT_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown response format '{fmt}'; expected one of {FORMATS}")
+    return fmt
+
+
+def to_columnar(records):
+    """Turn a list of dicts into {"columns": [...], "values": [[...], ...]}."""
+    columns = []
+    seen = set()
+    for record in records:
+        for key in record:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+    return {
+        "columns": columns,
+        "values": [[record.get(column) for column in columns] for record in records]
+    }
+
+
+def _is_records(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def dumps(payload, fmt="compact"):
+    """Serialize ``payload`` in the given format; non-JSON values are rendered with str()."""
+    if fmt == "columnar":
+        if _is_records(payload):
+            payload = to_columnar(payload)
+        elif isinstance(payload, dict):
+            payload = {key: to_columnar(value) if _is_records(value) else value for key, value in payload.items()}
+
+    if USE_ORJSON:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if fmt == "pretty":
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(payload, default=str, option=option).decode()
+
+    if fmt == "pretty":
+        return json.dumps(payload, indent=2, default=str, ensure_ascii=False)
+    return json.dumps(payload, separators=(",", ":"), default=str, ensure_ascii=False)
+
+
+def encode(payload, arguments=None):
+    """Serialize a tool result in the format requested by the call's arguments."""
+    return dumps(payload, response_format(arguments))
@@ -0,0 +1,331 @@
+"""
+Tool call metrics for the PostgreSQL MCP server
+Times every tool call by phase and exports per-tool totals in the Prometheus text format
+Both servers carry this module, as each image builds from its own directory; tests/test_shared_modules.py keeps the copies identical
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the tool latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Payload keys whose list length (or integer value) is the number of rows/documents a tool returned
+ROW_LIST_KEYS = ("rows", "documents", "buckets", "results", "tables", "columns")
+ROW_COUNT_KEYS = ("inserted", "exported", "affected_rows", "rows_written")
+
+_current = contextvars.ContextVar("tool_call", default=None)
+
+
+class ToolCall:
+    """Phase timings and output size of one tool call."""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.rows = 0
+        self.response_bytes = 0
+        self.error = None
+        self._lock = threading.Lock()  # phases can be booked from worker threads
+
+    def add_phase(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def respond(self, content):
+        """Record the size of the tool's response and hand it back unchanged."""
+        for item in content:
+            text = getattr(item, "text", None)
+            if text is None:
+                continue
+            self.response_bytes += len(text.encode())
+            if self.error is None and text.startswith("Error"):
+                # Tools report rejected input as an "Error: ..." response without raising
+                self.error = "Rejected"
+        return content
+
+
+def current_call():
+    """The ToolCall being handled in this context, or None outside a tracked call."""
+    return _current.get()
+
+
+@contextmanager
+def tool_phase(phase):
+    """Book the time spent in the block to ``phase`` of the current tool call.
+
+    Phases run concurrently (e.g. export slices) add up, so their sum can
+    exceed the call's wall time.
+    """
+    call = _current.get()
+    if call is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        call.add_phase(phase, time.perf_counter() - started)
+
+
+def record_error(error):
+    """Remember the class of an exception a tool turned into an error response."""
+    call = _current.get()
+    if call is not None:
+        call.error = type(error).__name__
+
+
+def payload_rows(payload):
+    """Best-effort count of the rows or documents in a tool payload."""
+    if isinstance(payload, list):
+        return len(payload)
+    if not isinstance(payload, dict):
+        return 0
+    for key in ROW_LIST_KEYS:
+        if isinstance(payload.get(key), list):
+            return len(payload[key])
+    for key in ROW_COUNT_KEYS:
+        value = payload.get(key)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return 0
+
+
+def serializer(encode):
+    """Wrap an ``encode(payload, arguments)`` function so it books the serialize phase and row count."""
+    @functools.wraps(encode)
+    def timed(payload, arguments=None):
+        call = _current.get()
+        if call is None:
+            return encode(payload, arguments)
+        started = time.perf_counter()
+        try:
+            return encode(payload, arguments)
+        finally:
+            call.add_phase("serialize", time.perf_counter() - started)
+            call.rows += payload_rows(payload)
+    return timed
+
+
+class ToolMetrics:
+    """Thread-safe per-tool totals: calls, error classes, latency histogram, phase time, rows and bytes."""
+
+    def __init__(self, server):
+        self.server = server
+        self._lock = threading.Lock()
+        self._tools = {}
+
+    def _tool(self, tool):
+        stats = self._tools.get(tool)
+        if stats is None:
+            stats = self._tools[tool] = {
+                "calls": 0,
+                "in_flight": 0,
+                "errors": {},
+                "seconds_sum": 0.0,
+                "seconds_max": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                "phases": {},
+                "rows": 0,
+                "response_bytes": 0
+            }
+        return stats
+
+    @contextmanager
+    def track(self, tool):
+        """Time one call of ``tool``; phases and errors inside the block are attributed to it."""
+        call = ToolCall(tool)
+        token = _current.set(call)
+        with self._lock:
+            self._tool(tool)["in_flight"] += 1
+        try:
+            yield call
+        except BaseException as e:
+            call.error = call.error or type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self._record(call, time.perf_counter() - call.started)
+
+    def _record(self, call, seconds):
+        bucket = next((position for position, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound),
+                      len(LATENCY_BUCKETS))
+        with self._lock:
+            stats = self._tool(call.tool)
+            stats["in_flight"] -= 1
+            stats["calls"] += 1
+            stats["seconds_sum"] += seconds
+            stats["seconds_max"] = max(stats["seconds_max"], seconds)
+            stats["buckets"][bucket] += 1
+            for phase, spent in call.phases.items():
+                stats["phases"][phase] = stats["phases"].get(phase, 0.0) + spent
+            stats["rows"] += call.rows
+            stats["response_bytes"] += call.response_bytes
+            if call.error:
+                stats["errors"][call.error] = stats["errors"].get(call.error, 0) + 1
+
+    def _copy(self):
+        with self._lock:
+            return {
+                tool: {**stats, "errors": dict(stats["errors"]), "buckets": list(stats["buckets"]),
+                       "phases": dict(stats["phases"])}
+                for tool, stats in self._tools.items()
+            }
+
+    def snapshot(self):
+        """Per-tool summary for server_stats; percentiles are histogram bucket upper bounds."""
+        summary = {}
+        for tool, stats in sorted(self._copy().items()):
+            calls = stats["calls"]
+            phases_ms = {phase: round(spent * 1000, 2) for phase, spent in sorted(stats["phases"].items())}
+            summary[tool] = {
+                "calls": calls,
+                "in_flight": stats["in_flight"],
+                "errors": sum(stats["errors"].values()),
+                "error_classes": stats["errors"],
+                "mean_ms": round(stats["seconds_sum"] / calls * 1000, 2) if calls else None,
+                "p50_ms": _bucket_percentile(stats["buckets"], calls, 0.50),
+                "p95_ms": _bucket_percentile(stats["buckets"], calls, 0.95),
+                "p99_ms": _bucket_percentile(stats["buckets"], calls, 0.99),
+                "max_ms": round(stats["seconds_max"] * 1000, 2),
+                "total_ms": round(stats["seconds_sum"] * 1000, 2),
+                "phase_ms": phases_ms,
+                "rows": stats["rows"],
+                "response_bytes": stats["response_bytes"]
+            }
+        return summary
+
+    def prometheus(self):
+        """Render every tool's totals in the Prometheus text exposition format."""
+        tools = sorted(self._copy().items())
+        server = self.server
+        lines = [
+            "# HELP mcp_tool_calls_total Tool calls handled, including failed ones.",
+            "# TYPE mcp_tool_calls_total counter"
+        ]
+        lines += [f'mcp_tool_calls_total{{server="{server}",tool="{tool}"}} {stats["calls"]}' for tool, stats in tools]
+
+        lines += ["# HELP mcp_tool_errors_total Failed tool calls by error class.", "# TYPE mcp_tool_errors_total counter"]
+        for tool, stats in tools:
+            for error, count in sorted(stats["errors"].items()):
+                lines.append(f'mcp_tool_errors_total{{server="{server}",tool="{tool}",error="{error}"}} {count}')
+
+        lines += ["# HELP mcp_tool_in_flight Tool calls currently running.", "# TYPE mcp_tool_in_flight gauge"]
+        lines += [f'mcp_tool_in_flight{{server="{server}",tool="{tool}"}} {stats["in_flight"]}' for tool, stats in tools]
+
+        lines += ["# HELP mcp_tool_duration_seconds Tool call wall time.", "# TYPE mcp_tool_duration_seconds histogram"]
+        for tool, stats in tools:
+            labels = f'server="{server}",tool="{tool}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                cumulative += count
+                lines.append(f'mcp_tool_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'mcp_tool_duration_seconds_bucket{{{labels},le="+Inf"}} {stats["calls"]}')
+            lines.append(f'mcp_tool_duration_seconds_sum{{{labels}}} {stats["seconds_sum"]:.6f}')
+            lines.append(f'mcp_tool_duration_seconds_count{{{labels}}} {stats["calls"]}')
+
+        lines += ["# HELP mcp_tool_phase_seconds_total Time spent per phase (connect, query, serialize).",
+                  "# TYPE mcp_tool_phase_seconds_total counter"]
+        for tool, stats in tools:
+            for phase, spent in sorted(stats["phases"].items()):
+                lines.append(f'mcp_tool_phase_seconds_total{{server="{server}",tool="{tool}",phase="{phase}"}} {spent:.6f}')
+
+        lines += ["# HELP mcp_tool_rows_total Rows or documents returned or written.", "# TYPE mcp_tool_rows_total counter"]
+        lines += [f'mcp_tool_rows_total{{server="{server}",tool="{tool}"}} {stats["rows"]}' for tool, stats in tools]
+
+        lines += ["# HELP mcp_tool_response_bytes_total Bytes of tool responses.",
+                  "# TYPE mcp_tool_response_bytes_total counter"]
+        lines += [f'mcp_tool_response_bytes_total{{server="{server}",tool="{tool}"}} {stats["response_bytes"]}'
+                  for tool, stats in tools]
+        return "\n".join(lines) + "\n"
+
+
+def _bucket_percentile(buckets, calls, quantile):
+    if not calls:
+        return None
+    rank = quantile * calls
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS, buckets):
+        seen += count
+        if seen >= rank:
+            return round(bound * 1000, 2)
+    return None  # beyond the largest bucket
+
+
+class MetricsExporter:
+    """Publishes ``metrics.prometheus()`` to a file and/or a local HTTP endpoint.
+
+    The file is rewritten atomically every ``interval`` seconds (for the node
+    exporter's textfile collector or a sidecar); the HTTP endpoint serves
+    ``/metrics`` for a Prometheus scrape. Both are off unless configured.
+    """
+
+    def __init__(self, metrics, path=None, port=None, host="127.0.0.1", interval=15.0):
+        self.metrics = metrics
+        self.path = path
+        self.port = port
+        self.host = host
+        self.interval = interval
+        self._stop = threading.Event()
+        self._writer = None
+        self._http = None
+
+    def start(self):
+        if self.path:
+            self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+            self._writer.start()
+        if self.port:
+            # Imported only when the endpoint is enabled; it is not needed to answer the first request
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+            metrics = self.metrics
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = metrics.prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass  # stdout/stderr belong to the MCP transport
+
+            self._http = ThreadingHTTPServer((self.host, self.port), Handler)
+            threading.Thread(target=self._http.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+
+    def write(self):
+        """Write the current metrics to ``path`` (replacing it atomically)."""
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.metrics.prometheus())
+        os.replace(temporary, self.path)
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass  # keep serving tools if the metrics path is unavailable
+
+    def close(self):
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+            try:
+                self.write()
+            except OSError:
+                pass
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
@@ -0,0 +1,368 @@
+"""
+Elasticsearch to PostgreSQL transfer pipeline for the PostgreSQL MCP server
+Streams documents server-side (scan -> convert -> COPY) so row data never passes through the agent
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+from bulkload import copy_insert
+from deadletter import DEAD_LETTER_TABLE, new_load_id, save_dead_letters, validation_failure
+from transform import MAX_REPORTED_REJECTS, TransformPlan, load_table_schema, source_properties
+
+ES_URL = os.getenv("ELASTICSEARCH_URL", "http://elasticsearch:9200")
+
+_es_client = None
+_es_lock = threading.Lock()
+
+
+def get_es_client():
+    """Return the shared Elasticsearch client, creating it on first use.
+
+    The elasticsearch package is only imported here: it is the slowest import
+    of the server and only the transfer tool needs it.
+    """
+    global _es_client
+    with _es_lock:
+        if _es_client is None:
+            from elasticsearch import Elasticsearch
+
+            _es_client = Elasticsearch([ES_URL], request_timeout=120, max_retries=3, retry_on_timeout=True)
+        return _es_client
+
+
+def source_fields(fields):
+    """Source fields to request from Elasticsearch so unmapped fields stay on the server."""
+    return sorted({field for field, _ in fields if field != "_id"})
+
+
+def read_pages(es, index, query, fields, batch_size, keep_alive, out, stop, sort, search_after=None):
+    """Producer: page through the index with PIT + search_after and feed ``out``.
+
+    ``out`` is a bounded queue, so a slow loader blocks the reader instead of
+    letting pages pile up in memory. Puts lists of hits, an exception on
+    failure, and ``None`` once the index is exhausted.
+    """
+    pit_id = None
+    try:
+        pit_id = es.open_point_in_time(index=index, keep_alive=keep_alive)["id"]
+        while not stop.is_set():
+            search_kwargs = {
+                "pit": {"id": pit_id, "keep_alive": keep_alive},
+                "query": query,
+                "size": batch_size,
+                "sort": sort,
+                "source_includes": source_fields(fields),
+                "track_total_hits": False
+            }
+            if search_after is not None:
+                search_kwargs["search_after"] = search_after
+
+            result = es.search(**search_kwargs)
+            pit_id = result.get("pit_id", pit_id)
+            hits = result["hits"]["hits"]
+            if hits:
+                _put(out, hits, stop)
+                search_after = hits[-1]["sort"]
+            if len(hits) < batch_size:
+                break
+        _put(out, None, stop)
+    except Exception as e:
+        _put(out, e, stop)
+    finally:
+        if pit_id is not None:
+            try:
+                es.close_point_in_time(id=pit_id)
+            except Exception:
+                pass
+
+
+def _put(out, item, stop):
+    # Re-check the stop flag periodically so an aborted load never strands the reader
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+CHECKPOINT_TABLE = "etl_checkpoints"
+
+# _shard_doc sort values are longs
+LAST_SHARD_DOC = 2 ** 63 - 1
+
+
+def ensure_checkpoint_table(cursor):
+    """Create the bookkeeping table for incremental sync checkpoints if needed."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+            source_index TEXT NOT NULL,
+            target_table TEXT NOT NULL,
+            checkpoint_field TEXT NOT NULL,
+            high_water_mark JSONB,
+            documents_synced BIGINT NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source_index, target_table)
+        )
+    """)
+
+
+def load_checkpoint(cursor, index, table):
+    cursor.execute(
+        f"SELECT checkpoint_field, high_water_mark, documents_synced, status "
+        f"FROM {CHECKPOINT_TABLE} WHERE source_index = %s AND target_table = %s",
+        (index, table)
+    )
+    return cursor.fetchone()
+
+
+def save_checkpoint(cursor, index, table, field, high_water_mark, documents_synced, status):
+    cursor.execute(
+        f"""
+        INSERT INTO {CHECKPOINT_TABLE}
+            (source_index, target_table, checkpoint_field, high_water_mark, documents_synced, status, updated_at)
+        VALUES (%s, %s, %s, %s::jsonb, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (source_index, target_table) DO UPDATE SET
+            checkpoint_field = EXCLUDED.checkpoint_field,
+            high_water_mark = EXCLUDED.high_water_mark,
+            documents_synced = EXCLUDED.documents_synced,
+            status = EXCLUDED.status,
+            updated_at = EXCLUDED.updated_at
+        """,
+        (index, table, field, json.dumps(high_water_mark), documents_synced, status)
+    )
+
+
+def incremental_plan(cursor, arguments, fields, index_fields):
+    """Work out query, sort and resume position for an incremental run.
+
+    Documents are ordered by (checkpoint_field, key_field) and those two sort
+    values of the last committed document are the high-water mark, so a rerun
+    starts strictly after it, whether the previous run finished or crashed
+    midway. ``_shard_doc`` is added as a last sort key for paging within the
+    run only: its values belong to one point in time and mean nothing to the
+    next run's. ``index_fields`` is the flattened index mapping; a checkpoint
+    field missing from it would match no documents and sync nothing.
+    """
+    index = arguments["index"]
+    table = arguments["table"]
+    field = arguments.get("checkpoint_field")
+    key_field = arguments.get("key_field", fields[0][0])
+    if not field:
+        raise ValueError("incremental transfers need checkpoint_field, a source field that increases when a document changes")
+    if field != "_seq_no" and field not in index_fields:
+        raise ValueError(f"checkpoint_field '{field}' is not in the mapping of {index}")
+
+    ensure_checkpoint_table(cursor)
+    checkpoint = load_checkpoint(cursor, index, table)
+    if checkpoint and arguments.get("reset_checkpoint"):
+        cursor.execute(
+            f"DELETE FROM {CHECKPOINT_TABLE} WHERE source_index = %s AND target_table = %s",
+            (index, table)
+        )
+        checkpoint = None
+    if checkpoint and checkpoint["checkpoint_field"] != field:
+        raise ValueError(
+            f"Checkpoint for {index} -> {table} tracks '{checkpoint['checkpoint_field']}', not '{field}'. "
+            f"Pass reset_checkpoint=true to start over with the new field."
+        )
+    # Persist the bookkeeping table (and any reset) before the long-running load starts
+    cursor.connection.commit()
+
+    filters = [arguments.get("query", {"match_all": {}})]
+    # Checkpoints written before the tiebreaker was dropped carry a stale _shard_doc value
+    high_water_mark = checkpoint["high_water_mark"][:2] if checkpoint and checkpoint["high_water_mark"] else None
+    if field != "_seq_no":
+        filters.append({"exists": {"field": field}})
+    if high_water_mark:
+        filters.append({"range": {field: {"gte": high_water_mark[0]}}})
+
+    return {
+        "field": field,
+        "query": {"bool": {"filter": filters}},
+        "sort": [{field: "asc"}, {key_field: "asc"}, {"_shard_doc": "asc"}],
+        # The largest _shard_doc skips every document at the high-water mark itself
+        "search_after": high_water_mark + [LAST_SHARD_DOC] if high_water_mark else None,
+        "high_water_mark": high_water_mark,
+        "documents_synced": checkpoint["documents_synced"] if checkpoint else 0
+    }
+
+
+def rejected_document(page, reject):
+    """The hit a reject refers to, as dead-letter row data: its _id and source."""
+    hit = page[reject["row"]]
+    return {"_id": hit["_id"], **(hit.get("_source") or {})}
+
+
+def transfer(conn, cursor, arguments, make_writer=None, schema=None):
+    """Run the Elasticsearch -> PostgreSQL pipeline and return counts and timings.
+
+    Each page is converted and loaded with COPY, then committed, so memory is
+    bounded by ``max_buffered_batches`` pages and progress survives failures.
+    Pages go through a TransformPlan compiled from the table ``schema`` (see
+    transform.py); documents it rejects are counted and skipped, and the
+    transfer fails once more than ``max_rejects`` have been seen.
+    With ``incremental`` the checkpoint is advanced in the same transaction as
+    each page, so only documents past the last committed one are re-read; the
+    page's rejected documents are stored in the dead-letter table in that
+    transaction too, since the checkpoint moves past them.
+    ``make_writer(table, columns, on_conflict)`` may supply a PartitionedWriter
+    that loads pages over several connections instead of ``conn``.
+    """
+    index = arguments["index"]
+    table = arguments["table"]
+    on_conflict = arguments.get("on_conflict", "update")
+    batch_size = arguments.get("batch_size", 1000)
+    keep_alive = arguments.get("keep_alive", "2m")
+    max_rejects = arguments.get("max_rejects")
+    es = get_es_client()
+
+    if schema is None:
+        schema = load_table_schema(cursor, table)
+    mapping = arguments.get("mapping")
+    index_fields = None
+    if not mapping or arguments.get("incremental"):
+        index_fields = source_properties(es.indices.get_mapping(index=index))
+    # Without a mapping every column with a same-named field in the index mapping is copied
+    transform = TransformPlan(schema, mapping, None if mapping else index_fields)
+    columns, fields = transform.columns, transform.fields
+
+    plan = None
+    load_id = None
+    query = arguments.get("query", {"match_all": {}})
+    sort = [{"_shard_doc": "asc"}]
+    search_after = None
+    if arguments.get("incremental"):
+        # Changed documents must overwrite the rows loaded by earlier runs
+        on_conflict = "update"
+        plan = incremental_plan(cursor, arguments, fields, index_fields)
+        query, sort, search_after = plan["query"], plan["sort"], plan["search_after"]
+        load_id = new_load_id()
+        if make_writer is not None:
+            raise ValueError("incremental transfers commit checkpoints in page order and use a single writer")
+    writer = make_writer(table, columns, on_conflict) if make_writer is not None else None
+
+    pages = queue.Queue(maxsize=max(1, arguments.get("max_buffered_batches", 4)))
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=read_pages,
+        args=(es, index, query, fields, batch_size, keep_alive, pages, stop, sort, search_after),
+        name="es-reader",
+        daemon=True
+    )
+
+    stats = {"batches": 0, "documents_read": 0, "rows_written": 0, "rows_rejected": 0, "dead_lettered": 0}
+    rejects = []
+    timings = {"wait_for_source_s": 0.0, "transform_s": 0.0, "load_s": 0.0}
+    started = time.perf_counter()
+    reader.start()
+    if writer is not None:
+        writer.start()
+
+    try:
+        while True:
+            phase = time.perf_counter()
+            page = pages.get()
+            timings["wait_for_source_s"] += time.perf_counter() - phase
+            if page is None:
+                break
+            if isinstance(page, Exception):
+                raise page
+
+            phase = time.perf_counter()
+            rows, rejected = transform.convert_hits(page)
+            timings["transform_s"] += time.perf_counter() - phase
+            if rejected:
+                stats["rows_rejected"] += len(rejected)
+                rejects.extend(rejected[:MAX_REPORTED_REJECTS - len(rejects)])
+                if max_rejects is not None and stats["rows_rejected"] > max_rejects:
+                    raise ValueError(
+                        f"{stats['rows_rejected']} documents rejected, more than max_rejects={max_rejects}; "
+                        f"first: {rejects[0]}"
+                    )
+
+            phase = time.perf_counter()
+            if writer is not None:
+                # Hands the page to the writers; blocks while a writer's queue is full
+                writer.submit(rows)
+                stats["batches"] += 1
+                stats["documents_read"] += len(page)
+                timings["load_s"] += time.perf_counter() - phase
+                continue
+            stats["rows_written"] += copy_insert(cursor, table, columns, rows, on_conflict)
+            if load_id and rejected:
+                stats["dead_lettered"] += save_dead_letters(
+                    cursor, table, load_id, [validation_failure(rejected_document(page, reject), reject) for reject in rejected]
+                )
+            stats["batches"] += 1
+            stats["documents_read"] += len(page)
+            if plan:
+                save_checkpoint(
+                    cursor, index, table, plan["field"], page[-1]["sort"][:2],
+                    plan["documents_synced"] + stats["documents_read"], "running"
+                )
+            conn.commit()
+            timings["load_s"] += time.perf_counter() - phase
+    except Exception as e:
+        if writer is not None:
+            stats["rows_written"] = writer.finish()["rows_written"]
+            writer = None
+        raise RuntimeError(
+            f"{e} (transfer stopped after committing {stats['rows_written']} rows in {stats['batches']} batches)"
+        ) from e
+    finally:
+        stop.set()
+        reader.join(timeout=5)
+
+    load = None
+    if writer is not None:
+        phase = time.perf_counter()
+        load = writer.finish()
+        timings["load_s"] += time.perf_counter() - phase
+        stats["rows_written"] = load["rows_written"]
+
+    status = load["status"] if load else "success"
+    result = {
+        "status": "partial" if stats["rows_rejected"] and status == "success" else status,
+        "index": index,
+        "table": table,
+        **stats,
+        "rejects": rejects
+    }
+    if not mapping:
+        result["mapping"] = transform.describe()
+    if load:
+        result.update({
+            "rows_failed": load["rows_failed"],
+            "failed_writers": load["failed_writers"],
+            "writers": load["writers"]
+        })
+    if plan:
+        checkpoint = load_checkpoint(cursor, index, table)
+        high_water_mark = checkpoint["high_water_mark"] if checkpoint else None
+        save_checkpoint(
+            cursor, index, table, plan["field"], high_water_mark,
+            plan["documents_synced"] + stats["documents_read"], "complete"
+        )
+        conn.commit()
+        result["checkpoint"] = {
+            "field": plan["field"],
+            "resumed_from": plan["high_water_mark"],
+            "high_water_mark": high_water_mark
+        }
+        if stats["dead_lettered"]:
+            # The checkpoint has moved past these documents; this is where they can be found and replayed
+            result["dead_letter"] = {"table": DEAD_LETTER_TABLE, "load_id": load_id}
+
+    elapsed = time.perf_counter() - started
+    result.update({key: round(value, 3) for key, value in timings.items()})
+    result.update({
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_sec": round(stats["documents_read"] / elapsed, 1) if elapsed > 0 else None
+    })
+    return result
@@ -0,0 +1,230 @@
+"""
+Connection pool for the PostgreSQL MCP server
+Keeps warm connections between tool calls instead of reconnecting for every request
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool.
+
+    Connections are opened on demand up to ``max_size``. Idle connections above
+    ``min_size`` are closed after ``idle_timeout`` seconds, and a connection that
+    has been idle longer than ``health_check_interval`` is pinged before it is
+    handed out again. ``connection_factory`` is passed through to
+    ``psycopg2.connect`` to open connections of a custom class.
+    """
+
+    def __init__(self, db_config, min_size=1, max_size=10, idle_timeout=300.0,
+                 checkout_timeout=30.0, health_check_interval=30.0, connection_factory=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: need 0 <= min_size <= max_size and max_size >= 1")
+
+        self.db_config = db_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.connection_factory = connection_factory
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, returned_at) pairs, most recently used last
+        self._in_use = set()
+        self._pending = 0  # slots reserved by threads that are still connecting
+        self._closed = False
+
+        self._stats = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "peak_in_use": 0,
+        }
+
+    @property
+    def size(self):
+        """Total number of open connections (idle + checked out)."""
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    def getconn(self):
+        """Check out a healthy connection, waiting if the pool is saturated."""
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+
+                self._evict_idle()
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use.add(conn)
+                    break
+
+                if self.size < self.max_size:
+                    # Reserve the slot before connecting outside the lock
+                    conn = None
+                    self._pending += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"Timed out after {self.checkout_timeout}s waiting for a database connection "
+                        f"(pool saturated at {self.max_size} connections)"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                wait_ms = (time.monotonic() - started) * 1000
+                self._stats["waits"] += 1
+                self._stats["wait_time_ms"] += wait_ms
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+
+        if conn is None:
+            return self._open_reserved()
+
+        if self._is_healthy(conn, returned_at):
+            return self._checked_out(conn)
+
+        with self._cond:
+            self._stats["health_check_failures"] += 1
+            self._stats["connections_closed"] += 1
+            self._in_use.discard(conn)
+            self._pending += 1
+        self._close_quietly(conn)
+        return self._open_reserved()
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool, rolling back any open transaction."""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or conn.closed or self._closed:
+                self._stats["connections_closed"] += 1
+                close_now = True
+            else:
+                self._idle.append((conn, time.monotonic()))
+                close_now = False
+            self._cond.notify()
+
+        if close_now:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        """Return a snapshot of pool usage and saturation metrics."""
+        with self._cond:
+            in_use = len(self._in_use)
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self.size,
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "saturation": round(in_use / self.max_size, 3),
+                "avg_wait_ms": round(snapshot["wait_time_ms"] / snapshot["waits"], 3) if snapshot["waits"] else 0.0,
+            })
+        snapshot["wait_time_ms"] = round(snapshot["wait_time_ms"], 3)
+        snapshot["max_wait_ms"] = round(snapshot["max_wait_ms"], 3)
+        return snapshot
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._stats["connections_closed"] += len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def _open_reserved(self):
+        """Open a new connection for a slot already reserved via ``_pending``."""
+        try:
+            conn = psycopg2.connect(**self.db_config, connection_factory=self.connection_factory)
+        except Exception:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._pending -= 1
+            self._in_use.add(conn)
+            self._stats["connections_created"] += 1
+        return self._checked_out(conn)
+
+    def _checked_out(self, conn):
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], len(self._in_use))
+        return conn
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _evict_idle(self):
+        """Close idle connections past ``idle_timeout``; caller holds the lock."""
+        if self.idle_timeout <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        # Oldest connections sit at the front of the idle list
+        while self._idle and self._idle[0][1] < cutoff and self.size > self.min_size:
+            conn, _ = self._idle.pop(0)
+            self._stats["connections_closed"] += 1
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
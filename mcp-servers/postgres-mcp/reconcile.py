@@ -0,0 +1,273 @@
+"""
+Source/target reconciliation for the PostgreSQL MCP server
+Compares an Elasticsearch index with a PostgreSQL table through per-key content hashes and bucketed digests
+"""
+
+import hashlib
+import json
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
+
+from pipeline import read_pages
+from transform import CONVERTERS, lookup_field, mapping_specs
+
+# Both sides render every mapped value as canonical text before hashing, so a
+# row hash only matches when all of its values match after type conversion.
+NULL_MARKER = "\\N"
+FIELD_SEPARATOR = "\x1f"
+NUMERIC_QUANTUM = Decimal("0.000001")
+MAX_DEPTH = 5
+
+
+def _canonical_numeric(value):
+    number = Decimal(str(value)).quantize(NUMERIC_QUANTUM, rounding=ROUND_HALF_UP).normalize()
+    return "0" if number == 0 else format(number, "f")
+
+
+def _canonical_timestamp(value):
+    value = CONVERTERS["timestamptz"](value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+# Canonical text per mapping type: a Python renderer for Elasticsearch values
+# and the SQL expression producing the same text from the PostgreSQL column
+CANONICAL = {
+    "auto": (str, "{}::text"),
+    "text": (str, "{}::text"),
+    "integer": (lambda value: str(int(value)), "{}::text"),
+    "bigint": (lambda value: str(int(value)), "{}::text"),
+    "decimal": (_canonical_numeric, "trim_scale(round({}::numeric, 6))::text"),
+    "float": (_canonical_numeric, "trim_scale(round({}::numeric, 6))::text"),
+    "boolean": (lambda value: "true" if CONVERTERS["boolean"](value) else "false", "{}::text"),
+    "timestamptz": (_canonical_timestamp, "to_char({}::timestamptz AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US')"),
+    "array": (lambda value: json.dumps(CONVERTERS["array"](value), separators=(",", ":"), ensure_ascii=False), "array_to_json({})::text"),
+}
+
+
+def canonical_value(value, kind):
+    """Render one Elasticsearch value the way the matching SQL expression renders the column."""
+    if value is None:
+        return NULL_MARKER
+    try:
+        return CANONICAL[kind][0](value)
+    except (TypeError, ValueError, ArithmeticError):
+        # Unconvertible source values can never match a stored row
+        return f"!{value!r}"
+
+
+def digest_value(row_hash):
+    """Order-independent contribution of one row hash to a bucket checksum (60 bits)."""
+    return int(row_hash[:15], 16)
+
+
+def bucket_of(key, depth):
+    return hashlib.md5(key.encode()).hexdigest()[:depth]
+
+
+def compile_specs(mapping, key_column):
+    specs = mapping_specs(mapping)
+    for column, _, kind in specs:
+        if kind not in CANONICAL:
+            raise ValueError(f"Column {column}: type '{kind}' cannot be reconciled; leave it out of the mapping")
+    columns = [column for column, _, _ in specs]
+    key_column = key_column or columns[0]
+    if key_column not in columns:
+        raise ValueError(f"key_column '{key_column}' is not a mapped column")
+    return specs, columns.index(key_column)
+
+
+def document_hash(hit, specs, key_position):
+    """Return (canonical key, row hash) for one search hit."""
+    source = hit.get("_source") or {}
+    values = [
+        canonical_value(hit["_id"] if field == "_id" else lookup_field(source, field), kind)
+        for _, field, kind in specs
+    ]
+    return values[key_position], hashlib.md5(FIELD_SEPARATOR.join(values).encode()).hexdigest()
+
+
+def row_hash_query(table, specs, key_position, where):
+    """SQL selecting (k, h): the canonical key and row hash of every target row.
+
+    The statements built on this run without bound parameters, so ``where``
+    may contain a literal '%'.
+    """
+    expressions = [f"coalesce({CANONICAL[kind][1].format(column)}, '{NULL_MARKER}')" for column, _, kind in specs]
+    return (
+        f"SELECT {expressions[key_position]} AS k, md5(concat_ws(chr(31), {', '.join(expressions)})) AS h "
+        f"FROM {table} WHERE {where or 'TRUE'}"
+    )
+
+
+def scan_hits(es, index, query, specs, batch_size, keep_alive):
+    """Yield every matching hit from a PIT scan, reading ahead on a background thread."""
+    pages = queue.Queue(maxsize=4)
+    stop = threading.Event()
+    fields = [(field, None) for _, field, _ in specs]
+    reader = threading.Thread(
+        target=read_pages,
+        args=(es, index, query, fields, batch_size, keep_alive, pages, stop, [{"_shard_doc": "asc"}]),
+        name="es-reconcile-reader",
+        daemon=True
+    )
+    reader.start()
+    try:
+        while True:
+            page = pages.get()
+            if page is None:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield from page
+    finally:
+        stop.set()
+        reader.join(timeout=5)
+
+
+def source_digests(es, arguments, specs, key_position, depth):
+    """Stream the index once and fold row hashes into {bucket: [count, checksum]}."""
+    digests = {}
+    for hit in scan_hits(es, arguments["index"], arguments.get("query", {"match_all": {}}), specs,
+                         arguments.get("batch_size", 1000), arguments.get("keep_alive", "2m")):
+        key, row_hash = document_hash(hit, specs, key_position)
+        bucket = digests.setdefault(bucket_of(key, depth), [0, 0])
+        bucket[0] += 1
+        bucket[1] += digest_value(row_hash)
+    return digests
+
+
+def target_digests(conn, table, specs, key_position, where, depth):
+    """Compute {bucket: [count, checksum]} inside PostgreSQL; only one row per bucket comes back."""
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL TIME ZONE 'UTC'")
+        cursor.execute(
+            f"SELECT left(md5(k), {int(depth)}), count(*), sum(('x' || left(h, 15))::bit(60)::bigint) "
+            f"FROM ({row_hash_query(table, specs, key_position, where)}) AS row_hashes GROUP BY 1"
+        )
+        return {bucket: [count, int(checksum)] for bucket, count, checksum in cursor.fetchall()}
+
+
+def mismatched_buckets(source, target):
+    return sorted(bucket for bucket in source.keys() | target.keys() if source.get(bucket) != target.get(bucket))
+
+
+def merkle_levels(source, target, depth):
+    """Roll leaf digests up by key-hash prefix and count mismatched nodes per level."""
+    levels = []
+    for level in range(1, depth + 1):
+        rolled = []
+        for digests in (source, target):
+            nodes = {}
+            for bucket, (count, checksum) in digests.items():
+                node = nodes.setdefault(bucket[:level], [0, 0])
+                node[0] += count
+                node[1] += checksum
+            rolled.append(nodes)
+        levels.append({
+            "depth": level,
+            "nodes": len(rolled[0].keys() | rolled[1].keys()),
+            "mismatched": len(mismatched_buckets(*rolled))
+        })
+    return levels
+
+
+def drill_down(es, conn, arguments, specs, key_position, depth, buckets, max_ids):
+    """Compare per-key hashes inside the given buckets and classify the differing keys."""
+    wanted = set(buckets)
+    source = {}
+    for hit in scan_hits(es, arguments["index"], arguments.get("query", {"match_all": {}}), specs,
+                         arguments.get("batch_size", 1000), arguments.get("keep_alive", "2m")):
+        key, row_hash = document_hash(hit, specs, key_position)
+        if bucket_of(key, depth) in wanted:
+            source[key] = row_hash
+
+    found = {"missing_in_target": [], "missing_in_source": [], "different": []}
+    counts = dict.fromkeys(found, 0)
+
+    def record(kind, key):
+        counts[kind] += 1
+        if len(found[kind]) < max_ids:
+            found[kind].append(key)
+
+    bucket_list = ", ".join(f"'{bucket}'" for bucket in sorted(wanted))
+    with conn.cursor(name=f"reconcile_{uuid.uuid4().hex[:12]}") as cursor:
+        cursor.itersize = 10000
+        cursor.execute(
+            f"SELECT k, h FROM ({row_hash_query(arguments['table'], specs, key_position, arguments.get('where'))}) "
+            f"AS row_hashes WHERE left(md5(k), {int(depth)}) IN ({bucket_list})"
+        )
+        for key, row_hash in cursor:
+            source_hash = source.pop(key, None)
+            if source_hash is None:
+                record("missing_in_source", key)
+            elif source_hash != row_hash:
+                record("different", key)
+    for key in source:
+        record("missing_in_target", key)
+
+    return {kind: {"count": counts[kind], "ids": found[kind]} for kind in found}
+
+
+def reconcile(conn, es, arguments):
+    """Reconcile an index with a table and report mismatched buckets and keys.
+
+    Rows are hashed over the canonical text of every mapped column and summed
+    into buckets by the hash of their key. PostgreSQL computes its bucket
+    digests in SQL while the index is scanned, so only bucket summaries cross
+    the wire; per-key hashes are compared only inside mismatched buckets.
+    """
+    depth = arguments.get("depth", 3)
+    if not 1 <= depth <= MAX_DEPTH:
+        raise ValueError(f"depth must be between 1 and {MAX_DEPTH}")
+    specs, key_position = compile_specs(arguments["mapping"], arguments.get("key_column"))
+    max_ids = arguments.get("max_ids", 100)
+    max_buckets = arguments.get("max_drilldown_buckets", 64)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="pg-reconcile") as executor:
+        target_future = executor.submit(
+            target_digests, conn, arguments["table"], specs, key_position, arguments.get("where"), depth
+        )
+        source = source_digests(es, arguments, specs, key_position, depth)
+        target = target_future.result()
+    digests_done = time.perf_counter()
+
+    mismatched = mismatched_buckets(source, target)
+    result = {
+        "status": "match" if not mismatched else "mismatch",
+        "index": arguments["index"],
+        "table": arguments["table"],
+        "key_column": specs[key_position][0],
+        "source_documents": sum(count for count, _ in source.values()),
+        "target_rows": sum(count for count, _ in target.values()),
+        "buckets": {
+            "depth": depth,
+            "compared": len(source.keys() | target.keys()),
+            "mismatched": len(mismatched)
+        },
+        "levels": merkle_levels(source, target, depth)
+    }
+
+    if mismatched:
+        drilled = mismatched[:max_buckets]
+        result["drilled_buckets"] = drilled
+        result["skipped_buckets"] = len(mismatched) - len(drilled)
+        result.update(drill_down(es, conn, arguments, specs, key_position, depth, drilled, max_ids))
+    conn.rollback()
+
+    finished = time.perf_counter()
+    result.update({
+        "digest_s": round(digests_done - started, 3),
+        "drill_down_s": round(finished - digests_done, 3),
+        "elapsed_s": round(finished - started, 3)
+    })
+    return result
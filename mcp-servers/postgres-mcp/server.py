@@ -4,18 +4,35 @@ PostgreSQL MCP Server
 Provides tools for interacting with PostgreSQL through the Model Context Protocol
 """
 
-import json
+import asyncio
+import contextvars
 import os
-import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import partial
 from typing import Any, Sequence
-from datetime import datetime
 
-import psycopg2
-from psycopg2.extras import RealDictCursor, execute_batch
+from psycopg2.extras import RealDictCursor
 from mcp.server import Server
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 from mcp.server.stdio import stdio_server
 
+from bulkload import batch_insert, copy_insert
+from cache import TTLCache
+from cursors import QueryCursors
+from deadletter import (DEAD_LETTER_TABLE, ensure_dead_letter_table, load_failure, load_isolating, new_load_id,
+                        save_dead_letters, summary, validation_failure)
+from deferred import DEFERRED_TABLE, DeferredIndexes
+from encoding import DEFAULT_FORMAT, FORMAT_PROPERTY, FORMATS, encode, response_format
+from metrics import MetricsExporter, ToolMetrics, record_error, serializer, tool_phase
+from pipeline import CHECKPOINT_TABLE, get_es_client, transfer
+from pool import ConnectionPool
+from reconcile import MAX_DEPTH, reconcile
+from statements import PreparedStatements, StatementCachingConnection, to_server_placeholders
+from transform import MAX_REPORTED_REJECTS, TransformPlan, load_table_schema
+from writers import PartitionedWriter
+
 # Database connection parameters
 DB_CONFIG = {
     "host": os.getenv("POSTGRES_HOST", "postgres"),
@@ -25,33 +42,340 @@ DB_CONFIG = {
     "password": os.getenv("POSTGRES_PASSWORD", "admin123")
 }
 
+# Connection pool settings (sizes in connections, timeouts in seconds)
+POOL_CONFIG = {
+    "min_size": int(os.getenv("PG_POOL_MIN_SIZE", "1")),
+    "max_size": int(os.getenv("PG_POOL_MAX_SIZE", "10")),
+    "idle_timeout": float(os.getenv("PG_POOL_IDLE_TIMEOUT", "300")),
+    "checkout_timeout": float(os.getenv("PG_POOL_CHECKOUT_TIMEOUT", "30")),
+    "health_check_interval": float(os.getenv("PG_POOL_HEALTH_CHECK_INTERVAL", "30"))
+}
+
+
+def parse_tool_settings(value: str, defaults: dict) -> dict:
+    """Merge 'tool=value,tool=value' overrides from the environment into defaults."""
+    settings = dict(defaults)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        tool, _, setting = item.partition("=")
+        settings[tool.strip()] = int(setting)
+    return settings
+
+
+# Maximum concurrent calls per tool; tools not listed share the pool size as their limit
+TOOL_CONCURRENCY = parse_tool_settings(os.getenv("PG_TOOL_CONCURRENCY", ""), {
+    "bulk_insert": 2,
+    "create_table": 1,
+    "execute_write_query": 4,
+    "transfer_from_elasticsearch": 1,
+    "reconcile_with_elasticsearch": 1
+})
+
+# Statement timeouts per tool in milliseconds, applied to every statement a tool runs
+DEFAULT_STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "30000"))
+STATEMENT_TIMEOUTS_MS = parse_tool_settings(os.getenv("PG_STATEMENT_TIMEOUTS", ""), {
+    "bulk_insert": 300000,
+    "transfer_from_elasticsearch": 300000,
+    "reconcile_with_elasticsearch": 600000
+})
+
+# Schema metadata cache: entries live METADATA_CACHE_TTL seconds, LRU-evicted beyond METADATA_CACHE_SIZE
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "300"))
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "256"))
+
+# execute_query paging: rows per page by default / at most, and limits on cursors kept open between calls
+QUERY_PAGE_SIZE = int(os.getenv("PG_QUERY_PAGE_SIZE", "500"))
+QUERY_MAX_PAGE_SIZE = int(os.getenv("PG_QUERY_MAX_PAGE_SIZE", "5000"))
+MAX_OPEN_CURSORS = int(os.getenv("PG_MAX_OPEN_CURSORS", "4"))
+CURSOR_IDLE_TIMEOUT = float(os.getenv("PG_CURSOR_IDLE_TIMEOUT", "120"))
+
+# Parallel loading: most writer connections one load may use, and rows per writer commit
+MAX_WRITERS = int(os.getenv("PG_MAX_WRITERS", "4"))
+DEFAULT_COMMIT_ROWS = int(os.getenv("PG_COMMIT_ROWS", "5000"))
+
+# Deferred index rebuilds: per-statement timeout (0 = none) and optional maintenance_work_mem, e.g. '512MB'
+INDEX_BUILD_TIMEOUT_MS = int(os.getenv("PG_INDEX_BUILD_TIMEOUT_MS", "0"))
+MAINTENANCE_WORK_MEM = os.getenv("PG_MAINTENANCE_WORK_MEM") or None
+
+# Prepared statements kept per pooled connection for insert_data / execute_write_query (0 = off)
+PREPARED_STATEMENTS_PER_CONNECTION = int(os.getenv("PG_PREPARED_STATEMENTS", "64"))
+
+# Prometheus metrics export: textfile path and/or local /metrics port (both off by default)
+METRICS_FILE = os.getenv("MCP_METRICS_FILE") or None
+METRICS_PORT = int(os.getenv("MCP_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("MCP_METRICS_HOST", "127.0.0.1")
+METRICS_INTERVAL = float(os.getenv("MCP_METRICS_INTERVAL", "15"))
+
+# Serializing a tool's response is booked to the calling tool's "serialize" phase
+encode = serializer(encode)
+
 # Initialize MCP server
 app = Server("postgres-mcp")
 
+# Per-tool call counts, latency, phase timings, rows and bytes
+tool_metrics = ToolMetrics("postgres-mcp")
+
+# Serialized get_schema / list_tables responses, keyed by (tool, table, response format),
+# plus the column/constraint info loads are validated against, keyed by ("table_schema", table)
+metadata_cache = TTLCache(maxsize=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL)
+
+
+def metadata_key(name: str, arguments: Any) -> tuple:
+    """Cache key for a get_schema / list_tables response."""
+    arguments = arguments or {}
+    return (name, arguments.get("table"), arguments.get("format") or DEFAULT_FORMAT)
+
+
+def invalidate_table_metadata(table: str) -> None:
+    """Forget cached metadata that a newly created table makes stale."""
+    metadata_cache.invalidate(*[
+        key
+        for fmt in FORMATS
+        for key in (("get_schema", table, fmt), ("list_tables", None, fmt))
+    ], ("table_schema", table))
 
-def get_connection():
-    """Get a database connection."""
-    return psycopg2.connect(**DB_CONFIG)
+# Shared connection pool used by every tool
+db_pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG, connection_factory=StatementCachingConnection)
+
+# Repeated insert_data / execute_write_query shapes reuse a statement prepared on their connection
+prepared_statements = PreparedStatements(max_per_connection=PREPARED_STATEMENTS_PER_CONNECTION)
+
+
+class TimedDictCursor(RealDictCursor):
+    """RealDictCursor that books statements, fetches and COPY to the current tool call's query phase."""
+
+    def execute(self, query, vars=None):
+        with tool_phase("query"):
+            return super().execute(query, vars)
+
+    def fetchone(self):
+        with tool_phase("query"):
+            return super().fetchone()
+
+    def fetchmany(self, size=None):
+        with tool_phase("query"):
+            return super().fetchmany(size)
+
+    def fetchall(self):
+        with tool_phase("query"):
+            return super().fetchall()
+
+    def copy_expert(self, sql, file, size=8192):
+        with tool_phase("query"):
+            return super().copy_expert(sql, file, size)
+
+
+@contextmanager
+def checkout():
+    """db_pool.connection() that books the checkout wait to the tool call's connect phase."""
+    with tool_phase("connect"):
+        conn = db_pool.getconn()
+    try:
+        yield conn
+    finally:
+        db_pool.putconn(conn)
+
+# Server-side cursors for execute_query results that span several pages
+query_cursors = QueryCursors(db_pool, max_open=MAX_OPEN_CURSORS, idle_timeout=CURSOR_IDLE_TIMEOUT)
+
+# Blocking psycopg2 work runs on these threads so the stdio event loop stays responsive
+db_executor = ThreadPoolExecutor(max_workers=POOL_CONFIG["max_size"], thread_name_prefix="postgres-tool")
+tool_limits: dict[str, asyncio.Semaphore] = {}
+
+
+# Parallel-load arguments shared by bulk_insert and transfer_from_elasticsearch
+WRITER_PROPERTIES = {
+    "writers": {
+        "type": "integer",
+        "description": f"Writer connections loading in parallel, rows partitioned by a hash of the first column (default: 1, at most {MAX_WRITERS}). With more than one writer each commits on its own, so a failure leaves other writers' rows in place.",
+        "default": 1
+    },
+    "commit_rows": {
+        "type": "integer",
+        "description": f"Rows each parallel writer loads per transaction (default: {DEFAULT_COMMIT_ROWS})",
+        "default": DEFAULT_COMMIT_ROWS
+    },
+    "max_retries": {
+        "type": "integer",
+        "description": "Retries of a failed commit on the same writer after deadlocks, serialization failures or lost connections (default: 2)",
+        "default": 2
+    }
+}
+
+
+# Index-aware load arguments shared by bulk_insert and transfer_from_elasticsearch
+DEFERRED_INDEX_PROPERTIES = {
+    "defer_indexes": {
+        "type": "boolean",
+        "description": "For full reloads: record and drop the table's secondary (non-unique) indexes and disable its triggers, load, then rebuild the indexes, re-enable the triggers and ANALYZE. Triggers do not fire for the loaded rows (default: false)",
+        "default": False
+    },
+    "rebuild_concurrently": {
+        "type": "boolean",
+        "description": "Rebuild indexes with CREATE INDEX CONCURRENTLY so the table stays writable (default: true); false is faster when nothing else writes to the table",
+        "default": True
+    },
+    "index_build_parallelism": {
+        "type": "integer",
+        "description": "Indexes rebuilt at the same time, each on its own connection (default: 2)",
+        "default": 2
+    }
+}
+
+
+def deferred_indexes(name: str, arguments: Any, table: str):
+    """Context for a load: defers the table's indexes and triggers when asked, otherwise does nothing."""
+    if not arguments.get("defer_indexes"):
+        return nullcontext()
+    # The first deferred load creates the etl_deferred_objects table
+    invalidate_table_metadata(DEFERRED_TABLE)
+    return DeferredIndexes(
+        db_pool,
+        table,
+        concurrently=arguments.get("rebuild_concurrently", True),
+        parallelism=arguments.get("index_build_parallelism", 2),
+        statement_timeout_ms=STATEMENT_TIMEOUTS_MS.get(name, DEFAULT_STATEMENT_TIMEOUT_MS),
+        build_timeout_ms=INDEX_BUILD_TIMEOUT_MS,
+        maintenance_work_mem=MAINTENANCE_WORK_MEM
+    )
+
+
+# Validation arguments shared by bulk_insert and transfer_from_elasticsearch
+REJECT_PROPERTIES = {
+    "max_rejects": {
+        "type": "integer",
+        "description": f"Fail the call once more than this many rows are rejected by validation (default: no limit). Rejected rows are skipped, counted, and the first {MAX_REPORTED_REJECTS} are listed with the reason."
+    }
+}
+
+
+def table_schema(table: str, cursor=None) -> dict:
+    """Columns and CHECK constraints of ``table`` for the transform engine, cached like get_schema."""
+    key = ("table_schema", table)
+    schema = metadata_cache.get(key)
+    if schema is None:
+        if cursor is None:
+            with checkout() as conn:
+                schema = load_table_schema(conn.cursor(cursor_factory=TimedDictCursor), table)
+        else:
+            schema = load_table_schema(cursor, table)
+        metadata_cache.set(key, schema)
+    return schema
+
+
+def bulk_rows(arguments: Any, columns: list, cursor=None) -> tuple[list, list]:
+    """Turn bulk_insert data into rows; unless validate=false, bad rows are set aside as rejects."""
+    data = arguments["data"]
+    if not arguments.get("validate", True):
+        return [[row.get(col) for col in columns] for row in data], []
+
+    plan = TransformPlan(table_schema(arguments["table"], cursor), columns=columns)
+    with tool_phase("transform"):
+        rows, rejects = plan.convert_records(data)
+    max_rejects = arguments.get("max_rejects")
+    if max_rejects is not None and len(rejects) > max_rejects:
+        raise ValueError(f"{len(rejects)} rows rejected, more than max_rejects={max_rejects}; first: {rejects[0]}")
+    return rows, rejects
+
+
+def dead_letter_id(arguments: Any):
+    """A fresh load ID when refused rows should go to the dead-letter table, else None."""
+    return new_load_id() if arguments.get("on_error", "dead_letter") == "dead_letter" else None
+
+
+def dead_letter_report(load_id, count: int, entries: list) -> dict:
+    """Result fields describing where a load's refused rows went."""
+    report = {"dead_lettered": count, "dead_letters": summary(entries[:MAX_REPORTED_REJECTS])}
+    if count:
+        report["dead_letter"] = {"table": DEAD_LETTER_TABLE, "load_id": load_id}
+        # The first dead-lettered load creates the etl_dead_letters table
+        invalidate_table_metadata(DEAD_LETTER_TABLE)
+    return report
+
+
+def query_page_size(arguments: Any) -> int:
+    """Rows per execute_query / fetch_query_page page, capped at QUERY_MAX_PAGE_SIZE."""
+    page_size = arguments.get("page_size", QUERY_PAGE_SIZE)
+    # An empty page would read as the end of the result
+    if page_size < 1:
+        raise ValueError(f"page_size must be at least 1, got {page_size}")
+    return min(page_size, QUERY_MAX_PAGE_SIZE)
+
+
+def writer_count(arguments: Any) -> int:
+    """Writer connections a load asked for, capped at MAX_WRITERS."""
+    return max(1, min(arguments.get("writers", 1), MAX_WRITERS))
+
+
+def writer_factory(name: str, arguments: Any):
+    """Build PartitionedWriters for a load that asked for more than one writer."""
+    return partial(
+        PartitionedWriter,
+        db_pool,
+        writers=writer_count(arguments),
+        commit_rows=arguments.get("commit_rows", DEFAULT_COMMIT_ROWS),
+        max_retries=arguments.get("max_retries", 2),
+        statement_timeout_ms=STATEMENT_TIMEOUTS_MS.get(name, DEFAULT_STATEMENT_TIMEOUT_MS)
+    )
+
+
+def tool_limit(name: str) -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent calls of one tool."""
+    if name not in tool_limits:
+        tool_limits[name] = asyncio.Semaphore(TOOL_CONCURRENCY.get(name, POOL_CONFIG["max_size"]))
+    return tool_limits[name]
 
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """List available PostgreSQL tools."""
-    return [
+    tools = [
         Tool(
             name="execute_query",
-            description="Execute a SELECT query and return results. For safety, only SELECT queries are allowed.",
+            description="Execute a SELECT query and return the first page of results. For safety, only SELECT queries are allowed. If 'truncated' is true, pass the returned cursor to fetch_query_page for more rows.",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "query": {
                         "type": "string",
                         "description": "SQL SELECT query to execute"
+                    },
+                    "page_size": {
+                        "type": "integer",
+                        "description": f"Rows per page (default: {QUERY_PAGE_SIZE}, maximum: {QUERY_MAX_PAGE_SIZE})",
+                        "default": QUERY_PAGE_SIZE
+                    },
+                    "max_rows": {
+                        "type": "integer",
+                        "description": "Stop after this many rows in total across all pages (default: no limit)"
                     }
                 },
                 "required": ["query"]
             }
         ),
+        Tool(
+            name="fetch_query_page",
+            description="Fetch the next page of an execute_query result using its cursor, or close the cursor early.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "cursor": {
+                        "type": "string",
+                        "description": "Cursor returned by execute_query or a previous fetch_query_page call"
+                    },
+                    "page_size": {
+                        "type": "integer",
+                        "description": f"Rows per page (default: {QUERY_PAGE_SIZE}, maximum: {QUERY_MAX_PAGE_SIZE})",
+                        "default": QUERY_PAGE_SIZE
+                    },
+                    "close": {
+                        "type": "boolean",
+                        "description": "Close the cursor instead of fetching (default: false)",
+                        "default": False
+                    }
+                },
+                "required": ["cursor"]
+            }
+        ),
         Tool(
             name="insert_data",
             description="Insert a single row of data into a table.",
@@ -72,7 +396,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="bulk_insert",
-            description="Insert multiple rows of data into a table efficiently using batch insert.",
+            description="Insert multiple rows of data into a table efficiently using COPY (or batched INSERTs). Rows that fail validation against the table schema or that PostgreSQL refuses are isolated, skipped and kept in a dead-letter table while the rest commit. Reports rows/sec.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -92,7 +416,27 @@ async def list_tools() -> list[Tool]:
                         "description": "Conflict resolution strategy: 'ignore', 'update', or 'error' (default: 'error')",
                         "enum": ["ignore", "update", "error"],
                         "default": "error"
-                    }
+                    },
+                    "method": {
+                        "type": "string",
+                        "description": "Load path: 'copy' streams rows with COPY FROM STDIN, 'batch' uses batched INSERT statements (default: 'copy')",
+                        "enum": ["copy", "batch"],
+                        "default": "copy"
+                    },
+                    "on_error": {
+                        "type": "string",
+                        "description": f"Rows PostgreSQL refuses (bad values, constraint violations, duplicate keys with on_conflict 'error'): 'dead_letter' bisects the batch under savepoints to isolate them, loads the rest and stores the refused and rejected rows with the error text in {DEAD_LETTER_TABLE} under the returned load_id; 'abort' rolls back the whole load (default: 'dead_letter')",
+                        "enum": ["dead_letter", "abort"],
+                        "default": "dead_letter"
+                    },
+                    "validate": {
+                        "type": "boolean",
+                        "description": "Convert values to the columns' types and check NOT NULL, length, range and simple CHECK constraints before loading, skipping failing rows instead of failing the whole load (default: true)",
+                        "default": True
+                    },
+                    **REJECT_PROPERTIES,
+                    **WRITER_PROPERTIES,
+                    **DEFERRED_INDEX_PROPERTIES
                 },
                 "required": ["table", "data"]
             }
@@ -175,18 +519,147 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["query"]
             }
+        ),
+        Tool(
+            name="transfer_from_elasticsearch",
+            description="Copy documents from an Elasticsearch index straight into a PostgreSQL table on the server (scan -> type conversion and validation against the table schema -> COPY). Documents that would violate the schema are skipped and reported. Only counts, timings and rejects are returned, never row data.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "string",
+                        "description": "Source Elasticsearch index"
+                    },
+                    "table": {
+                        "type": "string",
+                        "description": "Target PostgreSQL table; its first mapped column is treated as the primary key for conflicts"
+                    },
+                    "mapping": {
+                        "type": "object",
+                        "description": "Target column -> source field name, or -> {\"field\": name, \"type\": one of auto, text, integer, bigint, decimal, float, boolean, timestamptz, array, jsonb}. Dotted names read nested fields; '_id' reads the document ID. 'auto' converts to the column's PostgreSQL type. Default: every table column with a same-named field in the index mapping."
+                    },
+                    "query": {
+                        "type": "object",
+                        "description": "Elasticsearch query DSL selecting the documents to copy (default: match_all)"
+                    },
+                    "on_conflict": {
+                        "type": "string",
+                        "description": "Conflict resolution strategy: 'ignore', 'update', or 'error' (default: 'update')",
+                        "enum": ["ignore", "update", "error"],
+                        "default": "update"
+                    },
+                    "batch_size": {
+                        "type": "integer",
+                        "description": "Documents per page read from Elasticsearch and committed to PostgreSQL (default: 1000)",
+                        "default": 1000
+                    },
+                    "max_buffered_batches": {
+                        "type": "integer",
+                        "description": "Pages the reader may run ahead of the loader before it blocks (default: 4)",
+                        "default": 4
+                    },
+                    "incremental": {
+                        "type": "boolean",
+                        "description": f"Only copy documents changed since the last checkpoint for this index/table pair, upserting them. Checkpoints are kept in the etl_checkpoints table and a crashed run resumes after its last committed batch. The checkpoint moves past rejected documents, so they are stored in {DEAD_LETTER_TABLE} under the returned load_id (default: false)",
+                        "default": False
+                    },
+                    "checkpoint_field": {
+                        "type": "string",
+                        "description": "Source field that increases when a document changes, e.g. 'updated_at', 'created_at' or '_seq_no' (single-shard indices only). Required with incremental; it must be in the index mapping"
+                    },
+                    "key_field": {
+                        "type": "string",
+                        "description": "Unique sortable source field used to break ties between equal checkpoint values (default: source field of the first mapped column)"
+                    },
+                    "reset_checkpoint": {
+                        "type": "boolean",
+                        "description": "Discard the stored checkpoint and resync from the beginning (default: false)",
+                        "default": False
+                    },
+                    **REJECT_PROPERTIES,
+                    **WRITER_PROPERTIES,
+                    **DEFERRED_INDEX_PROPERTIES
+                },
+                "required": ["index", "table"]
+            }
+        ),
+        Tool(
+            name="reconcile_with_elasticsearch",
+            description="Check that a PostgreSQL table matches an Elasticsearch index value by value. Both sides hash every mapped column per key and compare bucketed digests; only mismatched buckets are drilled into, and the differing IDs are listed.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "string",
+                        "description": "Source Elasticsearch index"
+                    },
+                    "table": {
+                        "type": "string",
+                        "description": "Target PostgreSQL table"
+                    },
+                    "mapping": {
+                        "type": "object",
+                        "description": "Same mapping as transfer_from_elasticsearch (jsonb columns are not supported). Give numeric and timestamp columns a type so values compare after conversion; 'auto' compares text renderings."
+                    },
+                    "key_column": {
+                        "type": "string",
+                        "description": "Mapped column that identifies a row (default: first mapped column)"
+                    },
+                    "query": {
+                        "type": "object",
+                        "description": "Elasticsearch query DSL selecting the source documents (default: match_all)"
+                    },
+                    "where": {
+                        "type": "string",
+                        "description": "SQL condition selecting the target rows, e.g. \"id <> 'SAMPLE-000'\" (default: all rows)"
+                    },
+                    "depth": {
+                        "type": "integer",
+                        "description": f"Hex digits of the key hash per bucket: 16^depth buckets (1-{MAX_DEPTH}, default: 3)",
+                        "default": 3
+                    },
+                    "max_drilldown_buckets": {
+                        "type": "integer",
+                        "description": "Mismatched buckets compared key by key (default: 64)",
+                        "default": 64
+                    },
+                    "max_ids": {
+                        "type": "integer",
+                        "description": "IDs listed per mismatch kind (default: 100)",
+                        "default": 100
+                    },
+                    "batch_size": {
+                        "type": "integer",
+                        "description": "Documents per page read from Elasticsearch (default: 1000)",
+                        "default": 1000
+                    }
+                },
+                "required": ["index", "table", "mapping"]
+            }
+        ),
+        Tool(
+            name="server_stats",
+            description="Show per-tool call metrics (latency percentiles, connect/query/serialize timings, rows, bytes, error classes), connection pool usage/saturation, metadata cache and prepared statement hit/miss metrics for this server.",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
         )
     ]
+    
+    for tool in tools:
+        tool.inputSchema["properties"]["format"] = FORMAT_PROPERTY
+    return tools
 
 
-@app.call_tool()
-async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
-    """Handle tool execution."""
+def run_tool(name: str, arguments: Any) -> list[TextContent]:
+    """Execute a database tool on a pooled connection. Runs on a db_executor thread."""
     
     try:
-        conn = get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # Reject an unknown format before any work is done
+        response_format(arguments)
         
+        # Query tools manage their own (possibly long-lived) connections
         if name == "execute_query":
             query = arguments["query"].strip()
             
@@ -197,260 +670,439 @@ async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageCo
                     text="Error: Only SELECT queries are allowed for safety. Use specific tools for INSERT, UPDATE, DELETE."
                 )]
             
-            cursor.execute(query)
-            results = cursor.fetchall()
-            
-            # Convert to list of dicts
-            results_list = [dict(row) for row in results]
-            
-            cursor.close()
-            conn.close()
+            with tool_phase("query"):
+                page = query_cursors.execute(
+                    query,
+                    query_page_size(arguments),
+                    max_rows=arguments.get("max_rows"),
+                    statement_timeout_ms=STATEMENT_TIMEOUTS_MS.get(name, DEFAULT_STATEMENT_TIMEOUT_MS)
+                )
             
             return [TextContent(
                 type="text",
-                text=json.dumps({
-                    "count": len(results_list),
-                    "rows": results_list
-                }, indent=2, default=str)
+                text=encode({"count": len(page["rows"]), **page}, arguments)
             )]
         
-        elif name == "insert_data":
-            table = arguments["table"]
-            data = arguments["data"]
-            
-            columns = list(data.keys())
-            values = list(data.values())
+        elif name == "fetch_query_page":
+            cursor_id = arguments["cursor"]
             
-            placeholders = ", ".join(["%s"] * len(columns))
-            columns_str = ", ".join(columns)
-            
-            query = f"INSERT INTO {table} ({columns_str}) VALUES ({placeholders}) RETURNING *"
-            cursor.execute(query, values)
-            result = cursor.fetchone()
+            if arguments.get("close"):
+                closed = query_cursors.close(cursor_id)
+                return [TextContent(
+                    type="text",
+                    text=encode({"cursor": cursor_id, "closed": closed}, arguments)
+                )]
             
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with tool_phase("query"):
+                page = query_cursors.fetch(
+                    cursor_id,
+                    query_page_size(arguments)
+                )
             
             return [TextContent(
                 type="text",
-                text=json.dumps({
-                    "status": "success",
-                    "inserted_row": dict(result)
-                }, indent=2, default=str)
+                text=encode({"count": len(page["rows"]), **page}, arguments)
             )]
         
-        elif name == "bulk_insert":
-            table = arguments["table"]
+        elif name == "bulk_insert" and writer_count(arguments) > 1:
+            # Each writer checks out its own connection, so none is held here
             data = arguments["data"]
-            on_conflict = arguments.get("on_conflict", "error")
-            
+            if arguments.get("method", "copy") != "copy":
+                raise ValueError("Parallel writers load with COPY; use method 'copy' or writers=1")
             if not data:
                 return [TextContent(
                     type="text",
-                    text=json.dumps({"status": "success", "inserted": 0})
+                    text=encode({"status": "success", "inserted": 0}, arguments)
                 )]
             
-            # Get columns from first row
+            table = arguments["table"]
             columns = list(data[0].keys())
-            columns_str = ", ".join(columns)
-            placeholders = ", ".join(["%s"] * len(columns))
+            rows, rejects = bulk_rows(arguments, columns)
+            load_id = dead_letter_id(arguments)
+            if load_id:
+                with checkout() as conn:
+                    cursor = conn.cursor(cursor_factory=TimedDictCursor)
+                    # Created before the writers start so they never race to create it
+                    ensure_dead_letter_table(cursor)
+                    save_dead_letters(cursor, table, load_id, [validation_failure(data[r["row"]], r) for r in rejects])
+                    conn.commit()
+            with deferred_indexes(name, arguments, table) as deferred:
+                writer = writer_factory(name, arguments)(
+                    table, columns, arguments.get("on_conflict", "error"),
+                    dead_letter_id=load_id, max_reported=MAX_REPORTED_REJECTS
+                )
+                with tool_phase("query"):
+                    writer.start()
+                    writer.submit(rows)
+                    load = writer.finish()
             
-            # Build base query
-            query = f"INSERT INTO {table} ({columns_str}) VALUES ({placeholders})"
-            
-            # Add conflict resolution
-            if on_conflict == "ignore":
-                # Assume first column is primary key
-                query += f" ON CONFLICT DO NOTHING"
-            elif on_conflict == "update":
-                # Update all columns except the first (assumed to be PK)
-                update_cols = ", ".join([f"{col} = EXCLUDED.{col}" for col in columns[1:]])
-                query += f" ON CONFLICT ({columns[0]}) DO UPDATE SET {update_cols}"
-            
-            # Prepare data tuples
-            values_list = [[row.get(col) for col in columns] for row in data]
-            
-            # Execute batch insert
-            execute_batch(cursor, query, values_list, page_size=100)
-            
-            conn.commit()
-            inserted_count = cursor.rowcount
+            refused = load["rows_dead_lettered"]
+            result = {
+                "status": "partial" if (rejects or refused) and load["status"] == "success" else load["status"],
+                "method": "copy",
+                "inserted": load["rows_written"],
+                "failed": load["rows_failed"],
+                "rejected": len(rejects),
+                "rejects": rejects[:MAX_REPORTED_REJECTS],
+                "refused": refused,
+                **(dead_letter_report(load_id, len(rejects) + refused, load["dead_letters"]) if load_id else {}),
+                "total_rows": len(data),
+                "elapsed_ms": round(load["elapsed_s"] * 1000, 2),
+                "rows_per_sec": load["rows_per_sec"],
+                "writers": load["writers"]
+            }
+            if deferred:
+                result["index_maintenance"] = deferred.report()
             
-            cursor.close()
-            conn.close()
+            # Same limit as the single-writer path; the writers have committed their units by now
+            max_rejects = arguments.get("max_rejects")
+            problems = len(rejects) + refused + load["rows_failed"]
+            if max_rejects is not None and problems > max_rejects:
+                raise ValueError(
+                    f"{problems} rows rejected, refused or failed, more than max_rejects={max_rejects}; "
+                    f"{load['rows_written']} rows were already committed by the parallel writers"
+                    + (f" (dead letters under load_id {load_id})" if load_id else "")
+                )
             
             return [TextContent(
                 type="text",
-                text=json.dumps({
-                    "status": "success",
-                    "inserted": inserted_count,
-                    "total_rows": len(data)
-                }, indent=2)
+                text=encode(result, arguments)
             )]
         
-        elif name == "get_schema":
-            table = arguments["table"]
-            
-            query = """
-                SELECT 
-                    column_name,
-                    data_type,
-                    character_maximum_length,
-                    is_nullable,
-                    column_default
-                FROM information_schema.columns
-                WHERE table_name = %s
-                ORDER BY ordinal_position
-            """
-            
-            cursor.execute(query, (table,))
-            schema = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
+        with checkout() as conn:
+            cursor = conn.cursor(cursor_factory=TimedDictCursor)
+            cursor.execute(
+                "SET statement_timeout = %s",
+                (STATEMENT_TIMEOUTS_MS.get(name, DEFAULT_STATEMENT_TIMEOUT_MS),)
+            )
+
+            if name == "insert_data":
+                table = arguments["table"]
+                data = arguments["data"]
+
+                # Sorted so every row with the same column set shares one prepared statement
+                columns = sorted(data.keys())
+                values = [data[column] for column in columns]
+                columns_str = ", ".join(columns)
+
+                placeholders = ", ".join(["%s"] * len(columns))
+                query = f"INSERT INTO {table} ({columns_str}) VALUES ({placeholders}) RETURNING *"
+                if prepared_statements.enabled:
+                    positions = ", ".join(f"${position}" for position in range(1, len(columns) + 1))
+                    prepared_statements.execute(
+                        cursor, ("insert", table, tuple(columns)),
+                        f"INSERT INTO {table} ({columns_str}) VALUES ({positions}) RETURNING *", values, query
+                    )
+                else:
+                    cursor.execute(query, values)
+                result = cursor.fetchone()
+
+                conn.commit()
+
+                return [TextContent(
+                    type="text",
+                    text=encode({
+                        "status": "success",
+                        "inserted_row": dict(result)
+                    }, arguments)
+                )]
+
+            elif name == "bulk_insert":
+                table = arguments["table"]
+                data = arguments["data"]
+                on_conflict = arguments.get("on_conflict", "error")
+                method = arguments.get("method", "copy")
+
+                if not data:
+                    return [TextContent(
+                        type="text",
+                        text=encode({"status": "success", "inserted": 0}, arguments)
+                    )]
+
+                # Get columns from first row
+                columns = list(data[0].keys())
+
+                # Prepare data tuples
+                values_list, rejects = bulk_rows(arguments, columns, cursor)
+                load_rows = batch_insert if method == "batch" else copy_insert
+                load_id = dead_letter_id(arguments)
+                failures = []
+
+                with deferred_indexes(name, arguments, table) as deferred:
+                    try:
+                        started = time.perf_counter()
+                        if load_id:
+                            # Refused rows are bisected out and dead-lettered in the same transaction as the good ones
+                            inserted_count, refused = load_isolating(
+                                cursor, values_list,
+                                lambda cursor, rows: load_rows(cursor, table, columns, rows, on_conflict)
+                            )
+                            failures = [load_failure(columns, row, error) for row, error in refused]
+                            max_rejects = arguments.get("max_rejects")
+                            if max_rejects is not None and len(rejects) + len(failures) > max_rejects:
+                                raise ValueError(
+                                    f"{len(rejects) + len(failures)} rows rejected or refused, more than "
+                                    f"max_rejects={max_rejects}; first refused: {summary(failures[:1])}"
+                                )
+                            save_dead_letters(
+                                cursor, table, load_id,
+                                [validation_failure(data[r["row"]], r) for r in rejects] + failures
+                            )
+                        else:
+                            inserted_count = load_rows(cursor, table, columns, values_list, on_conflict)
+                        conn.commit()
+                        elapsed = time.perf_counter() - started
+                    except Exception:
+                        # End the transaction first: concurrent index builds wait for it
+                        conn.rollback()
+                        raise
+
+                result = {
+                    "status": "partial" if rejects or failures else "success",
+                    "method": method,
+                    "inserted": inserted_count,
+                    "rejected": len(rejects),
+                    "rejects": rejects[:MAX_REPORTED_REJECTS],
+                    "refused": len(failures),
+                    **(dead_letter_report(load_id, len(rejects) + len(failures), failures) if load_id else {}),
+                    "total_rows": len(data),
+                    "elapsed_ms": round(elapsed * 1000, 2),
+                    "rows_per_sec": round(len(data) / elapsed, 1) if elapsed > 0 else None
+                }
+                if deferred:
+                    result["index_maintenance"] = deferred.report()
+
+                return [TextContent(
+                    type="text",
+                    text=encode(result, arguments)
+                )]
+
+            elif name == "get_schema":
+                table = arguments["table"]
+
+                query = """
+                    SELECT 
+                        column_name,
+                        data_type,
+                        character_maximum_length,
+                        is_nullable,
+                        column_default
+                    FROM information_schema.columns
+                    WHERE table_name = %s
+                    ORDER BY ordinal_position
+                """
+
+                cursor.execute(query, (table,))
+                schema = cursor.fetchall()
+
+                text = encode({
                     "table": table,
                     "columns": [dict(row) for row in schema]
-                }, indent=2, default=str)
-            )]
-        
-        elif name == "list_tables":
-            query = """
-                SELECT table_name
-                FROM information_schema.tables
-                WHERE table_schema = 'public'
-                ORDER BY table_name
-            """
-            
-            cursor.execute(query)
-            tables = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
+                }, arguments)
+                # Unknown tables are not cached so a later create_table shows up immediately
+                if schema:
+                    metadata_cache.set(metadata_key(name, arguments), text)
+
+                return [TextContent(
+                    type="text",
+                    text=text
+                )]
+
+            elif name == "list_tables":
+                query = """
+                    SELECT table_name
+                    FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                    ORDER BY table_name
+                """
+
+                cursor.execute(query)
+                tables = cursor.fetchall()
+
+                text = encode({
                     "tables": [row["table_name"] for row in tables]
-                }, indent=2)
-            )]
-        
-        elif name == "create_table":
-            table = arguments["table"]
-            columns = arguments["columns"]
-            
-            column_defs = ", ".join([f"{col} {dtype}" for col, dtype in columns.items()])
-            query = f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})"
-            
-            cursor.execute(query)
-            conn.commit()
-            
-            cursor.close()
-            conn.close()
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    "status": "success",
-                    "message": f"Table {table} created successfully"
-                })
-            )]
-        
-        elif name == "count_rows":
-            table = arguments["table"]
-            where = arguments.get("where", "")
-            
-            query = f"SELECT COUNT(*) as count FROM {table}"
-            if where:
-                query += f" WHERE {where}"
-            
-            cursor.execute(query)
-            result = cursor.fetchone()
-            
-            cursor.close()
-            conn.close()
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    "table": table,
-                    "count": result["count"]
-                }, indent=2)
-            )]
-        
-        elif name == "execute_write_query":
-            query = arguments["query"].strip()
-            params = arguments.get("params", [])
-            
-            # Safety check: only allow INSERT, UPDATE, DELETE
-            query_upper = query.upper()
-            allowed_keywords = ["INSERT", "UPDATE", "DELETE"]
-            disallowed_keywords = ["DROP", "TRUNCATE", "ALTER", "CREATE"]
-            
-            # Check if query starts with allowed keyword
-            starts_with_allowed = any(query_upper.startswith(kw) for kw in allowed_keywords)
-            contains_disallowed = any(kw in query_upper for kw in disallowed_keywords)
-            
-            if not starts_with_allowed or contains_disallowed:
+                }, arguments)
+                metadata_cache.set(metadata_key(name, arguments), text)
+
                 return [TextContent(
                     type="text",
-                    text="Error: Only INSERT, UPDATE, and DELETE queries are allowed. DDL commands (DROP, TRUNCATE, ALTER, CREATE) are not permitted."
+                    text=text
                 )]
-            
-            # Execute the query
-            if params:
-                cursor.execute(query, params)
-            else:
+
+            elif name == "create_table":
+                table = arguments["table"]
+                columns = arguments["columns"]
+
+                column_defs = ", ".join([f"{col} {dtype}" for col, dtype in columns.items()])
+                query = f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})"
+
                 cursor.execute(query)
-            
-            affected_rows = cursor.rowcount
-            conn.commit()
-            
-            cursor.close()
-            conn.close()
-            
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    "status": "success",
-                    "affected_rows": affected_rows,
-                    "query_type": query_upper.split()[0]
-                }, indent=2)
-            )]
-        
-        else:
-            cursor.close()
-            conn.close()
-            return [TextContent(
-                type="text",
-                text=f"Unknown tool: {name}"
-            )]
-    
+                conn.commit()
+                invalidate_table_metadata(table)
+
+                return [TextContent(
+                    type="text",
+                    text=encode({
+                        "status": "success",
+                        "message": f"Table {table} created successfully"
+                    }, arguments)
+                )]
+
+            elif name == "count_rows":
+                table = arguments["table"]
+                where = arguments.get("where", "")
+
+                query = f"SELECT COUNT(*) as count FROM {table}"
+                if where:
+                    query += f" WHERE {where}"
+
+                cursor.execute(query)
+                result = cursor.fetchone()
+
+                return [TextContent(
+                    type="text",
+                    text=encode({
+                        "table": table,
+                        "count": result["count"]
+                    }, arguments)
+                )]
+
+            elif name == "execute_write_query":
+                query = arguments["query"].strip()
+                params = arguments.get("params", [])
+
+                # Safety check: only allow INSERT, UPDATE, DELETE
+                query_upper = query.upper()
+                allowed_keywords = ["INSERT", "UPDATE", "DELETE"]
+                disallowed_keywords = ["DROP", "TRUNCATE", "ALTER", "CREATE"]
+
+                # Check if query starts with allowed keyword
+                starts_with_allowed = any(query_upper.startswith(kw) for kw in allowed_keywords)
+                contains_disallowed = any(kw in query_upper for kw in disallowed_keywords)
+
+                if not starts_with_allowed or contains_disallowed:
+                    return [TextContent(
+                        type="text",
+                        text="Error: Only INSERT, UPDATE, and DELETE queries are allowed. DDL commands (DROP, TRUNCATE, ALTER, CREATE) are not permitted."
+                    )]
+
+                # Parameterized statements are prepared once per connection and reused
+                prepared = to_server_placeholders(query) if params and prepared_statements.enabled else None
+                if prepared and prepared[1] == len(params):
+                    prepared_statements.execute(cursor, ("write", query), prepared[0], params, query)
+                elif params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+
+                affected_rows = cursor.rowcount
+                conn.commit()
+
+                return [TextContent(
+                    type="text",
+                    text=encode({
+                        "status": "success",
+                        "affected_rows": affected_rows,
+                        "query_type": query_upper.split()[0]
+                    }, arguments)
+                )]
+
+            elif name == "transfer_from_elasticsearch":
+                make_writer = writer_factory(name, arguments) if writer_count(arguments) > 1 else None
+                with deferred_indexes(name, arguments, arguments["table"]) as deferred:
+                    try:
+                        result = transfer(conn, cursor, arguments, make_writer, table_schema(arguments["table"], cursor))
+                    except Exception:
+                        # End the transaction first: concurrent index builds wait for it
+                        conn.rollback()
+                        raise
+                if deferred:
+                    result["index_maintenance"] = deferred.report()
+                if arguments.get("incremental"):
+                    # The first incremental run creates the etl_checkpoints table
+                    invalidate_table_metadata(CHECKPOINT_TABLE)
+                if "dead_letter" in result:
+                    invalidate_table_metadata(DEAD_LETTER_TABLE)
+
+                return [TextContent(
+                    type="text",
+                    text=encode(result, arguments)
+                )]
+
+            elif name == "reconcile_with_elasticsearch":
+                result = reconcile(conn, get_es_client(), arguments)
+
+                return [TextContent(
+                    type="text",
+                    text=encode(result, arguments)
+                )]
+
+            else:
+                return [TextContent(
+                    type="text",
+                    text=f"Unknown tool: {name}"
+                )]
+
     except Exception as e:
-        if 'conn' in locals():
-            conn.rollback()
-            conn.close()
-        
+        record_error(e)
         return [TextContent(
             type="text",
             text=f"Error executing {name}: {str(e)}"
         )]
 
 
+@app.call_tool()
+async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    """Handle tool execution, recording per-tool metrics."""
+    with tool_metrics.track(name) as call:
+        return call.respond(await dispatch_tool(name, arguments))
+
+
+async def dispatch_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+    """Answer server_stats and cached metadata directly; run everything else on a db_executor thread."""
+    
+    if name == "server_stats":
+        return [TextContent(
+            type="text",
+            text=encode({
+                "tools": tool_metrics.snapshot(),
+                "pool": db_pool.stats(),
+                "query_cursors": query_cursors.stats(),
+                "metadata_cache": metadata_cache.stats(),
+                "prepared_statements": prepared_statements.stats()
+            }, arguments)
+        )]
+    
+    # Repeat schema lookups are answered here without a thread hop or connection checkout
+    if name in ("get_schema", "list_tables"):
+        cached = metadata_cache.get(metadata_key(name, arguments))
+        if cached is not None:
+            return [TextContent(type="text", text=cached)]
+    
+    async with tool_limit(name):
+        loop = asyncio.get_running_loop()
+        # The copied context carries the current tool call into the worker thread
+        return await loop.run_in_executor(db_executor, contextvars.copy_context().run, run_tool, name, arguments)
+
+
 async def main():
     """Run the MCP server."""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    exporter = MetricsExporter(
+        tool_metrics, path=METRICS_FILE, port=METRICS_PORT, host=METRICS_HOST, interval=METRICS_INTERVAL
+    ).start()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream,
+                write_stream,
+                app.create_initialization_options()
+            )
+    finally:
+        exporter.close()
+        db_executor.shutdown(wait=True)
+        query_cursors.close_all()
+        db_pool.close()
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
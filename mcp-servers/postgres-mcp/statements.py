@@ -0,0 +1,154 @@
+"""
+Prepared statement cache for the PostgreSQL MCP server
+Lets repeated insert_data / execute_write_query shapes skip PostgreSQL's parse and plan work
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+import psycopg2
+from psycopg2 import errors, extensions
+
+_PLACEHOLDER = re.compile(r"%%|%s|%")
+
+
+class StatementCachingConnection(extensions.connection):
+    """psycopg2 connection that remembers the statements prepared in its session."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = OrderedDict()  # shape key -> statement name, least recently used first
+        self.prepared_count = 0
+        self.stale_statements = []  # names forgotten after a failed EXECUTE, deallocated on the next miss
+
+
+def to_server_placeholders(query):
+    """Rewrite psycopg2 ``%s`` placeholders as ``$1, $2, ...``; returns (sql, count) or None.
+
+    Returns None for queries using any other ``%`` form (e.g. named
+    placeholders), which are then executed without preparing.
+    """
+    count = 0
+    unsupported = False
+
+    def replace(match):
+        nonlocal count, unsupported
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+        if token == "%s":
+            count += 1
+            return f"${count}"
+        unsupported = True
+        return token
+
+    sql = _PLACEHOLDER.sub(replace, query)
+    return None if unsupported else (sql, count)
+
+
+class PreparedStatements:
+    """Per-connection LRU of server-side prepared statements with shared hit/miss counters.
+
+    Statements are keyed by their shape (e.g. table plus sorted column set for
+    inserts), prepared with PREPARE on first use and run with EXECUTE after
+    that. Each connection keeps at most ``max_per_connection`` statements; the
+    least recently used one is DEALLOCATEd to make room. The cache lives on
+    the connection object, so it goes away with the session it describes.
+    """
+
+    def __init__(self, max_per_connection=64):
+        self.max_per_connection = max_per_connection
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "unprepared": 0}
+
+    @property
+    def enabled(self):
+        return self.max_per_connection > 0
+
+    def execute(self, cursor, key, sql, params, fallback):
+        """Run ``sql`` (written with ``$n`` placeholders) through the statement prepared for ``key``.
+
+        ``fallback`` is the same statement with psycopg2 ``%s`` placeholders. It
+        runs instead when PostgreSQL cannot prepare ``sql`` on its own, e.g.
+        when a parameter's type can only be inferred from its value. When the
+        session has lost the statement or the table changed shape since it was
+        prepared, the statement is prepared again and the call retried once.
+        """
+        for attempt in range(2):
+            name = self._prepare(cursor, key, sql)
+            if name is None:
+                cursor.execute(fallback, params)
+                return
+            try:
+                self._execute(cursor, name, params)
+                return
+            except (errors.InvalidSqlStatementName, errors.FeatureNotSupported) as e:
+                self._invalidate(cursor.connection, key, name, e)
+                if attempt:
+                    raise
+
+    def _prepare(self, cursor, key, sql):
+        """Name of the statement prepared for ``key``, preparing it on a miss; None if it cannot be prepared."""
+        conn = cursor.connection
+        statements = conn.prepared_statements
+        name = statements.get(key)
+        if name is not None:
+            statements.move_to_end(key)
+            self._count("hits")
+            return name
+
+        self._count("misses")
+        while conn.stale_statements:
+            cursor.execute(f"DEALLOCATE {conn.stale_statements.pop()}")
+        while len(statements) >= self.max_per_connection:
+            _, evicted = statements.popitem(last=False)
+            cursor.execute(f"DEALLOCATE {evicted}")
+            self._count("evictions")
+        conn.prepared_count += 1
+        name = f"mcp_stmt_{conn.prepared_count}"
+        cursor.execute("SAVEPOINT mcp_prepare")
+        try:
+            cursor.execute(f"PREPARE {name} AS {sql}")
+        except psycopg2.Error:
+            cursor.execute("ROLLBACK TO SAVEPOINT mcp_prepare")
+            self._count("unprepared")
+            return None
+        cursor.execute("RELEASE SAVEPOINT mcp_prepare")
+        statements[key] = name
+        return name
+
+    def _execute(self, cursor, name, params):
+        # The savepoint goes out with the EXECUTE, so a hit still costs one round trip before the release;
+        # the release runs on another cursor so the caller's cursor keeps the EXECUTE result
+        arguments = f" ({', '.join(['%s'] * len(params))})" if params else ""
+        try:
+            cursor.execute(f"SAVEPOINT mcp_execute; EXECUTE {name}{arguments}", params or None)
+        except (errors.InvalidSqlStatementName, errors.FeatureNotSupported):
+            cursor.execute("ROLLBACK TO SAVEPOINT mcp_execute")
+            cursor.execute("RELEASE SAVEPOINT mcp_execute")
+            raise
+        with cursor.connection.cursor() as release:
+            release.execute("RELEASE SAVEPOINT mcp_execute")
+
+    def _invalidate(self, conn, key, name, error):
+        conn.prepared_statements.pop(key, None)
+        if isinstance(error, errors.FeatureNotSupported):
+            # "cached plan must not change result type": the table changed shape since PREPARE
+            conn.stale_statements.append(name)
+        # Otherwise the session lost the statement (e.g. DISCARD ALL) and there is nothing to deallocate
+        self._count("invalidations")
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot.update({
+            "max_per_connection": self.max_per_connection,
+            "hit_rate": round(snapshot["hits"] / lookups, 3) if lookups else 0.0
+        })
+        return snapshot
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
@@ -0,0 +1,509 @@
+"""
+Schema-driven transform engine for the PostgreSQL MCP server
+Compiles a target table's schema into a columnar batch converter that rejects bad rows before they reach COPY
+"""
+
+import json
+import operator
+import re
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+
+# Rejected rows listed in a tool result; the rest are only counted
+MAX_REPORTED_REJECTS = 20
+
+CONVERSION_ERRORS = (TypeError, ValueError, ArithmeticError)
+
+
+def _to_timestamp(value):
+    # ES dates arrive as ISO 8601 strings or epoch milliseconds
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    return value
+
+
+def _to_array(value):
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+# Spellings PostgreSQL's boolean input accepts (any unique prefix of these words, case-insensitive)
+_BOOLEAN_WORDS = {"true": True, "yes": True, "on": True, "false": False, "no": False, "off": False}
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        value = str(value)
+    if not isinstance(value, str):
+        raise TypeError(f"expected a boolean, got {type(value).__name__}")
+    text = value.strip().lower()
+    if text in ("1", "0"):
+        return text == "1"
+    # An ambiguous prefix ("o") matches both results and is refused, as in PostgreSQL
+    matches = {result for word, result in _BOOLEAN_WORDS.items() if text and word.startswith(text)}
+    if len(matches) != 1:
+        raise ValueError(f"invalid input syntax for type boolean: {value!r}")
+    return matches.pop()
+
+
+def _to_json(value):
+    # Strings are taken to be JSON text already (psycopg2 cannot adapt dicts, so callers sent text)
+    if isinstance(value, str):
+        json.loads(value)
+        return value
+    return json.dumps(value)
+
+
+CONVERTERS = {
+    "auto": lambda value: value,
+    "text": str,
+    "integer": int,
+    "bigint": int,
+    "decimal": lambda value: Decimal(str(value)),
+    "float": float,
+    "boolean": _to_bool,
+    "timestamptz": _to_timestamp,
+    "array": _to_array,
+    "jsonb": _to_json,
+}
+
+
+def _scalar(value):
+    if isinstance(value, (list, tuple, dict)):
+        raise ValueError("expected a single value")
+    return value
+
+
+def _load_text(value):
+    return str(_scalar(value))
+
+
+def _load_integer(value):
+    value = _scalar(value)
+    if isinstance(value, bool):
+        raise TypeError("expected an integer, got bool")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError("not a whole number")
+    return int(value)
+
+
+def _load_decimal(value):
+    number = Decimal(str(_scalar(value)))
+    if not number.is_finite():
+        raise ValueError("not a finite number")
+    return number
+
+
+def _load_boolean(value):
+    return _to_bool(_scalar(value))
+
+
+def _load_timestamp(value):
+    # ISO 8601 strings are parsed here; anything else (e.g. '2024-01-15 10:30:00 UTC') is left
+    # for PostgreSQL's more lenient input, which isolates the rows it still refuses
+    value = _scalar(value)
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    if not isinstance(value, str):
+        raise TypeError(f"expected an ISO 8601 string or epoch milliseconds, got {type(value).__name__}")
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return value
+
+
+# Stricter versions of CONVERTERS used when loading: anything PostgreSQL would refuse raises here
+LOAD_CONVERTERS = {
+    **CONVERTERS,
+    "text": _load_text,
+    "integer": _load_integer,
+    "bigint": _load_integer,
+    "decimal": _load_decimal,
+    "float": lambda value: float(_scalar(value)),
+    "boolean": _load_boolean,
+    "timestamptz": _load_timestamp,
+}
+
+NUMERIC_KINDS = {"integer", "bigint", "decimal", "float"}
+
+# Value types each kind already loads as-is; a column made only of these skips conversion
+NATIVE_TYPES = {
+    "text": {str},
+    "integer": {int},
+    "bigint": {int},
+    "float": {float},
+    "boolean": {bool},
+}
+
+# information_schema data_type -> conversion kind; anything else is passed through ("auto")
+PG_KINDS = {
+    "smallint": "integer",
+    "integer": "integer",
+    "bigint": "bigint",
+    "numeric": "decimal",
+    "real": "float",
+    "double precision": "float",
+    "boolean": "boolean",
+    "timestamp with time zone": "timestamptz",
+    "timestamp without time zone": "timestamptz",
+    "date": "timestamptz",
+    "json": "jsonb",
+    "jsonb": "jsonb",
+    "ARRAY": "array",
+    "text": "text",
+    "character varying": "text",
+    "character": "text",
+}
+
+# Array udt_name -> element kind
+ARRAY_ELEMENT_KINDS = {
+    "_int2": "integer",
+    "_int4": "integer",
+    "_int8": "bigint",
+    "_numeric": "decimal",
+    "_float4": "float",
+    "_float8": "float",
+    "_bool": "boolean",
+    "_timestamptz": "timestamptz",
+    "_timestamp": "timestamptz",
+    "_date": "timestamptz",
+}
+
+INTEGER_RANGES = {
+    "smallint": (-2 ** 15, 2 ** 15 - 1),
+    "integer": (-2 ** 31, 2 ** 31 - 1),
+    "bigint": (-2 ** 63, 2 ** 63 - 1),
+}
+
+COMPARISONS = {">=": operator.ge, "<=": operator.le, ">": operator.gt, "<": operator.lt,
+               "=": operator.eq, "<>": operator.ne, "!=": operator.ne}
+FLIPPED = {">=": "<=", "<=": ">=", ">": "<", "<": ">", "=": "=", "<>": "<>", "!=": "!="}
+
+_CAST = re.compile(r"::[a-z_ ]+(\[\])?", re.IGNORECASE)
+_NUMBER = r"'?(-?\d+(?:\.\d+)?)'?"
+_COLUMN_FIRST = re.compile(rf"^(\w+)\s*(>=|<=|<>|!=|=|>|<)\s*{_NUMBER}$")
+_NUMBER_FIRST = re.compile(rf"^{_NUMBER}\s*(>=|<=|<>|!=|=|>|<)\s*(\w+)$")
+_NOT_NULL = re.compile(r"^(\w+)\s+IS\s+NOT\s+NULL$", re.IGNORECASE)
+_AND = re.compile(r"\s+AND\s+", re.IGNORECASE)
+
+
+def mapping_specs(mapping):
+    """Normalize a mapping spec into (column, source field, type) triples.
+
+    Each entry maps a PostgreSQL column to either a source field name or
+    ``{"field": ..., "type": ...}`` where type is one of ``CONVERTERS``.
+    Dotted field names reach into nested objects; ``_id`` reads the document ID.
+    """
+    if not mapping:
+        raise ValueError("mapping must map at least one column")
+
+    specs = []
+    for column, spec in mapping.items():
+        if isinstance(spec, str):
+            spec = {"field": spec}
+        field = spec.get("field", column)
+        kind = spec.get("type", "auto")
+        if kind not in CONVERTERS:
+            raise ValueError(f"Unknown type '{kind}' for column {column}; expected one of {sorted(CONVERTERS)}")
+        specs.append((column, field, kind))
+    return specs
+
+
+def lookup_field(source, field):
+    """Resolve a dotted field path inside a document's _source."""
+    value = source
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def load_table_schema(cursor, table):
+    """Read the columns and CHECK constraints the transform engine compiles against.
+
+    Returns a plain dict so it can be cached between calls.
+    """
+    cursor.execute("""
+        SELECT
+            column_name,
+            data_type,
+            udt_name,
+            character_maximum_length,
+            numeric_precision,
+            numeric_scale,
+            is_nullable
+        FROM information_schema.columns
+        WHERE table_name = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    columns = [dict(row) for row in cursor.fetchall()]
+    if not columns:
+        raise ValueError(f"Table {table} does not exist")
+
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'c'
+        ORDER BY conname
+    """, (table,))
+    checks = [dict(row) for row in cursor.fetchall()]
+    return {"table": table, "columns": columns, "checks": checks}
+
+
+def parse_check(definition):
+    """Split a CHECK definition into single-column rules; None if any part is beyond them.
+
+    Understands conjunctions of ``column <op> number`` (either way round) and
+    ``column IS NOT NULL``, which covers range checks such as ``price >= 0``
+    or ``ratings >= 0 AND ratings <= 5``. Returns (column, op, Decimal bound)
+    triples, with op None for IS NOT NULL.
+    """
+    body = definition.strip()
+    if not body.upper().startswith("CHECK"):
+        return None
+    body = re.sub(r"\s+NOT VALID$", "", body[len("CHECK"):].strip(), flags=re.IGNORECASE)
+    body = _CAST.sub("", body).replace("(", " ").replace(")", " ").strip()
+
+    rules = []
+    for term in _AND.split(body):
+        term = term.strip()
+        if match := _COLUMN_FIRST.match(term):
+            column, op, bound = match.groups()
+        elif match := _NUMBER_FIRST.match(term):
+            bound, op, column = match.groups()
+            op = FLIPPED[op]
+        elif match := _NOT_NULL.match(term):
+            rules.append((match.group(1), None, None))
+            continue
+        else:
+            return None
+        rules.append((column, op, Decimal(bound)))
+    return rules
+
+
+def source_properties(mapping_response):
+    """Flatten a get_mapping response into {dotted field: Elasticsearch type} across its indices."""
+    fields = {}
+
+    def walk(properties, prefix):
+        for name, spec in properties.items():
+            if "properties" in spec:
+                walk(spec["properties"], f"{prefix}{name}.")
+            else:
+                fields[f"{prefix}{name}"] = spec.get("type", "object")
+
+    for body in mapping_response.values():
+        walk(body.get("mappings", {}).get("properties", {}), "")
+    return fields
+
+
+class ColumnTransform:
+    """Conversion and validation of one target column."""
+
+    def __init__(self, info, field, kind):
+        self.name = info["column_name"]
+        self.field = field
+        self.kind = kind
+        self.not_null = info["is_nullable"] == "NO"
+        self.rules = []  # (description, predicate on a converted non-null value)
+        self.native = NATIVE_TYPES.get(kind, set()) | {type(None)}
+
+        if kind == "array":
+            element = LOAD_CONVERTERS[ARRAY_ELEMENT_KINDS.get(info.get("udt_name"), "text")]
+            self.convert = lambda value: [None if item is None else element(item) for item in _to_array(value)]
+        elif kind == "auto":
+            self.convert = None
+        else:
+            self.convert = LOAD_CONVERTERS[kind]
+
+        data_type = info["data_type"]
+        if kind in ("integer", "bigint") and data_type in INTEGER_RANGES:
+            low, high = INTEGER_RANGES[data_type]
+            self.rules.append((f"out of range for type {data_type}", lambda value: low <= value <= high))
+        if kind == "decimal" and data_type == "numeric" and info.get("numeric_scale") is not None:
+            # PostgreSQL rounds to the column's scale on input, before any CHECK sees the value
+            quantum = Decimal(1).scaleb(-info["numeric_scale"])
+            limit = Decimal(10) ** (info["numeric_precision"] - info["numeric_scale"])
+            self.convert = lambda value: _load_decimal(value).quantize(quantum, rounding=ROUND_HALF_UP)
+            self.rules.append((
+                f"numeric field overflow for numeric({info['numeric_precision']}, {info['numeric_scale']})",
+                lambda value: abs(value) < limit
+            ))
+        if kind == "text" and info.get("character_maximum_length"):
+            length = info["character_maximum_length"]
+            self.rules.append((f"value too long for {data_type}({length})", lambda value: len(value) <= length))
+
+    def add_check(self, name, op, bound):
+        """Attach a parsed CHECK rule; returns False when it cannot be evaluated for this column's kind."""
+        if op is None:
+            self.not_null = True
+            return True
+        if self.kind not in NUMERIC_KINDS:
+            return False
+        compare = COMPARISONS[op]
+        self.rules.append((f"violates check constraint {name} ({self.name} {op} {bound})",
+                           lambda value: compare(value, bound)))
+        return True
+
+    def convert_values(self, values):
+        """Convert a whole column; returns (values, {position: reason}) for the ones that failed."""
+        convert = self.convert
+        if convert is None or set(map(type, values)) <= self.native:
+            return values, {}
+        try:
+            # One tight pass for the common case of a clean batch
+            return [None if value is None else convert(value) for value in values], {}
+        except CONVERSION_ERRORS:
+            pass
+        converted = []
+        errors = {}
+        for position, value in enumerate(values):
+            try:
+                converted.append(None if value is None else convert(value))
+            except CONVERSION_ERRORS as e:
+                converted.append(None)
+                errors[position] = f"cannot convert to {self.kind}: {e}"
+        return converted, errors
+
+    def violations(self, values):
+        """Positions of converted values that PostgreSQL would refuse, with the reason."""
+        found = {}
+        has_nulls = None in values
+        if self.not_null and has_nulls:
+            for position, value in enumerate(values):
+                if value is None:
+                    found[position] = f"null value in NOT NULL column {self.name}"
+        present = [value for value in values if value is not None] if has_nulls else values
+        for description, predicate in self.rules:
+            if all(map(predicate, present)):
+                continue
+            for position, value in enumerate(values):
+                if value is not None and position not in found and not predicate(value):
+                    found[position] = description
+        return found
+
+
+class TransformPlan:
+    """Compiled ES document / row object -> table row conversion for one target table.
+
+    Batches are processed column by column: each column's values are pulled
+    out of the documents, converted in a single pass and checked against the
+    column's NOT NULL, type range and single-column CHECK rules. Rows with a
+    failing value are set aside as rejects with the reason, so the rest of the
+    batch still loads. CHECK constraints the engine cannot evaluate are left
+    to PostgreSQL and listed in ``describe()``.
+    """
+
+    def __init__(self, schema, mapping=None, source_fields=None, columns=None):
+        self.table = schema["table"]
+        infos = {info["column_name"]: info for info in schema["columns"]}
+
+        if mapping:
+            specs = mapping_specs(mapping)
+        elif columns:
+            specs = [(column, column, "auto") for column in columns]
+        elif source_fields:
+            # Every table column with a same-named source field, in table order
+            specs = [(name, name, "auto") for name in infos if name in source_fields]
+            if not specs:
+                raise ValueError(f"No column of {self.table} has a matching field in the source mapping")
+        else:
+            raise ValueError("mapping must map at least one column")
+
+        unknown = [column for column, _, _ in specs if column not in infos]
+        if unknown:
+            raise ValueError(f"Columns {unknown} do not exist in table {self.table}")
+
+        self.transforms = []
+        for column, field, kind in specs:
+            info = infos[column]
+            if kind == "auto":
+                kind = "array" if info["data_type"] == "ARRAY" else PG_KINDS.get(info["data_type"], "auto")
+            self.transforms.append(ColumnTransform(info, field, kind))
+
+        by_name = {transform.name: transform for transform in self.transforms}
+        self.unchecked = []
+        for check in schema["checks"]:
+            rules = parse_check(check["definition"])
+            if rules is not None and any(column not in infos for column, _, _ in rules):
+                rules = None
+            if rules is None:
+                self.unchecked.append(check["conname"])
+                continue
+            for column, op, bound in rules:
+                # Unloaded columns keep their defaults, which PostgreSQL checks itself
+                if column in by_name and not by_name[column].add_check(check["conname"], op, bound):
+                    self.unchecked.append(check["conname"])
+
+        self.unmapped = [name for name in infos if name not in by_name]
+        self.ignored_fields = sorted(set(source_fields or ()) - {transform.field for transform in self.transforms})
+
+    @property
+    def columns(self):
+        return [transform.name for transform in self.transforms]
+
+    @property
+    def fields(self):
+        """(source field, kind) pairs in column order."""
+        return [(transform.field, transform.kind) for transform in self.transforms]
+
+    def describe(self):
+        return {
+            "columns": {transform.name: {"field": transform.field, "type": transform.kind}
+                        for transform in self.transforms},
+            "unmapped_columns": self.unmapped,
+            "ignored_fields": self.ignored_fields,
+            "unchecked_constraints": sorted(set(self.unchecked))
+        }
+
+    def convert_hits(self, hits):
+        """Convert a page of search hits; returns (rows, rejects)."""
+        sources = [hit.get("_source") or {} for hit in hits]
+        keys = [hit["_id"] for hit in hits]
+        columns = []
+        for transform in self.transforms:
+            field = transform.field
+            if field == "_id":
+                columns.append(list(keys))
+            elif "." in field:
+                columns.append([lookup_field(source, field) for source in sources])
+            else:
+                columns.append([source.get(field) for source in sources])
+        return self._assemble(columns, keys)
+
+    def convert_records(self, records):
+        """Convert bulk_insert row objects keyed by column name; returns (rows, rejects)."""
+        columns = [[record.get(transform.field) for record in records] for transform in self.transforms]
+        return self._assemble(columns, columns[0])
+
+    def _assemble(self, raw_columns, keys):
+        problems = {}  # position -> (column, raw value, reason), first problem per row
+        converted_columns = []
+        for transform, raw in zip(self.transforms, raw_columns):
+            converted, errors = transform.convert_values(raw)
+            for position, reason in errors.items():
+                problems.setdefault(position, (transform.name, raw[position], reason))
+            for position, reason in transform.violations(converted).items():
+                if position not in errors:
+                    problems.setdefault(position, (transform.name, raw[position], reason))
+            converted_columns.append(converted)
+
+        rows = zip(*converted_columns)
+        if not problems:
+            return list(rows), []
+        accepted = [row for position, row in enumerate(rows) if position not in problems]
+        rejects = [
+            {"row": position, "key": keys[position], "column": column, "value": _preview(value), "reason": reason}
+            for position, (column, value, reason) in sorted(problems.items())
+        ]
+        return accepted, rejects
+
+
+def _preview(value):
+    if isinstance(value, str) and len(value) > 200:
+        return value[:200] + "…"
+    return value
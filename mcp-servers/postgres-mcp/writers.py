@@ -0,0 +1,205 @@
+"""
+Parallel partitioned writers for the PostgreSQL MCP server
+Spreads a bulk load over several pooled connections so big backfills use more than one backend
+"""
+
+import queue
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import QueryCanceledError, TransactionRollbackError
+
+from bulkload import copy_insert
+from deadletter import load_failure, load_isolating, save_dead_letters, summary
+
+# Failures worth retrying: lost connections, deadlocks and serialization failures.
+# QueryCanceledError (statement_timeout) subclasses OperationalError but is never
+# retried: the unit would only time out again, holding the writer for each attempt.
+RETRYABLE_ERRORS = (psycopg2.OperationalError, TransactionRollbackError)
+
+
+class PartitionedWriter:
+    """Load rows through ``writers`` connections in parallel.
+
+    Rows are partitioned by a hash of their first column (the conflict key), so
+    every key always lands on the same writer and writers never contend for the
+    same rows. Each writer commits every ``commit_rows`` rows; a failed commit
+    is retried up to ``max_retries`` times on that writer alone, and a writer
+    that still fails stops without rolling back what the others committed.
+
+    With a ``dead_letter_id`` each unit is loaded through ``load_isolating``:
+    rows PostgreSQL refuses are bisected out, recorded in the dead-letter
+    table under that load ID in the same transaction, and the rest commits.
+
+    Use as ``start()``, any number of ``submit(rows)`` calls, then ``finish()``.
+    Writer queues are bounded, so ``submit`` blocks while the writers catch up.
+    """
+
+    def __init__(self, pool, table, columns, on_conflict="error", writers=4, commit_rows=5000,
+                 max_retries=2, statement_timeout_ms=None, max_queued=4, dead_letter_id=None, max_reported=20):
+        if writers < 1:
+            raise ValueError("writers must be at least 1")
+        self.pool = pool
+        self.table = table
+        self.columns = columns
+        self.on_conflict = on_conflict
+        self.commit_rows = max(1, commit_rows)
+        self.max_retries = max(0, max_retries)
+        self.statement_timeout_ms = statement_timeout_ms
+        self.dead_letter_id = dead_letter_id
+        self.max_reported = max_reported
+        self._dead_letters = []  # first max_reported entries across writers
+        self._dead_letter_lock = threading.Lock()
+        self._queues = [queue.Queue(maxsize=max(1, max_queued)) for _ in range(writers)]
+        self._threads = []
+        self._connections = [None] * writers
+        self._stats = [
+            {
+                "writer": number,
+                "rows_assigned": 0,
+                "rows_written": 0,
+                "rows_failed": 0,
+                "rows_dead_lettered": 0,
+                "commits": 0,
+                "retries": 0,
+                "busy_s": 0.0,
+                "error": None
+            }
+            for number in range(writers)
+        ]
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        for number, rows in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._run, args=(number, rows), name=f"pg-writer-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, rows):
+        """Partition ``rows`` (lists ordered like ``columns``) across the writers."""
+        partitions = [[] for _ in self._queues]
+        for row in rows:
+            partitions[hash(row[0]) % len(partitions)].append(row)
+        for number, partition in enumerate(partitions):
+            if partition:
+                self._stats[number]["rows_assigned"] += len(partition)
+                self._queues[number].put(partition)
+
+    def finish(self):
+        """Flush and stop every writer, then return overall and per-writer results."""
+        for rows in self._queues:
+            rows.put(None)
+        for thread in self._threads:
+            thread.join()
+        elapsed = time.perf_counter() - self._started
+
+        writers = []
+        for stats in self._stats:
+            busy = stats["busy_s"]
+            writers.append({
+                **stats,
+                "busy_s": round(busy, 3),
+                "rows_per_sec": round(stats["rows_written"] / busy, 1) if busy > 0 else None
+            })
+        rows_written = sum(stats["rows_written"] for stats in writers)
+        failed = [stats["writer"] for stats in writers if stats["error"]]
+        return {
+            "status": "partial" if failed else "success",
+            "rows_written": rows_written,
+            "rows_failed": sum(stats["rows_failed"] for stats in writers),
+            "rows_dead_lettered": sum(stats["rows_dead_lettered"] for stats in writers),
+            "dead_letters": summary(self._dead_letters),
+            "failed_writers": failed,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_sec": round(rows_written / elapsed, 1) if elapsed > 0 else None,
+            "writers": writers
+        }
+
+    def _run(self, number, rows):
+        stats = self._stats[number]
+        pending = []
+        drained = False
+        try:
+            self._connect(number)
+            while True:
+                batch = rows.get()
+                if batch is None:
+                    drained = True
+                    break
+                pending.extend(batch)
+                while len(pending) >= self.commit_rows:
+                    self._commit(number, pending[:self.commit_rows])
+                    del pending[:self.commit_rows]
+            if pending:
+                self._commit(number, pending)
+                pending = []
+        except Exception as e:
+            stats["error"] = f"{type(e).__name__}: {e}"
+            stats["rows_failed"] += len(pending)
+            # Keep draining so submit() never blocks on a writer that gave up
+            while not drained:
+                batch = rows.get()
+                if batch is None:
+                    break
+                stats["rows_failed"] += len(batch)
+        finally:
+            self._disconnect(number)
+
+    def _connect(self, number):
+        conn = self.pool.getconn()
+        self._connections[number] = conn
+        if self.statement_timeout_ms is not None:
+            with conn.cursor() as cursor:
+                cursor.execute("SET statement_timeout = %s", (self.statement_timeout_ms,))
+            conn.commit()
+
+    def _disconnect(self, number):
+        conn, self._connections[number] = self._connections[number], None
+        if conn is not None:
+            self.pool.putconn(conn, discard=bool(conn.closed))
+
+    def _commit(self, number, rows):
+        """Load and commit one unit of rows on a writer, retrying transient failures."""
+        stats = self._stats[number]
+        for attempt in range(self.max_retries + 1):
+            conn = self._connections[number]
+            started = time.perf_counter()
+            try:
+                entries = []
+                with conn.cursor() as cursor:
+                    if self.dead_letter_id is None:
+                        written = copy_insert(cursor, self.table, self.columns, rows, self.on_conflict)
+                    else:
+                        written, refused = load_isolating(cursor, rows, self._copy)
+                        entries = [load_failure(self.columns, row, error) for row, error in refused]
+                        save_dead_letters(cursor, self.table, self.dead_letter_id, entries)
+                conn.commit()
+                stats["rows_written"] += written
+                stats["commits"] += 1
+                if entries:
+                    stats["rows_dead_lettered"] += len(entries)
+                    with self._dead_letter_lock:
+                        self._dead_letters.extend(entries[:self.max_reported - len(self._dead_letters)])
+                return
+            except QueryCanceledError:
+                raise
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                stats["retries"] += 1
+                if conn.closed:
+                    self._disconnect(number)
+                    self._connect(number)
+                else:
+                    conn.rollback()
+                time.sleep(0.1 * 2 ** attempt)
+            finally:
+                stats["busy_s"] += time.perf_counter() - started
+
+    def _copy(self, cursor, rows):
+        return copy_insert(cursor, self.table, self.columns, rows, self.on_conflict)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Benchmark MCP server cold starts
+Spawns each server as a fresh stdio subprocess, the way an MCP host starts it, and
+measures how long it takes to answer initialize, tools/list and a first tool call
+
+Neither server imports its database client or opens a connection until a tool needs
+one, so the default first call (server_stats) runs without Elasticsearch or PostgreSQL.
+The interpreter start-up (python -c pass) is measured alongside as the floor.
+
+    python scripts/benchmark-cold-start.py --runs 20 --json cold-start.json
+    python scripts/benchmark-cold-start.py --server postgres --command "docker exec -i postgres-mcp python /app/server.py"
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVERS = {
+    "elasticsearch": os.path.join(ROOT, "mcp-servers", "elasticsearch-mcp"),
+    "postgres": os.path.join(ROOT, "mcp-servers", "postgres-mcp"),
+}
+PROTOCOL_VERSION = "2024-11-05"
+PHASES = ("interpreter", "initialize", "tools_list", "first_call", "exit")
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+class StdioProcess:
+    """A server subprocess spoken to with newline-delimited JSON-RPC."""
+
+    def __init__(self, command, cwd):
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(
+            command, cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def send(self, message):
+        self.process.stdin.write(json.dumps(message).encode() + b"\n")
+        self.process.stdin.flush()
+
+    def response(self, request_id, timeout):
+        """Wait for the response to ``request_id``, skipping notifications and log lines."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                raise TimeoutError(f"no response to request {request_id} within {timeout}s")
+            if line is None:
+                raise RuntimeError(f"server exited: {self.process.stderr.read().decode()[-500:]}")
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("id") == request_id:
+                if "error" in message:
+                    raise RuntimeError(f"request {request_id} failed: {message['error']}")
+                return message["result"]
+
+    def close(self, timeout):
+        """Close stdin (the MCP shutdown signal for stdio servers) and wait for the exit."""
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+            raise
+
+
+def interpreter_start(python):
+    started = time.perf_counter()
+    subprocess.run([python, "-c", "pass"], check=True)
+    return elapsed_ms(started)
+
+
+def cold_start(command, cwd, args):
+    """Start one server process and time each step of the handshake; returns a dict of ms."""
+    timings = {}
+    server = StdioProcess(command, cwd)
+    try:
+        server.send({
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "benchmark-cold-start", "version": "1.0"}
+            }
+        })
+        server.response(1, args.timeout)
+        timings["initialize"] = elapsed_ms(server.started)
+
+        server.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        server.send({"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        tools = server.response(2, args.timeout)["tools"]
+        timings["tools_list"] = elapsed_ms(server.started)
+
+        if args.call:
+            server.send({
+                "jsonrpc": "2.0", "id": 3, "method": "tools/call",
+                "params": {"name": args.call, "arguments": json.loads(args.arguments)}
+            })
+            result = server.response(3, args.timeout)
+            if result.get("isError"):
+                raise RuntimeError(f"{args.call} failed: {result['content'][0].get('text', '')[:200]}")
+            timings["first_call"] = elapsed_ms(server.started)
+    except BaseException:
+        server.process.kill()
+        raise
+    server.close(args.timeout)
+    timings["exit"] = elapsed_ms(server.started)
+    return timings, len(tools)
+
+
+def import_profile(cwd, python, top):
+    """The server module's direct imports ordered by cumulative import time (python -X importtime)."""
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", "import server"], cwd=cwd, capture_output=True, text=True
+    )
+    total = None
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == "server":
+            total = int(cumulative) / 1000
+        elif depth == 1:
+            imports.append({"module": name.strip(), "ms": round(int(cumulative) / 1000, 2)})
+    imports.sort(key=lambda entry: entry["ms"], reverse=True)
+    return {"total_ms": total and round(total, 2), "top": imports[:top]}
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "min": ordered[0],
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "max": ordered[-1],
+        "mean": round(sum(ordered) / len(ordered), 2)
+    }
+
+
+def run_server(kind, args):
+    command = shlex.split(args.command) if args.command else [args.python, "server.py"]
+    samples = {phase: [] for phase in PHASES}
+    tools = None
+    for number in range(args.warmup + args.runs):
+        interpreter = interpreter_start(args.python)
+        timings, tools = cold_start(command, SERVERS[kind], args)
+        if number < args.warmup:
+            continue  # fills the page cache and writes __pycache__, as on any but the very first start
+        samples["interpreter"].append(interpreter)
+        for phase, ms in timings.items():
+            samples[phase].append(ms)
+
+    run = {
+        "server": kind,
+        "command": command,
+        "runs": args.runs,
+        "tools": tools,
+        "ms": {phase: summarize(values) for phase, values in samples.items() if values}
+    }
+    if args.imports and not args.command:
+        run["imports"] = import_profile(SERVERS[kind], args.python, args.imports)
+    return run
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(runs):
+    for run in runs:
+        print(f"\n{run['server']} — {run['runs']} cold starts, {run['tools']} tools ({' '.join(run['command'])})")
+        print(f"  {'ms since spawn':<16} {'min':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+        for phase, stats in run["ms"].items():
+            print(f"  {phase:<16} {stats['min']:>9,.1f} {stats['p50']:>9,.1f} {stats['p95']:>9,.1f} {stats['max']:>9,.1f}")
+        if run.get("imports"):
+            print(f"  import server: {run['imports']['total_ms']:,.1f} ms, slowest direct imports:")
+            for entry in run["imports"]["top"]:
+                print(f"    {entry['module']:<30} {entry['ms']:>9,.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MCP server cold start (time to first response)")
+    parser.add_argument("--server", choices=["elasticsearch", "postgres", "all"], default="all")
+    parser.add_argument("--runs", type=int, default=10, help="Measured starts per server")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured starts before the measured ones")
+    parser.add_argument("--call", default="server_stats",
+                        help="Tool called after tools/list ('' to stop at tools/list)")
+    parser.add_argument("--arguments", default="{}", help="JSON arguments for --call")
+    parser.add_argument("--command", help="Start the server with this command instead of '<python> server.py', "
+                                          "e.g. 'docker exec -i postgres-mcp python /app/server.py'")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter for the servers")
+    parser.add_argument("--imports", type=int, default=8, metavar="N",
+                        help="Report the N slowest direct imports of server.py (0 to skip)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for each response")
+    parser.add_argument("--json", help="Write results as JSON to this file ('-' for stdout)")
+    args = parser.parse_args()
+    if args.command and args.server == "all":
+        parser.error("--command starts a single server; pick it with --server")
+
+    runs = []
+    kinds = list(SERVERS) if args.server == "all" else [args.server]
+    for kind in kinds:
+        print(f"Cold-starting {kind} {args.warmup + args.runs} times...", file=sys.stderr)
+        runs.append(run_server(kind, args))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"runs": args.runs, "warmup": args.warmup, "call": args.call or None},
+        "runs": runs
+    }
+
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+        return
+    print_table(runs)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark field projection in the Elasticsearch MCP server
+Runs complete bulk_export scans of an index with and without _source filtering
+and reports response bytes and latency for each variant
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "mcp-servers", "elasticsearch-mcp"))
+os.environ.setdefault("ELASTICSEARCH_URL", "http://localhost:9200")
+
+import server  # noqa: E402  (the Elasticsearch MCP server module)
+
+# Projections for the sample products mapping (see data/init-elasticsearch.sh)
+VARIANTS = {
+    "full_source": {},
+    "exclude_description": {"source_excludes": ["description"]},
+    "include_id_price": {"source_includes": ["id", "price"]},
+    "docvalues_id_price": {"include_source": False, "docvalue_fields": ["id", "price"]},
+}
+
+
+async def export_all(index, batch_size, projection):
+    """Drain one bulk_export and return (seconds, response bytes, documents, pages)."""
+    arguments = {"index": index, "batch_size": batch_size, **projection}
+    total_bytes = 0
+    documents = 0
+    pages = 0
+    started = time.perf_counter()
+    while True:
+        content = await server.call_tool("bulk_export", arguments)
+        text = content[0].text
+        if text.startswith("Error executing"):
+            raise RuntimeError(text)
+        total_bytes += len(text.encode())
+        page = json.loads(text)
+        documents += page["exported"]
+        pages += 1
+        if not page["cursor"]:
+            break
+        arguments = {"index": index, "batch_size": batch_size, "cursor": page["cursor"]}
+    return time.perf_counter() - started, total_bytes, documents, pages
+
+
+async def run(args):
+    results = {}
+    try:
+        for name, projection in VARIANTS.items():
+            await export_all(args.index, args.batch_size, projection)  # warm-up
+            timings = []
+            for _ in range(args.runs):
+                elapsed, total_bytes, documents, pages = await export_all(args.index, args.batch_size, projection)
+                timings.append(elapsed)
+            results[name] = {
+                "projection": projection,
+                "documents": documents,
+                "pages": pages,
+                "response_bytes": total_bytes,
+                "bytes_per_doc": round(total_bytes / documents, 1) if documents else None,
+                "median_ms": round(statistics.median(timings) * 1000, 2),
+                "min_ms": round(min(timings) * 1000, 2),
+                "max_ms": round(max(timings) * 1000, 2),
+            }
+    finally:
+        await server.es_client.close()
+
+    baseline = results["full_source"]["response_bytes"]
+    for result in results.values():
+        result["bytes_vs_full"] = round(result["response_bytes"] / baseline, 3) if baseline else None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default="products", help="Index to export (default: products)")
+    parser.add_argument("--batch-size", type=int, default=100, help="bulk_export batch_size (default: 100)")
+    parser.add_argument("--runs", type=int, default=5, help="Timed exports per variant (default: 5)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args))
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"📊 bulk_export of '{args.index}' ({args.runs} runs per variant, batch_size={args.batch_size})")
+    print(f"{'variant':<22}{'docs':>8}{'bytes':>12}{'bytes/doc':>11}{'vs full':>9}{'median ms':>11}")
+    for name, result in results.items():
+        print(
+            f"{name:<22}{result['documents']:>8}{result['response_bytes']:>12}"
+            f"{result['bytes_per_doc']!s:>11}{result['bytes_vs_full']!s:>9}{result['median_ms']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
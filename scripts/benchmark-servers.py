@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+"""
+Benchmark both MCP servers in-process
+Drives each server's call_tool handler over a synthetic product catalog and reports
+latency percentiles, throughput, peak RSS and response bytes per tool as JSON
+
+By default the servers talk to in-process fakes of Elasticsearch and PostgreSQL, so
+no network or containers are needed; --backend local uses ELASTICSEARCH_URL and the
+POSTGRES_* settings instead. Each server and dataset size runs in its own process so
+peak RSS figures do not bleed into each other.
+
+    python scripts/benchmark-servers.py --docs 1000,100000 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from fake_elasticsearch import CATEGORIES, FakeElasticsearch, product, product_id
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVERS = {
+    "elasticsearch": os.path.join(ROOT, "mcp-servers", "elasticsearch-mcp"),
+    "postgres": os.path.join(ROOT, "mcp-servers", "postgres-mcp"),
+}
+
+# ---------------------------------------------------------------------------
+# PostgreSQL layout of the synthetic catalog (see fake_elasticsearch.py)
+# ---------------------------------------------------------------------------
+
+# (column, data_type, udt_name, max length, numeric precision, numeric scale, nullable) as in data/init-postgres.sql
+PRODUCT_COLUMNS = [
+    ("id", "character varying", "varchar", 50, None, None, "NO"),
+    ("name", "character varying", "varchar", 255, None, None, "NO"),
+    ("category", "character varying", "varchar", 100, None, None, "NO"),
+    ("subcategory", "character varying", "varchar", 100, None, None, "YES"),
+    ("price", "numeric", "numeric", None, 10, 2, "NO"),
+    ("description", "text", "text", None, None, None, "YES"),
+    ("stock_quantity", "integer", "int4", None, 32, 0, "NO"),
+    ("created_at", "timestamp with time zone", "timestamptz", None, None, None, "NO"),
+    ("ratings", "numeric", "numeric", None, 3, 2, "YES"),
+    ("reviews_count", "integer", "int4", None, 32, 0, "YES"),
+    ("brand", "character varying", "varchar", 100, None, None, "YES"),
+    ("tags", "ARRAY", "_text", None, None, None, "YES"),
+]
+
+# pg_get_constraintdef() output for the products CHECK constraints
+PRODUCT_CHECKS = [
+    ("products_price_check", "CHECK ((price >= (0)::numeric))"),
+    ("products_ratings_check", "CHECK (((ratings >= (0)::numeric) AND (ratings <= (5)::numeric)))"),
+    ("products_reviews_count_check", "CHECK ((reviews_count >= 0))"),
+    ("products_stock_quantity_check", "CHECK ((stock_quantity >= 0))"),
+]
+
+TRANSFER_MAPPING = {
+    "id": "id",
+    "name": "name",
+    "category": "category",
+    "subcategory": "subcategory",
+    "price": {"field": "price", "type": "decimal"},
+    "description": "description",
+    "stock_quantity": {"field": "stock_quantity", "type": "integer"},
+    "created_at": {"field": "created_at", "type": "timestamptz"},
+    "ratings": {"field": "ratings", "type": "decimal"},
+    "reviews_count": {"field": "reviews_count", "type": "integer"},
+    "brand": "brand",
+    "tags": {"field": "tags", "type": "array"},
+}
+
+
+# ---------------------------------------------------------------------------
+# In-process Elasticsearch stand-in
+# ---------------------------------------------------------------------------
+
+class _LatencyClient:
+    """Wraps a fake client and adds a fixed per-request delay to every call."""
+
+    def __init__(self, target, latency_s):
+        self._target = target
+        self._latency_s = latency_s
+
+    def __getattr__(self, name):
+        if name == "options":
+            return lambda **kwargs: self
+        attribute = getattr(self._target, name)
+        if name == "indices":
+            return type(self)(attribute, self._latency_s)
+        return self._wrap(attribute)
+
+
+class SyncFakeClient(_LatencyClient):
+    """Stands in for ``elasticsearch.Elasticsearch`` (used by transfer_from_elasticsearch)."""
+
+    def _wrap(self, method):
+        def call(*args, **kwargs):
+            if self._latency_s:
+                time.sleep(self._latency_s)
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncFakeClient(_LatencyClient):
+    """Stands in for ``elasticsearch.AsyncElasticsearch``."""
+
+    def _wrap(self, method):
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self._latency_s)
+            return method(*args, **kwargs)
+        return call
+
+
+# ---------------------------------------------------------------------------
+# In-process PostgreSQL stand-in
+# ---------------------------------------------------------------------------
+
+class FakeDatabase:
+    """Row counts per table behind the fake connections; SQL is recognised, not executed.
+
+    Just enough of psycopg2 for the benchmarked tools: COPY counts the rows it
+    is sent, INSERT ... RETURNING echoes the inserted row, COUNT(*) reports the
+    table size and any other SELECT streams generated products.
+    """
+
+    def __init__(self, latency_ms=0.0):
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.latency_s = latency_ms / 1000
+
+    def connect(self, *args, **kwargs):
+        return FakeConnection(self)
+
+    def add_rows(self, table, count):
+        with self.lock:
+            self.tables[table] = self.tables.get(table, 0) + count
+
+    def rows(self, table):
+        with self.lock:
+            return self.tables.get(table, 0)
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.closed = 0
+        self.autocommit = False
+        # Same per-session bookkeeping as statements.StatementCachingConnection
+        self.prepared_statements = OrderedDict()
+        self.prepared_count = 0
+        self.stale_statements = []
+        self.prepared_sql = {}
+
+    def cursor(self, name=None, cursor_factory=None):
+        return FakeCursor(self, as_dict=cursor_factory is not None)
+
+    def get_transaction_status(self):
+        return 0  # TRANSACTION_STATUS_IDLE
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def _table_after(sql, keyword):
+    words = sql.replace("(", " ").split()
+    upper = [word.upper() for word in words]
+    return words[upper.index(keyword) + 1] if keyword in upper else None
+
+
+def _insert_columns(sql):
+    return [column.strip() for column in sql.split("(", 1)[1].split(")", 1)[0].split(",")]
+
+
+class FakeCursor:
+    def __init__(self, connection, as_dict):
+        self.connection = connection
+        self.as_dict = as_dict
+        self.itersize = 2000
+        self.rowcount = -1
+        self.description = None
+        self._rows = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        self._rows = iter(())
+
+    def _result(self, rows, rowcount=None):
+        self._rows = iter(rows)
+        self.rowcount = rowcount if rowcount is not None else -1
+
+    def _row(self, values):
+        return values if self.as_dict else tuple(values.values())
+
+    def execute(self, sql, params=None):
+        database = self.connection.database
+        if database.latency_s:
+            time.sleep(database.latency_s)
+        statement = " ".join(sql.split())
+        upper = statement.upper()
+
+        if upper.startswith("PREPARE "):
+            name, body = statement[len("PREPARE "):].split(" AS ", 1)
+            self.connection.prepared_sql[name] = body
+            return self._result([])
+        if upper.startswith("EXECUTE "):
+            name = statement.split()[1]
+            statement = self.connection.prepared_sql[name]
+            upper = statement.upper()
+        if upper == "SELECT 1":
+            return self._result([self._row({"?column?": 1})])
+        if "INFORMATION_SCHEMA.COLUMNS" in upper:
+            return self._result([
+                self._row({"column_name": column, "data_type": kind, "udt_name": udt, "character_maximum_length": length,
+                           "numeric_precision": precision, "numeric_scale": scale, "is_nullable": nullable,
+                           "column_default": None})
+                for column, kind, udt, length, precision, scale, nullable in PRODUCT_COLUMNS
+            ])
+        if "FROM PG_CONSTRAINT" in upper:
+            return self._result([self._row({"conname": name, "definition": definition})
+                                 for name, definition in PRODUCT_CHECKS])
+        if "INFORMATION_SCHEMA.TABLES" in upper:
+            return self._result([self._row({"table_name": table}) for table in sorted(database.tables)])
+        if upper.startswith("CREATE TEMP TABLE"):
+            database.tables[_table_after(statement, "TABLE")] = 0
+            return self._result([])
+        if upper.startswith("CREATE TABLE"):
+            database.tables.setdefault(_table_after(statement, "EXISTS") or _table_after(statement, "TABLE"), 0)
+            return self._result([])
+        if upper.startswith("DROP TABLE"):
+            database.tables.pop(_table_after(statement, "TABLE"), None)
+            return self._result([])
+        if upper.startswith("SELECT COUNT(*)"):
+            return self._result([self._row({"count": database.rows(_table_after(statement, "FROM"))})])
+        if upper.startswith("INSERT INTO") and " SELECT " in upper:
+            # Staging-table merge from copy_insert: move the staged rows over
+            moved = database.rows(_table_after(statement, "FROM"))
+            database.add_rows(_table_after(statement, "INTO"), moved)
+            return self._result([], moved)
+        if upper.startswith("INSERT INTO") and "RETURNING" in upper:
+            values = list(params or [])
+            row = dict(zip(_insert_columns(statement), values))
+            database.add_rows(_table_after(statement, "INTO"), 1)
+            return self._result([self._row(row)], 1)
+        if upper.startswith(("INSERT", "UPDATE", "DELETE")):
+            return self._result([], 1)
+        if upper.startswith("SELECT"):
+            table = _table_after(statement, "FROM")
+            return self._result((self._row(product(position)) for position in range(database.rows(table))))
+        # SET, SAVEPOINT, RELEASE, DEALLOCATE, ANALYZE, ...: nothing to return
+        return self._result([])
+
+    def copy_expert(self, sql, buffer):
+        copied = sum(1 for _ in buffer)
+        self.connection.database.add_rows(_table_after(sql, "COPY"), copied)
+        self.rowcount = copied
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def fetchmany(self, size=None):
+        return [row for _, row in zip(range(size or self.itersize), self._rows)]
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def peak_rss_mb():
+    """Process high-water RSS in MiB, or None where the platform cannot tell."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+# Response encoding requested from every tool (see encoding.py in either server)
+RESPONSE_FORMAT = "compact"
+
+
+class ToolRun:
+    """Latency, bytes and row counts of one tool's calls within a scenario."""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.latencies = []
+        self.errors = 0
+        self.last_error = None
+        self.response_bytes = 0
+        self.rows = 0
+        self.wall_s = 0.0
+        self.rss_before = peak_rss_mb()
+
+    async def call(self, server, name, arguments):
+        """Call one tool; returns the decoded JSON result, or None if the call failed."""
+        started = time.perf_counter()
+        content = await server.call_tool(name, {**arguments, "format": RESPONSE_FORMAT})
+        self.latencies.append(time.perf_counter() - started)
+        text = content[0].text
+        self.response_bytes += len(text.encode())
+        if text.startswith(("Error", "Unknown tool")):
+            self.errors += 1
+            self.last_error = text[:300]
+            return None
+        return json.loads(text)
+
+    def report(self):
+        ordered = sorted(self.latencies)
+        calls = len(ordered)
+        rss_after = peak_rss_mb()
+        report = {
+            "tool": self.tool,
+            "calls": calls,
+            "errors": self.errors,
+            "latency_ms": {
+                "p50": _ms(percentile(ordered, 50)),
+                "p95": _ms(percentile(ordered, 95)),
+                "p99": _ms(percentile(ordered, 99)),
+                "mean": _ms(sum(ordered) / calls if calls else None),
+                "max": _ms(ordered[-1] if ordered else None)
+            },
+            "throughput": {
+                "calls_per_sec": round(calls / self.wall_s, 1) if self.wall_s else None,
+                "rows_per_sec": round(self.rows / self.wall_s, 1) if self.rows and self.wall_s else None
+            },
+            "rows": self.rows,
+            "response_bytes": {
+                "total": self.response_bytes,
+                "mean": round(self.response_bytes / calls) if calls else 0
+            },
+            "wall_s": round(self.wall_s, 3),
+            "peak_rss_mb": rss_after,
+            "rss_growth_mb": round(rss_after - self.rss_before, 1) if rss_after is not None else None
+        }
+        if self.last_error:
+            report["last_error"] = self.last_error
+        return report
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+async def run_calls(server, tool, argument_list, concurrency, rows_per_call=0):
+    """Issue independent calls to ``tool``, ``concurrency`` at a time."""
+    run = ToolRun(tool)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(arguments):
+        async with limit:
+            await run.call(server, tool, arguments)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(arguments) for arguments in argument_list))
+    run.wall_s = time.perf_counter() - started
+    run.rows = rows_per_call * (len(run.latencies) - run.errors)
+    return run.report()
+
+
+async def drain(server, tool, first_arguments, next_arguments, rows_after, label=None):
+    """Follow a paged tool until its cursor runs out; each page is one measured call.
+
+    ``rows_after(page, rows)`` returns the running row total once ``page`` is read.
+    """
+    run = ToolRun(label or tool)
+    started = time.perf_counter()
+    name, arguments = tool, first_arguments
+    while True:
+        page = await run.call(server, name, arguments)
+        if page is None:
+            break
+        run.rows = rows_after(page, run.rows)
+        if not page.get("cursor"):
+            break
+        name, arguments = next_arguments(page)
+    run.wall_s = time.perf_counter() - started
+    return run.report()
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def load_server(kind, args):
+    """Import one MCP server module with its backend pointed at the fakes or local services."""
+    sys.path.insert(0, SERVERS[kind])
+    fake_es = FakeElasticsearch(args.index, args.docs)
+    latency_s = args.fake_latency_ms / 1000
+
+    if kind == "postgres" and args.backend == "fake":
+        import psycopg2
+        psycopg2.connect = FakeDatabase(args.fake_latency_ms).connect
+    if args.backend == "local":
+        os.environ.setdefault("ELASTICSEARCH_URL", "http://localhost:9200")
+        os.environ.setdefault("POSTGRES_HOST", "localhost")
+
+    import server
+
+    if args.backend == "fake":
+        if kind == "elasticsearch":
+            server.es_client = server.TimedClient(AsyncFakeClient(fake_es, latency_s))
+        else:
+            import pipeline
+            pipeline._es_client = SyncFakeClient(fake_es, latency_s)
+    return server
+
+
+async def elasticsearch_scenarios(server, args, rng):
+    index = args.index
+    documents = args.docs
+    results = []
+
+    def random_ids(count):
+        return [product_id(rng.randrange(documents)) for _ in range(count)]
+
+    results.append(await run_calls(server, "get_document", [
+        {"index": index, "doc_id": doc_id} for doc_id in random_ids(args.calls)
+    ], args.concurrency, rows_per_call=1))
+
+    results.append(await run_calls(server, "search_documents", [
+        {"index": index, "query": {"term": {"category": rng.choice(CATEGORIES)}}, "size": args.page_size}
+        for _ in range(args.calls)
+    ], args.concurrency, rows_per_call=min(args.page_size, documents)))
+
+    results.append(await run_calls(server, "multi_get", [
+        {"index": index, "ids": random_ids(50)} for _ in range(args.calls)
+    ], args.concurrency, rows_per_call=50))
+
+    results.append(await run_calls(server, "multi_search", [
+        {"index": index, "size": 10, "searches": [
+            {"query": {"term": {"category": category}}} for category in rng.sample(CATEGORIES, 5)
+        ]}
+        for _ in range(args.calls)
+    ], args.concurrency))
+
+    results.append(await run_calls(server, "count_documents", [{"index": index}] * args.calls, args.concurrency))
+
+    results.append(await run_calls(server, "aggregate", [
+        {"index": index, "type": "terms", "field": "category", "metrics": ["price"]}
+    ] * args.calls, args.concurrency))
+
+    results.append(await run_calls(server, "get_mapping", [{"index": index}] * args.calls, args.concurrency))
+
+    for label, projection in (("bulk_export", {}), ("bulk_export[source_includes=id,price]",
+                                                   {"source_includes": ["id", "price"]})):
+        results.append(await drain(
+            server, "bulk_export",
+            {"index": index, "batch_size": args.batch_size, **projection},
+            lambda page: ("bulk_export", {"index": index, "batch_size": args.batch_size, "cursor": page["cursor"]}),
+            lambda page, rows: rows + page["exported"],
+            label
+        ))
+    return results
+
+
+async def postgres_scenarios(server, args, rng):
+    table = args.table
+    documents = args.docs
+    results = []
+
+    results.append(await run_calls(server, "create_table", [{"table": table, "columns": {
+        "id": "VARCHAR(50) PRIMARY KEY", "name": "VARCHAR(255)", "category": "VARCHAR(100)",
+        "subcategory": "VARCHAR(100)", "price": "DECIMAL(10, 2)", "description": "TEXT",
+        "stock_quantity": "INTEGER", "created_at": "TIMESTAMP WITH TIME ZONE", "ratings": "DECIMAL(3, 2)",
+        "reviews_count": "INTEGER", "brand": "VARCHAR(100)", "tags": "TEXT[]"
+    }}], 1))
+
+    # Each bulk_insert call carries one batch; the whole dataset is loaded per variant
+    for label, options in (("bulk_insert", {}), ("bulk_insert[validate=false]", {"validate": False}),
+                           (f"bulk_insert[writers={args.writers}]", {"writers": args.writers})):
+        batches = [
+            {"table": table, "on_conflict": "update", **options,
+             "data": [product(position) for position in range(start, min(start + args.batch_size, documents))]}
+            for start in range(0, documents, args.batch_size)
+        ]
+        run = ToolRun(label)
+        started = time.perf_counter()
+        for arguments in batches:
+            result = await run.call(server, "bulk_insert", arguments)
+            if result:
+                run.rows += result.get("inserted", 0)
+        run.wall_s = time.perf_counter() - started
+        results.append(run.report())
+        del batches
+
+    results.append(await run_calls(server, "insert_data", [
+        {"table": table, "data": {**product(documents + number), "id": f"BENCH-I{number:08d}"}}
+        for number in range(args.calls)
+    ], args.concurrency, rows_per_call=1))
+
+    results.append(await run_calls(server, "execute_write_query", [
+        {"query": f"UPDATE {table} SET price = %s WHERE id = %s",
+         "params": [round(rng.uniform(5, 500), 2), product_id(rng.randrange(documents))]}
+        for _ in range(args.calls)
+    ], args.concurrency, rows_per_call=1))
+
+    results.append(await run_calls(server, "count_rows", [{"table": table}] * args.calls, args.concurrency))
+    results.append(await run_calls(server, "get_schema", [{"table": table}] * args.calls, args.concurrency))
+
+    results.append(await drain(
+        server, "execute_query",
+        {"query": f"SELECT * FROM {table}", "page_size": args.page_size},
+        lambda page: ("fetch_query_page", {"cursor": page["cursor"], "page_size": args.page_size}),
+        lambda page, rows: page["fetched_so_far"]
+    ))
+
+    if not args.skip_transfer:
+        results.append(await run_calls(server, "transfer_from_elasticsearch", [{
+            "index": args.index, "table": table, "mapping": TRANSFER_MAPPING,
+            "on_conflict": "update", "batch_size": args.batch_size
+        }], 1, rows_per_call=documents))
+
+    if args.backend == "local":
+        await server.call_tool("execute_write_query", {"query": f"DELETE FROM {table}"})
+    return results
+
+
+async def run_server(kind, args):
+    global RESPONSE_FORMAT
+    RESPONSE_FORMAT = args.format
+    server = load_server(kind, args)
+    rng = random.Random(args.seed)
+    scenarios = elasticsearch_scenarios if kind == "elasticsearch" else postgres_scenarios
+    started = time.perf_counter()
+    try:
+        tools = await scenarios(server, args, rng)
+    finally:
+        if kind == "postgres":
+            server.db_executor.shutdown(wait=True)
+            server.query_cursors.close_all()
+            server.db_pool.close()
+    return {
+        "server": kind,
+        "docs": args.docs,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "tools": tools,
+        # The server's own per-tool metrics (phase split, rows, error classes) for the same calls
+        "server_metrics": server.tool_metrics.snapshot()
+    }
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def parse_sizes(text):
+    sizes = []
+    for item in text.split(","):
+        item = item.strip().lower()
+        multiplier = {"k": 1000, "m": 1000000}.get(item[-1:], 1)
+        sizes.append(int(float(item.rstrip("km")) * multiplier))
+    return sizes
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def child_command(args, kind, docs):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", kind, "--docs", str(docs),
+        "--backend", args.backend, "--calls", str(args.calls), "--concurrency", str(args.concurrency),
+        "--page-size", str(args.page_size), "--batch-size", str(args.batch_size), "--writers", str(args.writers),
+        "--fake-latency-ms", str(args.fake_latency_ms), "--seed", str(args.seed),
+        "--index", args.index, "--table", args.table, "--format", args.format
+    ]
+    if args.skip_transfer:
+        command.append("--skip-transfer")
+    return command
+
+
+def print_table(runs):
+    for run in runs:
+        print(f"\n{run['server']} — {run['docs']:,} docs ({run['elapsed_s']}s, peak RSS {run['peak_rss_mb']} MiB)")
+        print(f"  {'tool':<40} {'calls':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'calls/s':>9} {'rows/s':>11} {'bytes/call':>11}")
+        for tool in run["tools"]:
+            latency = tool["latency_ms"]
+            print(f"  {tool['tool']:<40} {tool['calls']:>6} {tool['errors']:>4} "
+                  f"{_cell(latency['p50'])} {_cell(latency['p95'])} {_cell(latency['p99'])} "
+                  f"{_cell(tool['throughput']['calls_per_sec'])} {_cell(tool['throughput']['rows_per_sec'], 11)} "
+                  f"{tool['response_bytes']['mean']:>11,}")
+            if tool.get("last_error"):
+                print(f"    ! {tool['last_error'][:120]}")
+
+
+def _cell(value, width=9):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width},.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP servers' tools in-process")
+    parser.add_argument("--server", choices=["elasticsearch", "postgres", "all"], default="all")
+    parser.add_argument("--docs", default="1000", help="Comma-separated dataset sizes, e.g. 1k,100k,10m")
+    parser.add_argument("--backend", choices=["fake", "local"], default="fake",
+                        help="In-process fakes (default) or the services from ELASTICSEARCH_URL / POSTGRES_*")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per point-lookup tool")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent calls for point-lookup tools")
+    parser.add_argument("--page-size", type=int, default=500, help="Rows per search / query page")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk_insert call / export page")
+    parser.add_argument("--writers", type=int, default=4, help="Writers for the parallel bulk_insert variant")
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0, help="Simulated round trip per fake request")
+    parser.add_argument("--index", default="bench_products", help="Elasticsearch index (local backend: must exist)")
+    parser.add_argument("--table", default="bench_products", help="PostgreSQL table the benchmark writes")
+    parser.add_argument("--skip-transfer", action="store_true", help="Leave out transfer_from_elasticsearch")
+    parser.add_argument("--format", choices=["compact", "pretty", "columnar"], default="compact",
+                        help="Response encoding requested from every tool")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results as JSON to this file ('-' for stdout)")
+    parser.add_argument("--child", choices=list(SERVERS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.docs = int(args.docs)
+        print(json.dumps(asyncio.run(run_server(args.child, args))))
+        return
+
+    runs = []
+    kinds = list(SERVERS) if args.server == "all" else [args.server]
+    for docs in parse_sizes(args.docs):
+        for kind in kinds:
+            print(f"Benchmarking {kind} with {docs:,} documents...", file=sys.stderr)
+            completed = subprocess.run(child_command(args, kind, docs), capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(completed.stderr, file=sys.stderr)
+                sys.exit(f"{kind} benchmark failed")
+            runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "settings": {
+            "calls": args.calls,
+            "concurrency": args.concurrency,
+            "page_size": args.page_size,
+            "batch_size": args.batch_size,
+            "writers": args.writers,
+            "fake_latency_ms": args.fake_latency_ms,
+            "format": args.format,
+            "seed": args.seed
+        },
+        "runs": runs
+    }
+
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+        return
+    print_table(runs)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
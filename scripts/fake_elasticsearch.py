@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Elasticsearch stand-in for benchmarks and load tests
+A deterministic synthetic product catalog, served in-process (FakeElasticsearch) or over
+HTTP on the REST endpoints the MCP servers use, so they can be load-tested without a cluster
+
+    python scripts/fake_elasticsearch.py --port 9201 --docs 1000000 --latency-ms 2
+    ELASTICSEARCH_URL=http://127.0.0.1:9201 python mcp-servers/elasticsearch-mcp/server.py
+
+Queries are not evaluated (every search matches the whole index); documents, paging,
+source filtering, point-in-time exports, slices and terms/stats aggregations behave
+like the real endpoints closely enough for the clients not to notice.
+"""
+
+import argparse
+import bisect
+import fnmatch
+import gzip
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# ---------------------------------------------------------------------------
+# Synthetic catalog: document N is computed from N, so 10M documents cost no memory
+# ---------------------------------------------------------------------------
+
+CATEGORIES = ["Electronics", "Home & Kitchen", "Sports", "Books", "Toys", "Beauty", "Garden", "Automotive"]
+BRANDS = ["AudioTech", "HomeChef", "FitPro", "PageTurner", "PlayWorld", "GlowUp", "GreenThumb", "DriveMax"]
+TAGS = ["wireless", "bestseller", "eco", "premium", "sale", "new", "gift", "outdoor", "compact", "smart"]
+WORDS = ("durable lightweight premium compact wireless ergonomic stainless adjustable portable "
+         "rechargeable waterproof versatile everyday reliable classic modern").split()
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+PRODUCT_MAPPING = {
+    "properties": {
+        "id": {"type": "keyword"},
+        "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+        "category": {"type": "keyword"},
+        "subcategory": {"type": "keyword"},
+        "price": {"type": "float"},
+        "description": {"type": "text"},
+        "stock_quantity": {"type": "integer"},
+        "created_at": {"type": "date"},
+        "ratings": {"type": "float"},
+        "reviews_count": {"type": "integer"},
+        "brand": {"type": "keyword"},
+        "tags": {"type": "keyword"},
+    }
+}
+
+
+def product_id(position):
+    return f"BENCH-{position:08d}"
+
+
+def product(position):
+    """The synthetic product stored at ``position``; deterministic and roughly sample-data sized."""
+    return dict(_product(position))
+
+
+@lru_cache(maxsize=100000)
+def _product(position):
+    # Cached so generating documents does not dominate what the fakes are measuring
+    category = position % len(CATEGORIES)
+    words = [WORDS[(position * 7 + offset) % len(WORDS)] for offset in range(8 + position % 17)]
+    return {
+        "id": product_id(position),
+        "name": f"{BRANDS[category]} {WORDS[position % len(WORDS)].title()} {position}",
+        "category": CATEGORIES[category],
+        "subcategory": f"{CATEGORIES[category]} {position % 5}",
+        "price": round(5 + (position * 7919 % 99500) / 100, 2),
+        "description": " ".join(words),
+        "stock_quantity": position * 31 % 500,
+        "created_at": (EPOCH + timedelta(seconds=position * 37)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "ratings": round(1 + (position * 13 % 41) / 10, 1),
+        "reviews_count": position * 17 % 2000,
+        "brand": BRANDS[category],
+        "tags": [TAGS[(position + offset) % len(TAGS)] for offset in range(1 + position % 4)],
+    }
+
+
+def product_position(doc_id):
+    return int(str(doc_id).rsplit("-", 1)[-1])
+
+
+
+# ---------------------------------------------------------------------------
+# In-process Elasticsearch stand-in
+# ---------------------------------------------------------------------------
+
+class FakeResponse(dict):
+    """Dict response that also offers ``.body`` like the client's ObjectApiResponse."""
+
+    @property
+    def body(self):
+        return dict(self)
+
+
+def _project(document, source):
+    if source is None or source is True:
+        return document
+    if source is False:
+        return None
+    if isinstance(source, (list, str)):
+        source = {"includes": [source] if isinstance(source, str) else source}
+    includes = source.get("includes") or []
+    excludes = set(source.get("excludes") or [])
+    return {key: value for key, value in document.items()
+            if (not includes or key in includes) and key not in excludes}
+
+
+class FakeElasticsearch:
+    """Answers the client calls the MCP servers make, over ``documents`` generated products.
+
+    Queries are not evaluated: every search matches the whole index. Aggregations
+    are computed on an evenly spaced sample and scaled up to the index size.
+    """
+
+    AGGREGATION_SAMPLE = 10000
+
+    def __init__(self, index, documents):
+        self.index = index
+        self.documents = documents
+        self.indices = FakeIndices(self)
+        self._aggregations = {}
+
+    def _hit(self, position, source=None, docvalue_fields=None):
+        document = product(position)
+        hit = {"_index": self.index, "_id": document["id"], "_score": 1.0, "sort": [position]}
+        projected = _project(document, source)
+        if projected is not None:
+            hit["_source"] = projected
+        if docvalue_fields:
+            hit["fields"] = {field: [document[field]] for field in docvalue_fields if field in document}
+        return hit
+
+    def open_point_in_time(self, index, keep_alive):
+        return FakeResponse(id="fake-pit")
+
+    def close_point_in_time(self, id):
+        return FakeResponse(succeeded=True)
+
+    def count(self, index=None, query=None, **kwargs):
+        return FakeResponse(count=self.documents)
+
+    def get(self, index, id, **kwargs):
+        return FakeResponse(_index=index, _id=id, found=True, _source=product(product_position(id)))
+
+    def mget(self, docs, source=None, stored_fields=None, **kwargs):
+        return FakeResponse(docs=[
+            {**self._hit(product_position(doc["_id"]), source), "found": True}
+            for doc in docs
+        ])
+
+    def search(self, index=None, query=None, size=10, from_=0, pit=None, sort=None, search_after=None,
+               slice=None, aggs=None, source=None, docvalue_fields=None, **kwargs):
+        # Every document matches; a slice narrows that to every max-th position from its id
+        matching = range(self.documents)
+        if slice:
+            matching = matching[slice["id"]::slice["max"]]
+        response = FakeResponse(took=1, timed_out=False, hits={
+            "total": {"value": len(matching), "relation": "eq"},
+            "hits": []
+        })
+        if pit:
+            response["pit_id"] = pit["id"]
+        if aggs:
+            response["aggregations"] = {name: self._aggregation(body) for name, body in aggs.items()}
+        if not size:
+            return response
+
+        # Sort values are positions, so search_after resumes just past one
+        start = bisect.bisect_right(matching, search_after[0]) if search_after else from_
+        positions = matching[start:start + size]
+        response["hits"]["hits"] = [self._hit(position, source, docvalue_fields) for position in positions]
+        return response
+
+    def msearch(self, searches, **kwargs):
+        responses = []
+        for header, body in zip(searches[::2], searches[1::2]):
+            body = dict(body)
+            body["source"] = body.pop("_source", None)
+            body["from_"] = body.pop("from", 0)
+            responses.append({**self.search(index=header.get("index"), **body), "status": 200})
+        return FakeResponse(took=1, responses=responses)
+
+    def _aggregation(self, body):
+        key = json.dumps(body, sort_keys=True)
+        if key not in self._aggregations:
+            self._aggregations[key] = self._aggregate(body)
+        return self._aggregations[key]
+
+    def _aggregate(self, body):
+        step = max(1, self.documents // self.AGGREGATION_SAMPLE)
+        sample = [product(position) for position in range(0, self.documents, step)]
+        scale = self.documents / len(sample) if sample else 0
+        if "stats" in body:
+            return _stats([document[body["stats"]["field"]] for document in sample], scale)
+        if "terms" not in body:
+            raise ValueError("The benchmark stand-in only evaluates terms and stats aggregations")
+
+        field = body["terms"]["field"].removesuffix(".keyword")
+        groups = {}
+        for document in sample:
+            groups.setdefault(document[field], []).append(document)
+        ordered = sorted(groups.items(), key=lambda item: -len(item[1]))
+        buckets = []
+        for key, documents in ordered[:body["terms"].get("size", 10)]:
+            bucket = {"key": key, "doc_count": round(len(documents) * scale)}
+            for name, metric in (body.get("aggs") or {}).items():
+                bucket[name] = _stats([document[metric["stats"]["field"]] for document in documents], scale)
+            buckets.append(bucket)
+        return {
+            "doc_count_error_upper_bound": 0,
+            "sum_other_doc_count": sum(round(len(documents) * scale) for _, documents in ordered[len(buckets):]),
+            "buckets": buckets
+        }
+
+    def close(self):
+        pass
+
+
+def _stats(values, scale):
+    if not values:
+        return {"count": 0, "min": None, "max": None, "avg": None, "sum": 0.0}
+    total = sum(values)
+    return {
+        "count": round(len(values) * scale),
+        "min": min(values),
+        "max": max(values),
+        "avg": total / len(values),
+        "sum": total * scale
+    }
+
+
+class FakeIndices:
+    def __init__(self, es):
+        self._es = es
+
+    def get_alias(self, index="*"):
+        return FakeResponse({self._es.index: {"aliases": {}}})
+
+    def get_mapping(self, index):
+        return FakeResponse({index: {"mappings": PRODUCT_MAPPING}})
+
+
+# ---------------------------------------------------------------------------
+# REST endpoints over the stand-in
+# ---------------------------------------------------------------------------
+
+VERSION = "8.11.3"  # as in docker-compose.yml
+SHARDS = {"total": 1, "successful": 1, "skipped": 0, "failed": 0}
+
+
+class RequestError(Exception):
+    """An error answered with Elasticsearch's error body."""
+
+    def __init__(self, status, error_type, reason):
+        super().__init__(reason)
+        self.status = status
+        self.error_type = error_type
+
+    def body(self):
+        cause = {"type": self.error_type, "reason": str(self)}
+        return {"error": {"root_cause": [cause], **cause}, "status": self.status}
+
+
+def _csv(value):
+    if isinstance(value, list):
+        return value
+    return [part for part in value.split(",") if part]
+
+
+def source_filter(params, body=None):
+    """A request's ``_source`` setting, from its body or the _source* URL parameters."""
+    if body and "_source" in body:
+        return body["_source"]
+    if "_source" in params:
+        if params["_source"] in ("true", "false"):
+            return params["_source"] == "true"
+        return _csv(params["_source"])
+    includes = _csv(params.get("_source_includes", ""))
+    excludes = _csv(params.get("_source_excludes", ""))
+    if includes or excludes:
+        return {"includes": includes, "excludes": excludes}
+    return None
+
+
+class FakeElasticsearchAPI:
+    """Answers REST requests from a FakeElasticsearch; every endpoint returns (status, body)."""
+
+    def __init__(self, es):
+        self.es = es
+
+    def handle(self, method, path, params, body):
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        if not parts:
+            return 200, self.info()
+        if parts[0].startswith("_"):
+            index, endpoint, rest = None, parts[0], parts[1:]
+        else:
+            index, endpoint, rest = parts[0], parts[1] if len(parts) > 1 else None, parts[2:]
+
+        if endpoint is None and method in ("GET", "HEAD"):
+            return 200, {name: {"aliases": {}, "mappings": PRODUCT_MAPPING} for name in self._indices(index)}
+        if endpoint == "_search" and method in ("GET", "POST"):
+            return self.search(index, params, body or {})
+        if endpoint == "_count" and method in ("GET", "POST"):
+            self._indices(index)
+            return 200, {"count": self.es.documents, "_shards": SHARDS}
+        if endpoint == "_doc" and method == "GET" and len(rest) == 1:
+            return self.get(index, rest[0], params)
+        if endpoint == "_mget" and method in ("GET", "POST"):
+            return self.mget(index, params, body or {})
+        if endpoint == "_msearch" and method in ("GET", "POST"):
+            return self.msearch(index, body or [])
+        if endpoint == "_pit" and method == "POST" and index:
+            self._indices(index)
+            return 200, dict(self.es.open_point_in_time(index, params.get("keep_alive")))
+        if endpoint == "_pit" and method == "DELETE":
+            self.es.close_point_in_time((body or {}).get("id"))
+            return 200, {"succeeded": True, "num_freed": 1}
+        if endpoint == "_alias" and method == "GET":
+            return 200, {name: {"aliases": {}} for name in self._indices(index)}
+        if endpoint == "_mapping" and method == "GET":
+            return 200, {name: {"mappings": PRODUCT_MAPPING} for name in self._indices(index)}
+        raise RequestError(400, "illegal_argument_exception", f"no handler found for uri [{path}] and method [{method}]")
+
+    def info(self):
+        return {
+            "name": "fake-elasticsearch",
+            "cluster_name": "fake-elasticsearch",
+            "cluster_uuid": "fake-elasticsearch",
+            "version": {
+                "number": VERSION,
+                "build_flavor": "default",
+                "minimum_wire_compatibility_version": "7.17.0",
+                "minimum_index_compatibility_version": "7.0.0"
+            },
+            "tagline": "You Know, for Search"
+        }
+
+    def _indices(self, index):
+        """Existing index names matched by ``index``; a missing concrete name is a 404 as in Elasticsearch."""
+        if index in (None, "_all", "*"):
+            return [self.es.index]
+        names = []
+        for name in _csv(index):
+            if "*" in name:
+                if fnmatch.fnmatchcase(self.es.index, name):
+                    names.append(self.es.index)
+            elif name == self.es.index:
+                names.append(name)
+            else:
+                raise RequestError(404, "index_not_found_exception", f"no such index [{name}]")
+        return names
+
+    def _position(self, doc_id):
+        """Catalog position of ``doc_id``, or None when the index has no such document."""
+        try:
+            position = product_position(doc_id)
+        except ValueError:
+            return None
+        if 0 <= position < self.es.documents and product_id(position) == doc_id:
+            return position
+        return None
+
+    def search(self, index, params, body):
+        if index is not None:
+            self._indices(index)
+        docvalue_fields = [field["field"] if isinstance(field, dict) else field
+                           for field in body.get("docvalue_fields") or []]
+        response = self.es.search(
+            index=index,
+            query=body.get("query"),
+            size=int(params.get("size", body.get("size", 10))),
+            from_=int(params.get("from", body.get("from", 0))),
+            pit=body.get("pit"),
+            sort=body.get("sort"),
+            search_after=body.get("search_after"),
+            slice=body.get("slice"),
+            aggs=body.get("aggs") or body.get("aggregations"),
+            source=source_filter(params, body),
+            docvalue_fields=docvalue_fields
+        )
+        return 200, {**response, "_shards": SHARDS}
+
+    def get(self, index, doc_id, params):
+        self._indices(index)
+        position = self._position(doc_id)
+        if position is None:
+            return 404, {"_index": index, "_id": doc_id, "found": False}
+        hit = self.es._hit(position, source_filter(params))
+        return 200, {"_index": index, "_id": doc_id, "_version": 1, "found": True,
+                     **{key: hit[key] for key in ("_source",) if key in hit}}
+
+    def mget(self, index, params, body):
+        docs = body.get("docs") or [{"_id": doc_id} for doc_id in body.get("ids", [])]
+        results = []
+        for doc in docs:
+            name = doc.get("_index", index)
+            doc_id = str(doc["_id"])
+            if name != self.es.index:
+                error = RequestError(404, "index_not_found_exception", f"no such index [{name}]")
+                results.append({"_index": name, "_id": doc_id, "error": error.body()["error"]})
+                continue
+            position = self._position(doc_id)
+            if position is None:
+                results.append({"_index": name, "_id": doc_id, "found": False})
+                continue
+            hit = self.es._hit(position, doc.get("_source", source_filter(params)))
+            hit.pop("_score")
+            hit.pop("sort")
+            results.append({**hit, "_version": 1, "found": True})
+        return 200, {"docs": results}
+
+    def msearch(self, index, lines):
+        responses = []
+        for header, body in zip(lines[::2], lines[1::2]):
+            target = header.get("index", index)
+            try:
+                status, response = self.search(",".join(_csv(target)) if target else None, {}, body)
+                responses.append({**response, "status": status})
+            except RequestError as e:
+                responses.append(e.body())
+            except ValueError as e:
+                responses.append(RequestError(400, "illegal_argument_exception", str(e)).body())
+        return 200, {"took": 1, "responses": responses}
+
+
+def _parse_body(raw, path):
+    if not raw:
+        return None
+    if path.rstrip("/").endswith("_msearch"):
+        return [json.loads(line) for line in raw.splitlines() if line.strip()]
+    return json.loads(raw)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as the clients' connection pools expect
+    disable_nagle_algorithm = True  # headers and body are separate writes; Nagle + delayed ACK would add ~40 ms
+
+    def _respond(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            if self.headers.get("Content-Encoding") == "gzip":
+                raw = gzip.decompress(raw)
+            status, payload = self.server.api.handle(self.command, url.path, params, _parse_body(raw, url.path))
+        except RequestError as e:
+            status, payload = e.status, e.body()
+        except ValueError as e:  # malformed bodies and aggregations the stand-in does not compute
+            status, payload = 400, RequestError(400, "illegal_argument_exception", str(e)).body()
+        except Exception as e:
+            status, payload = 500, RequestError(500, "exception", f"{type(e).__name__}: {e}").body()
+
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        data = b"" if self.command == "HEAD" else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")  # checked by the 8.x clients
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeElasticsearchServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering Elasticsearch REST requests from a FakeElasticsearch."""
+
+    daemon_threads = True
+    request_queue_size = 128  # the clients open up to connections_per_node sockets at once
+
+    def __init__(self, address, es, latency_ms=0.0):
+        super().__init__(address, RequestHandler)
+        self.api = FakeElasticsearchAPI(es)
+        self.latency_s = latency_ms / 1000
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic product index over the Elasticsearch REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9201, help="Port to listen on (0 picks a free one)")
+    parser.add_argument("--index", default="bench_products", help="Name of the synthetic index")
+    parser.add_argument("--docs", type=int, default=100000, help="Documents in the index")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated service time per request")
+    args = parser.parse_args()
+
+    server = FakeElasticsearchServer((args.host, args.port), FakeElasticsearch(args.index, args.docs), args.latency_ms)
+    # The URL is the first line on stdout, for scripts that start the stand-in with --port 0
+    print(server.url, flush=True)
+    print(f"Serving {args.docs:,} documents as index {args.index} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,243 @@
 #!/usr/bin/env python3
 """
-Load sample data into Elasticsearch
-Simple script to bulk insert products from JSON file
+Load product data into Elasticsearch
+Streams the sample products, or any number of generated ones, through the bulk helpers
+
+    python scripts/load-sample-data.py                                  # data/sample-data.json
+    python scripts/load-sample-data.py --generate 5000000 --threads 8   # synthetic catalog
+
+Documents are produced lazily and fed straight into parallel_bulk (or streaming_bulk
+with --threads 1), so memory stays flat however many are loaded. Refresh is switched
+off for the duration of the load and restored afterwards.
 """
 
+import argparse
 import json
+import random
 import sys
+import time
+from datetime import datetime, timedelta, timezone
+
 from elasticsearch import Elasticsearch
+from elasticsearch.helpers import parallel_bulk, streaming_bulk
+
+SAMPLE_FILE = "data/sample-data.json"
+
+# Same settings and mapping as data/init-elasticsearch.sh
+INDEX_BODY = {
+    "settings": {
+        "number_of_shards": 1,
+        "number_of_replicas": 0,
+        "analysis": {
+            "analyzer": {
+                "product_analyzer": {"type": "standard", "stopwords": "_english_"}
+            }
+        }
+    },
+    "mappings": {
+        "properties": {
+            "id": {"type": "keyword"},
+            "name": {"type": "text", "analyzer": "product_analyzer", "fields": {"keyword": {"type": "keyword"}}},
+            "category": {"type": "keyword"},
+            "subcategory": {"type": "keyword"},
+            "price": {"type": "float"},
+            "description": {"type": "text", "analyzer": "product_analyzer"},
+            "stock_quantity": {"type": "integer"},
+            "created_at": {"type": "date"},
+            "ratings": {"type": "float"},
+            "reviews_count": {"type": "integer"},
+            "brand": {"type": "keyword"},
+            "tags": {"type": "keyword"}
+        }
+    }
+}
 
-# Connect to Elasticsearch
-es = Elasticsearch(['http://localhost:9200'])
+# Catalog vocabulary modelled on the sample products:
+# category -> subcategory -> (product nouns, price range, tags)
+CATALOG = {
+    "Electronics": {
+        "Audio": (["Headphones", "Earbuds", "Speaker", "Soundbar"], (19, 399), ["wireless", "bluetooth", "noise-cancelling", "bass"]),
+        "Wearables": (["Fitness Watch", "Smart Band", "Sleep Tracker"], (29, 449), ["fitness", "smartwatch", "health", "gps"]),
+        "Displays": (["Monitor", "Portable Display", "Ultrawide Monitor"], (99, 1299), ["4k", "monitor", "gaming", "hdr"]),
+        "Accessories": (["Keyboard", "Mouse", "Docking Station", "Webcam"], (9, 249), ["usb-c", "rgb", "gaming", "ergonomic"]),
+        "Storage": (["SSD", "External Drive", "Memory Card"], (15, 599), ["ssd", "portable", "backup", "fast"]),
+        "Video": (["Webcam", "Action Camera", "Streaming Camera"], (29, 499), ["1080p", "4k", "streaming", "usb"]),
+    },
+    "Furniture": {
+        "Office": (["Office Chair", "Standing Desk", "Desk Converter", "Filing Cabinet"], (79, 999), ["ergonomic", "office", "adjustable", "furniture"]),
+        "Accessories": (["Monitor Arm", "Footrest", "Cable Tray"], (15, 199), ["mount", "desk", "organization"]),
+    },
+    "Accessories": {
+        "Bags": (["Laptop Bag", "Backpack", "Messenger Bag", "Sleeve"], (19, 249), ["leather", "laptop-bag", "travel", "professional"]),
+        "Organization": (["Desk Organizer", "Cable Box", "Drawer Set"], (9, 89), ["organizer", "desk", "storage"]),
+    },
+    "Lighting": {
+        "Desk": (["Desk Lamp", "Light Bar", "Clip Light"], (15, 149), ["smart", "led", "desk-lamp", "dimmable"]),
+        "Ambient": (["Light Strip", "Floor Lamp", "Smart Bulb"], (9, 199), ["smart", "rgb", "wifi"]),
+    },
+}
+BRANDS = {
+    "Electronics": ["AudioTech", "FitGear", "ViewMax", "KeyPro", "SoundWave", "ConnectHub", "GamePro", "SpeedDrive", "ViewCam"],
+    "Furniture": ["ComfortSeating", "DeskRise", "MountTech", "WorkWell"],
+    "Accessories": ["CarryStyle", "Organizer", "PackRight"],
+    "Lighting": ["LightSmart", "Lumina", "GlowCo"],
+}
+ADJECTIVES = ["Wireless", "Smart", "Premium", "Ergonomic", "Compact", "Pro", "Ultra", "Portable", "Adjustable", "Classic"]
+FEATURES = [
+    "with a 2-year warranty", "with fast USB-C charging", "in recycled materials", "with all-day battery life",
+    "with adjustable height", "with a minimalist design", "with app control", "built for everyday use",
+    "with premium build quality", "with tool-free assembly",
+]
+CREATED_FROM = datetime(2023, 1, 1, tzinfo=timezone.utc)
+CREATED_SPAN_S = 3 * 365 * 24 * 3600
 
-# Check connection
-if not es.ping():
-    print("❌ Cannot connect to Elasticsearch!")
-    sys.exit(1)
 
-print("✅ Connected to Elasticsearch")
+def sample_products():
+    """The bundled sample products."""
+    with open(SAMPLE_FILE, "r") as f:
+        yield from json.load(f)
 
-# Load sample data
-with open('data/sample-data.json', 'r') as f:
-    products = json.load(f)
 
-print(f"📦 Loaded {len(products)} products from file")
+def generated_products(count, start=0, seed=42):
+    """Yield ``count`` realistic products following the products mapping.
 
-# Bulk insert
-bulk_data = []
-for product in products:
-    bulk_data.append({
-        "index": {
-            "_index": "products",
-            "_id": product["id"]
+    The random stream is seeded with ``seed + start``, so a batch appended
+    with --start gets different products than the first batch.
+    """
+    rng = random.Random(seed + start)
+    categories = list(CATALOG)
+    weights = [6, 2, 2, 1]  # Electronics dominate, as in the sample data
+    for number in range(start, start + count):
+        category = rng.choices(categories, weights)[0]
+        subcategory = rng.choice(list(CATALOG[category]))
+        nouns, (low, high), tags = CATALOG[category][subcategory]
+        adjective = rng.choice(ADJECTIVES)
+        noun = rng.choice(nouns)
+        # Log-uniform prices cluster at the cheap end like a real catalog
+        price = round(round(low * (high / low) ** rng.random()) - 0.01, 2)
+        yield {
+            "id": f"GEN-{number:09d}",
+            "name": f"{adjective} {noun} {rng.choice(['', 'X', 'Plus', 'Max', 'Mini', 'S'])}".strip(),
+            "category": category,
+            "subcategory": subcategory,
+            "price": max(price, 0.99),
+            "description": f"{adjective} {noun.lower()} {rng.choice(FEATURES)} and {rng.choice(FEATURES)}",
+            "stock_quantity": int(rng.expovariate(1 / 120)),
+            "created_at": (CREATED_FROM + timedelta(seconds=rng.randrange(CREATED_SPAN_S))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "ratings": round(min(5.0, max(1.0, rng.gauss(4.3, 0.4))), 1),
+            "reviews_count": int(rng.paretovariate(1.2) * 20),
+            "brand": rng.choice(BRANDS[category]),
+            "tags": rng.sample(tags, rng.randint(1, min(3, len(tags)))),
         }
-    })
-    bulk_data.append(product)
 
-# Convert to newline-delimited JSON
-from elasticsearch.helpers import bulk
 
-actions = [
-    {
-        "_index": "products",
-        "_id": product["id"],
-        "_source": product
+def actions(index, products):
+    for product in products:
+        yield {"_index": index, "_id": product["id"], "_source": product}
+
+
+def parse_bytes(text):
+    """Parse sizes like 10485760, 512KB or 10MB."""
+    units = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+    text = text.strip().upper()
+    for suffix, multiplier in units.items():
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * multiplier)
+    return int(text)
+
+
+def bulk_results(es, args, stream):
+    """Feed ``stream`` through the bulk helper picked by --threads; yields (ok, item)."""
+    options = {
+        "chunk_size": args.chunk_size,
+        "max_chunk_bytes": args.max_chunk_bytes,
+        "raise_on_error": False,
+        "raise_on_exception": False,
     }
-    for product in products
-]
+    if args.threads > 1:
+        return parallel_bulk(es, stream, thread_count=args.threads, queue_size=args.queue_size, **options)
+    return streaming_bulk(es, stream, max_retries=args.max_retries, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load sample or generated products into Elasticsearch")
+    parser.add_argument("--url", default="http://localhost:9200", help="Elasticsearch URL")
+    parser.add_argument("--index", default="products", help="Target index (created with the products mapping if missing)")
+    parser.add_argument("--generate", type=int, metavar="N", help="Load N generated products instead of the sample file")
+    parser.add_argument("--start", type=int, default=0, help="First generated product number (to append to an earlier load)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for generated products")
+    parser.add_argument("--threads", type=int, default=4, help="parallel_bulk threads; 1 uses streaming_bulk")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Documents per bulk request")
+    parser.add_argument("--max-chunk-bytes", type=parse_bytes, default="10MB", help="Byte cap per bulk request, e.g. 5MB")
+    parser.add_argument("--queue-size", type=int, default=8, help="Chunks buffered ahead of the parallel_bulk threads")
+    parser.add_argument("--max-retries", type=int, default=3, help="Retries for rejected chunks (streaming_bulk only)")
+    parser.add_argument("--progress", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    # Connect to Elasticsearch
+    es = Elasticsearch([args.url], request_timeout=120)
+
+    # Check connection
+    if not es.ping():
+        print("❌ Cannot connect to Elasticsearch!")
+        sys.exit(1)
+
+    print("✅ Connected to Elasticsearch")
+
+    if not es.indices.exists(index=args.index):
+        es.indices.create(index=args.index, **INDEX_BODY)
+        print(f"🆕 Created index {args.index}")
+
+    if args.generate:
+        products = generated_products(args.generate, args.start, args.seed)
+        print(f"📦 Generating {args.generate:,} products")
+    else:
+        products = sample_products()
+        print(f"📦 Loading products from {SAMPLE_FILE}")
+
+    # Refreshing while bulk loading only produces segments that get merged away again
+    settings = es.indices.get_settings(index=args.index, name="index.refresh_interval")
+    previous_refresh = settings[args.index]["settings"].get("index", {}).get("refresh_interval")
+    es.indices.put_settings(index=args.index, settings={"index": {"refresh_interval": "-1"}})
+    print("⏸️  Refresh disabled for the load")
+
+    indexed = 0
+    failed = []
+    failed_count = 0
+    started = time.perf_counter()
+    last_report = started
+    try:
+        for ok, item in bulk_results(es, args, actions(args.index, products)):
+            if ok:
+                indexed += 1
+            else:
+                failed_count += 1
+                if len(failed) < 10:
+                    failed.append(item)
+            now = time.perf_counter()
+            if now - last_report >= args.progress:
+                last_report = now
+                done = indexed + failed_count
+                print(f"   … {done:,} documents, {done / (now - started):,.0f} docs/sec")
+    finally:
+        # None puts the index back on the default interval
+        es.indices.put_settings(index=args.index, settings={"index": {"refresh_interval": previous_refresh}})
+        es.indices.refresh(index=args.index)
+        print("🔄 Refresh restored and index refreshed")
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ Successfully indexed {indexed:,} documents in {elapsed:.1f}s ({indexed / elapsed:,.0f} docs/sec)")
+    if failed_count:
+        print(f"⚠️  Failed to index {failed_count:,} documents, first errors:")
+        for item in failed:
+            print(f"   {json.dumps(item)[:300]}")
 
-try:
-    success, failed = bulk(es, actions, raise_on_error=False)
-    print(f"✅ Successfully indexed {success} documents")
-    if failed:
-        print(f"⚠️  Failed to index {len(failed)} documents")
-except Exception as e:
-    print(f"❌ Error during bulk insert: {e}")
-    sys.exit(1)
+    # Verify count
+    count = es.count(index=args.index)
+    print(f"✅ Total documents in index: {count['count']:,}")
 
-# Refresh index
-es.indices.refresh(index="products")
-print("🔄 Index refreshed")
+    print("\n🎉 Data loading complete!")
 
-# Verify count
-count = es.count(index="products")
-print(f"✅ Total documents in index: {count['count']}")
 
-print("\n🎉 Data loading complete!")
+if __name__ == "__main__":
+    main()
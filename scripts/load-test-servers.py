@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Load-test an MCP server over one persistent stdio session
+Starts the server once, keeps the session open and drives a weighted, concurrent mix
+of tool calls through it, reporting latency percentiles and histograms per tool
+
+Elasticsearch requests go to the fake_elasticsearch.py stand-in unless --es-url is
+given; the PostgreSQL server uses the database from POSTGRES_* (e.g. a local
+postgres:16 initialised with data/init-postgres.sql).
+
+    python scripts/load-test-servers.py --server elasticsearch --requests 20000 --concurrency 1,8,32
+    POSTGRES_HOST=localhost python scripts/load-test-servers.py --server postgres --duration 30 --writes
+    python scripts/load-test-servers.py --server postgres --command "docker exec -i postgres-mcp python /app/server.py"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timezone
+
+from mcp_client import MCPClient, MixEntry, run_mix, tool_error, tool_payload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVERS = {
+    "elasticsearch": os.path.join(ROOT, "mcp-servers", "elasticsearch-mcp"),
+    "postgres": os.path.join(ROOT, "mcp-servers", "postgres-mcp"),
+}
+STAND_IN = os.path.join(ROOT, "scripts", "fake_elasticsearch.py")
+
+# Keys and values sampled from the live data so lookups hit existing rows
+SAMPLE_SIZE = 500
+
+SCRATCH_COLUMNS = {"id": "TEXT PRIMARY KEY", "value": "INTEGER", "note": "TEXT"}
+
+
+def start_stand_in(args):
+    """Start fake_elasticsearch.py on a free port; returns (process, url)."""
+    process = subprocess.Popen(
+        [sys.executable, STAND_IN, "--port", "0", "--index", args.index, "--docs", str(args.docs),
+         "--latency-ms", str(args.fake_latency_ms)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    url = process.stdout.readline().strip()
+    if not url:
+        process.kill()
+        sys.exit("The Elasticsearch stand-in did not start")
+    return process, url
+
+
+async def call(client, tool, arguments):
+    """Call a setup tool and return its payload, failing loudly on a tool error."""
+    result = await client.call_tool(tool, {**arguments, "format": "compact"})
+    error = tool_error(result)
+    if error:
+        sys.exit(f"{tool} failed during setup: {error}")
+    return tool_payload(result)
+
+
+async def elasticsearch_mix(client, args):
+    documents = (await call(client, "search_documents", {
+        "index": args.index, "size": SAMPLE_SIZE, "source_includes": ["id", "category"]
+    }))["documents"]
+    ids = [str(document["id"]) for document in documents if "id" in document]
+    if not ids:
+        sys.exit(f"No documents with an id field in {args.index}")
+    categories = sorted({document["category"] for document in documents if document.get("category")})
+    index = args.index
+
+    def search(rng):
+        query = {"term": {"category": rng.choice(categories)}} if categories else {"match_all": {}}
+        return {"index": index, "query": query, "size": 20}
+
+    return [
+        MixEntry("search_documents", search, weight=4),
+        MixEntry("get_document", lambda rng: {"index": index, "doc_id": rng.choice(ids)}, weight=4),
+        MixEntry("multi_get", lambda rng: {"index": index, "ids": rng.sample(ids, min(10, len(ids)))}, weight=2),
+        MixEntry("count_documents", {"index": index}, weight=1),
+        MixEntry("aggregate", {"index": index, "type": "terms", "field": "category", "metrics": ["price"]}, weight=1),
+        MixEntry("get_mapping", {"index": index}, weight=0.5),
+        MixEntry("list_indices", {}, weight=0.5),
+    ]
+
+
+async def postgres_mix(client, args):
+    rows = (await call(client, "execute_query", {
+        "query": f"SELECT id FROM {args.table} LIMIT {SAMPLE_SIZE}"
+    }))["rows"]
+    ids = [str(row["id"]).replace("'", "''") for row in rows]
+    if not ids:
+        sys.exit(f"{args.table} has no rows to look up")
+    table = args.table
+
+    mix = [
+        MixEntry("execute_query", lambda rng: {"query": f"SELECT * FROM {table} WHERE id = '{rng.choice(ids)}'"},
+                 weight=4, name="execute_query[by id]"),
+        MixEntry("execute_query", {"query": f"SELECT * FROM {table} ORDER BY id LIMIT 100"},
+                 weight=1, name="execute_query[page]"),
+        MixEntry("count_rows", {"table": table}, weight=2),
+        MixEntry("get_schema", {"table": table}, weight=1),
+        MixEntry("list_tables", {}, weight=1),
+    ]
+    if args.writes:
+        await call(client, "create_table", {"table": args.scratch_table, "columns": SCRATCH_COLUMNS})
+        scratch = args.scratch_table
+
+        def row(rng):
+            return {"id": uuid.uuid4().hex, "value": rng.randrange(1000), "note": "load-test"}
+
+        mix += [
+            MixEntry("insert_data", lambda rng: {"table": scratch, "data": row(rng)}, weight=1),
+            MixEntry("bulk_insert", lambda rng: {"table": scratch, "data": [row(rng) for _ in range(args.batch_size)]},
+                     weight=0.5),
+        ]
+    return mix
+
+
+def load_mix(path):
+    with open(path) as f:
+        return [MixEntry.from_dict(entry) for entry in json.load(f)]
+
+
+async def run(args):
+    stand_in = None
+    env = dict(os.environ)
+    if args.es_url:
+        env["ELASTICSEARCH_URL"] = args.es_url
+    elif not args.command:
+        stand_in, env["ELASTICSEARCH_URL"] = start_stand_in(args)
+        print(f"Elasticsearch stand-in with {args.docs:,} documents at {env['ELASTICSEARCH_URL']}", file=sys.stderr)
+
+    if args.command:
+        # The server keeps its own environment (e.g. inside a container)
+        command, cwd = shlex.split(args.command), None
+    else:
+        command, cwd = [sys.executable, "server.py"], SERVERS[args.server]
+
+    try:
+        client = MCPClient(command, cwd=cwd, env=env, stderr=asyncio.subprocess.DEVNULL,
+                           client_name="load-test-servers")
+        async with client:
+            tools = await client.list_tools()
+            if args.mix:
+                mix = load_mix(args.mix)
+            elif args.server == "elasticsearch":
+                mix = await elasticsearch_mix(client, args)
+            else:
+                mix = await postgres_mix(client, args)
+
+            if args.warmup:
+                print(f"Warming up with {args.warmup} requests...", file=sys.stderr)
+                await run_mix(client, mix, requests=args.warmup, concurrency=max(args.concurrency),
+                              seed=args.seed, timeout=args.timeout)
+
+            runs = []
+            for concurrency in args.concurrency:
+                print(f"Running the mix at concurrency {concurrency}...", file=sys.stderr)
+                runs.append(await run_mix(client, mix, requests=args.requests, duration=args.duration,
+                                          concurrency=concurrency, seed=args.seed, timeout=args.timeout))
+            server_metrics = tool_payload(await client.call_tool("server_stats", {"format": "compact"}))
+        return {
+            "server": args.server,
+            "server_info": client.server_info,
+            "command": command,
+            "tools": len(tools),
+            "mix": [{"name": entry.name, "tool": entry.tool, "weight": entry.weight} for entry in mix],
+            "runs": runs,
+            "server_metrics": server_metrics
+        }
+    finally:
+        if stand_in is not None:
+            stand_in.terminate()
+            stand_in.wait()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(result):
+    print(f"\n{result['server']} — one session, {result['tools']} tools ({' '.join(result['command'])})")
+    for run in result["runs"]:
+        print(f"\n  concurrency {run['concurrency']}: {run['requests']:,} requests in {run['wall_s']}s, "
+              f"{run['requests_per_sec']:,} req/s, {run['errors']} errors")
+        print(f"  {'request':<28} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  histogram (≤ms:count)")
+        for name, summary in run["by_request"].items():
+            latency = summary["latency_ms"]
+            histogram = " ".join(f"{bound}:{count}" for bound, count in summary["histogram_ms"])
+            print(f"  {name:<28} {summary['requests']:>7,} {summary['errors']:>5} {latency['p50']:>9,.1f} "
+                  f"{latency['p95']:>9,.1f} {latency['p99']:>9,.1f} {latency['max']:>9,.1f}  {histogram}")
+            for message, count in summary["error_messages"].items():
+                print(f"    ! {count}× {message[:110]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test an MCP server over one persistent stdio session")
+    parser.add_argument("--server", choices=list(SERVERS), required=True)
+    parser.add_argument("--command", help="Start the server with this command instead of 'python server.py', "
+                                          "e.g. 'docker exec -i postgres-mcp python /app/server.py'")
+    parser.add_argument("--requests", type=int, help="Requests per concurrency level (default: 2000 without --duration)")
+    parser.add_argument("--duration", type=float, help="Seconds per concurrency level (stops at --requests too)")
+    parser.add_argument("--concurrency", type=lambda text: [int(part) for part in text.split(",")], default=[8],
+                        help="Comma-separated in-flight request counts to run the mix at, e.g. 1,8,32")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured requests before the first level")
+    parser.add_argument("--mix", help="JSON file of [{tool, arguments, weight, name}] replacing the built-in mix")
+    parser.add_argument("--es-url", help="Elasticsearch to use instead of starting fake_elasticsearch.py")
+    parser.add_argument("--docs", type=int, default=100000, help="Documents in the Elasticsearch stand-in")
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0, help="Stand-in service time per request")
+    parser.add_argument("--index", help="Elasticsearch index (default: bench_products on the stand-in, else products)")
+    parser.add_argument("--table", default="products", help="PostgreSQL table the read mix queries")
+    parser.add_argument("--writes", action="store_true", help="Add insert_data and bulk_insert calls to the postgres mix")
+    parser.add_argument("--scratch-table", default="mcp_load_test", help="Table the --writes calls insert into")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per bulk_insert call with --writes")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before a request counts as timed out")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results as JSON to this file ('-' for stdout)")
+    args = parser.parse_args()
+    if args.requests is None and args.duration is None:
+        args.requests = 2000
+    if args.index is None:
+        args.index = "products" if args.es_url or args.command else "bench_products"
+
+    result = asyncio.run(run(args))
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "requests": args.requests,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "stand_in": not (args.es_url or args.command),
+            "docs": args.docs,
+            "fake_latency_ms": args.fake_latency_ms,
+            "seed": args.seed
+        },
+        **result
+    }
+
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+        return
+    print_table(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
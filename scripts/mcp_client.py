@@ -0,0 +1,293 @@
+"""
+Persistent-session MCP client for tests and load runs
+Keeps one stdio session open to a server process, pipelines JSON-RPC requests over it
+and records per-request latency histograms
+
+    async with MCPClient(["python", "server.py"], cwd="mcp-servers/postgres-mcp") as client:
+        tools = await client.list_tools()
+        result = await client.call_tool("count_rows", {"table": "products"})
+
+Requests are written as soon as they are issued and matched to their responses by id,
+so any number can be in flight on the one session; run_mix() drives a weighted mix of
+tool calls from several concurrent workers over it.
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+
+PROTOCOL_VERSION = "2024-11-05"
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+# Largest JSON-RPC line accepted from a server (bulk_export pages can be several MB)
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+class MCPError(Exception):
+    """A JSON-RPC error response."""
+
+    def __init__(self, error):
+        super().__init__(error.get("message", "JSON-RPC error"))
+        self.code = error.get("code")
+        self.data = error.get("data")
+
+
+def tool_error(result):
+    """The error text of a tools/call result, or None when the tool succeeded.
+
+    Both servers answer failures as a text item starting with "Error" rather than
+    setting isError, so either counts.
+    """
+    text = next((item.get("text", "") for item in result.get("content", []) if item.get("type") == "text"), "")
+    if result.get("isError") or text.startswith("Error"):
+        return text or "isError"
+    return None
+
+
+def tool_payload(result):
+    """The JSON payload of a successful tools/call result (the first text item, decoded)."""
+    for item in result.get("content", []):
+        if item.get("type") == "text":
+            return json.loads(item["text"])
+    return None
+
+
+class MCPClient:
+    """One MCP server process and the stdio session to it."""
+
+    def __init__(self, command, cwd=None, env=None, stderr=None, client_name="mcp-client"):
+        self.command = list(command)
+        self.cwd = cwd
+        self.env = env
+        self.stderr = stderr  # None inherits ours; asyncio.subprocess.DEVNULL silences the server
+        self.client_name = client_name
+        self.process = None
+        self.server_info = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._write_lock = asyncio.Lock()
+        self._reader = None
+        self._closed = None
+
+    async def __aenter__(self):
+        await self.start()
+        try:
+            await self.initialize()
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, cwd=self.cwd, env=self.env, stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE, stderr=self.stderr, limit=MAX_MESSAGE_BYTES
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+        return self
+
+    async def initialize(self):
+        result = await self.request("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": self.client_name, "version": "1.0"}
+        })
+        await self.notify("notifications/initialized")
+        self.server_info = result.get("serverInfo")
+        return result
+
+    async def list_tools(self):
+        return (await self.request("tools/list"))["tools"]
+
+    async def call_tool(self, name, arguments=None, timeout=None):
+        """Call a tool and return the raw result (``content`` list, ``isError``)."""
+        return await self.request("tools/call", {"name": name, "arguments": arguments or {}}, timeout)
+
+    async def request(self, method, params=None, timeout=None):
+        """Send one request and wait for its response; other requests may be in flight meanwhile."""
+        if self._closed is not None:
+            raise self._closed
+        request_id = next(self._ids)
+        response = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = response
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        try:
+            await self._send(message)
+            return await asyncio.wait_for(response, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def notify(self, method, params=None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._send(message)
+
+    async def _send(self, message):
+        async with self._write_lock:
+            self.process.stdin.write(json.dumps(message).encode() + b"\n")
+            await self.process.stdin.drain()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue  # stray output on stdout
+                response = self._pending.get(message.get("id"))
+                if response is None or response.done() or "method" in message:
+                    continue  # notifications and requests from the server are not needed here
+                if "error" in message:
+                    response.set_exception(MCPError(message["error"]))
+                else:
+                    response.set_result(message.get("result"))
+            self._closed = ConnectionError(f"server exited (code {await self.process.wait()})")
+        except Exception as e:
+            self._closed = ConnectionError(f"lost the server session: {e}")
+        for response in self._pending.values():
+            if not response.done():
+                response.set_exception(self._closed)
+
+    async def close(self, timeout=10.0):
+        """Close stdin, which ends a stdio server, and wait for the process (killing it after ``timeout``)."""
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), timeout)
+            except (asyncio.TimeoutError, ConnectionError):
+                self.process.kill()
+                await self.process.wait()
+        if self._reader is not None:
+            await self._reader
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class LatencyHistogram:
+    """Latency samples of one kind of request, with error counts by message."""
+
+    def __init__(self):
+        self.samples = []
+        self.errors = {}
+
+    def record(self, ms, error=None):
+        self.samples.append(ms)
+        if error:
+            error = error.splitlines()[0][:200]
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def buckets(self):
+        """Request counts per bucket as [upper bound ms or "+Inf", count], empty buckets left out."""
+        counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        for ms in self.samples:
+            counts[next((position for position, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound),
+                        len(LATENCY_BUCKETS_MS))] += 1
+        return [[bound, count] for bound, count in zip(LATENCY_BUCKETS_MS + ("+Inf",), counts) if count]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            "requests": len(ordered),
+            "errors": sum(self.errors.values()),
+            "latency_ms": {
+                "mean": round(sum(ordered) / len(ordered), 3) if ordered else None,
+                "p50": percentile(ordered, 50),
+                "p90": percentile(ordered, 90),
+                "p95": percentile(ordered, 95),
+                "p99": percentile(ordered, 99),
+                "max": ordered[-1] if ordered else None
+            },
+            "histogram_ms": self.buckets(),
+            "error_messages": dict(sorted(self.errors.items(), key=lambda item: -item[1])[:5])
+        }
+
+
+class MixEntry:
+    """One kind of request in a mix: a tool (or other method) call with a relative weight.
+
+    ``arguments`` is a dict or a function of a random.Random returning one, so
+    each call can look up different ids.
+    """
+
+    def __init__(self, tool, arguments=None, weight=1.0, name=None, method="tools/call"):
+        self.tool = tool
+        self.arguments = arguments or {}
+        self.weight = weight
+        self.name = name or tool
+        self.method = method
+
+    @classmethod
+    def from_dict(cls, entry):
+        return cls(entry.get("tool"), entry.get("arguments"), entry.get("weight", 1.0), entry.get("name"),
+                   entry.get("method", "tools/call"))
+
+    async def send(self, client, rng, timeout):
+        """Issue one request; returns the error text or None."""
+        if self.method != "tools/call":
+            await client.request(self.method, self.arguments or None, timeout)
+            return None
+        arguments = self.arguments(rng) if callable(self.arguments) else self.arguments
+        return tool_error(await client.call_tool(self.tool, arguments, timeout))
+
+
+async def run_mix(client, mix, requests=None, duration=None, concurrency=8, seed=42, timeout=None):
+    """Drive a weighted mix of requests over one session from ``concurrency`` workers.
+
+    Stops after ``requests`` requests or ``duration`` seconds, whichever comes
+    first. Latency is measured per request from issue to response, so it
+    includes time queued behind other in-flight requests on the server.
+    """
+    if requests is None and duration is None:
+        raise ValueError("run_mix needs requests or duration")
+    rng = random.Random(seed)
+    weights = list(itertools.accumulate(entry.weight for entry in mix))
+    histograms = {entry.name: LatencyHistogram() for entry in mix}
+    overall = LatencyHistogram()
+    issued = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def worker():
+        nonlocal issued
+        while (requests is None or issued < requests) and (deadline is None or time.perf_counter() < deadline):
+            issued += 1
+            entry = rng.choices(mix, cum_weights=weights)[0]
+            sent = time.perf_counter()
+            try:
+                error = await entry.send(client, rng, timeout)
+            except (MCPError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+            ms = round((time.perf_counter() - sent) * 1000, 3)
+            histograms[entry.name].record(ms, error)
+            overall.record(ms, error)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_s = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "wall_s": round(wall_s, 3),
+        "requests_per_sec": round(len(overall.samples) / wall_s, 1) if wall_s else None,
+        **overall.summary(),
+        "by_request": {name: histogram.summary() for name, histogram in histograms.items() if histogram.samples}
+    }
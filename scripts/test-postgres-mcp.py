@@ -1,108 +1,113 @@
 #!/usr/bin/env python3
 """
 Simple test for PostgreSQL MCP Server
-Tests by sending JSON-RPC requests via stdin/stdout
+Opens one persistent MCP session over stdin/stdout and exercises the read-only tools
+
+    python scripts/test-postgres-mcp.py            # the postgres-mcp container
+    python scripts/test-postgres-mcp.py --local    # mcp-servers/postgres-mcp/server.py with POSTGRES_* from the environment
+
+For latency and throughput under concurrent load use scripts/load-test-servers.py.
 """
 
+import argparse
+import asyncio
 import json
+import os
+import shlex
 import subprocess
 import sys
+import time
 
-def send_request(request):
-    """Send a request to the MCP server and get response"""
-    proc = subprocess.Popen(
-        ["docker", "exec", "-i", "postgres-mcp", "python", "/app/server.py"],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    
-    # Send request
-    stdout, stderr = proc.communicate(json.dumps(request))
-    
-    if stderr and "warning" not in stderr.lower():
-        print(f"STDERR: {stderr}")
-    
-    # Parse response (multiple JSON objects may be returned)
-    responses = []
-    for line in stdout.strip().split('\n'):
-        if line.strip():
-            try:
-                responses.append(json.loads(line))
-            except json.JSONDecodeError:
-                print(f"Could not parse: {line}")
-    
-    return responses
+from mcp_client import MCPClient, MCPError, tool_error
 
-def main():
-    print("🧪 Testing PostgreSQL MCP Server...\n")
-    
-    # Initialize the server first
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTAINER_COMMAND = "docker exec -i postgres-mcp python /app/server.py"
+
+CHECKS = [
+    ("list_tables", {}),
+    ("get_schema", {"table": "products"}),
+    ("count_rows", {"table": "products"}),
+    ("execute_query", {"query": "SELECT id, name, price FROM products ORDER BY id LIMIT 3"}),
+    ("server_stats", {}),
+]
+
+
+async def run(command, cwd):
+    failures = 0
     print("=" * 60)
     print("Initializing MCP server...")
     print("=" * 60)
-    
-    # Send initialize request
-    init_request = {
-        "jsonrpc": "2.0",
-        "id": 0,
-        "method": "initialize",
-        "params": {
-            "protocolVersion": "2024-11-05",
-            "capabilities": {},
-            "clientInfo": {
-                "name": "test-client",
-                "version": "1.0.0"
-            }
-        }
-    }
-    
-    responses = send_request(init_request)
-    print(f"✅ Initialize response received: {len(responses)} message(s)")
-    if responses:
-        print(json.dumps(responses[0], indent=2))
-    print()
-    
-    # Now we can list tools
-    print("=" * 60)
-    print("Test 1: List available tools")
-    print("=" * 60)
-    
-    tools_request = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/list",
-        "params": {}
-    }
-    
-    responses = send_request(tools_request)
-    if responses:
-        for response in responses:
-            if "result" in response:
-                tools = response["result"].get("tools", [])
-                print(f"✅ Found {len(tools)} tools:")
-                for tool in tools:
-                    print(f"   - {tool['name']}: {tool.get('description', '')[:60]}...")
-            elif "error" in response:
-                print(f"❌ Error: {response['error']}")
-    
+    started = time.perf_counter()
+    async with MCPClient(command, cwd=cwd, client_name="test-client") as client:
+        print(f"✅ Initialized in {(time.perf_counter() - started) * 1000:.0f} ms: {json.dumps(client.server_info)}")
+        print()
+
+        print("=" * 60)
+        print("Test 1: List available tools")
+        print("=" * 60)
+        tools = await client.list_tools()
+        print(f"✅ Found {len(tools)} tools:")
+        for tool in tools:
+            print(f"   - {tool['name']}: {tool.get('description', '')[:60]}...")
+
+        print("\n" + "=" * 60)
+        print("Test 2: Call tools over the same session")
+        print("=" * 60)
+        for name, arguments in CHECKS:
+            started = time.perf_counter()
+            try:
+                result = await client.call_tool(name, arguments, timeout=60)
+                error = tool_error(result)
+            except (MCPError, asyncio.TimeoutError) as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+            elapsed = (time.perf_counter() - started) * 1000
+            if error:
+                failures += 1
+                print(f"❌ {name} ({elapsed:.1f} ms): {error[:200]}")
+            else:
+                print(f"✅ {name} ({elapsed:.1f} ms): {result['content'][0]['text'][:120]}")
+
+        print("\n" + "=" * 60)
+        print("Test 3: Pipelined requests on one session")
+        print("=" * 60)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(client.call_tool("count_rows", {"table": "products"}) for _ in range(20)))
+        errors = sum(1 for result in results if tool_error(result))
+        failures += errors
+        print(f"{'❌' if errors else '✅'} 20 concurrent count_rows calls in "
+              f"{(time.perf_counter() - started) * 1000:.1f} ms, {errors} errors")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smoke-test the PostgreSQL MCP server over one stdio session")
+    parser.add_argument("--local", action="store_true", help="Run mcp-servers/postgres-mcp/server.py instead of the container")
+    parser.add_argument("--command", default=CONTAINER_COMMAND, help="Command that starts the server on stdio")
+    args = parser.parse_args()
+
+    if args.local:
+        command, cwd = [sys.executable, "server.py"], os.path.join(ROOT, "mcp-servers", "postgres-mcp")
+    else:
+        command, cwd = shlex.split(args.command), None
+        if args.command == CONTAINER_COMMAND:
+            # Check if postgres-mcp container is running
+            result = subprocess.run(
+                ["docker", "ps", "--filter", "name=postgres-mcp", "--format", "{{.Names}}"],
+                capture_output=True,
+                text=True
+            )
+            if "postgres-mcp" not in result.stdout:
+                print("❌ postgres-mcp container is not running!")
+                print("Start it with: docker-compose up -d postgres-mcp")
+                sys.exit(1)
+
+    print("🧪 Testing PostgreSQL MCP Server...\n")
+    failures = asyncio.run(run(command, cwd))
     print("\n" + "=" * 60)
-    print("Note: Full MCP protocol testing requires persistent connection")
-    print("For complete testing, use the server within Archestra UI")
+    print("✅ All checks passed" if not failures else f"❌ {failures} check(s) failed")
     print("=" * 60)
+    sys.exit(1 if failures else 0)
+
 
 if __name__ == "__main__":
-    # Check if postgres-mcp container is running
-    result = subprocess.run(
-        ["docker", "ps", "--filter", "name=postgres-mcp", "--format", "{{.Names}}"],
-        capture_output=True,
-        text=True
-    )
-    
-    if "postgres-mcp" not in result.stdout:
-        print("❌ postgres-mcp container is not running!")
-        print("Start it with: docker-compose up -d postgres-mcp")
-        sys.exit(1)
-    
     main()
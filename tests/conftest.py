@@ -0,0 +1,13 @@
+"""
+Shared pytest setup
+The servers are run as scripts from their own directories, so their modules are imported the same way here
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only postgres-mcp: both servers have modules with the same names (cache, encoding, metrics)
+sys.path.insert(0, os.path.join(ROOT, "mcp-servers", "postgres-mcp"))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
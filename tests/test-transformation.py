@@ -149,6 +149,59 @@ def verify_data_integrity(es_count, pg_count):
         return False
 
 
+def verify_category_aggregates():
+    """Compare per-category document counts and price totals computed inside each system."""
+    print("\n" + "=" * 60)
+    print("Aggregate Check (per category)")
+    print("=" * 60)
+    
+    try:
+        es = Elasticsearch([ES_URL])
+        result = es.search(
+            index="products",
+            size=0,
+            aggs={"categories": {
+                "terms": {"field": "category", "size": 1000},
+                "aggs": {"price_sum": {"sum": {"field": "price"}}}
+            }}
+        )
+        es_totals = {
+            bucket["key"]: (bucket["doc_count"], round(bucket["price_sum"]["value"], 2))
+            for bucket in result["aggregations"]["categories"]["buckets"]
+        }
+        
+        conn = psycopg2.connect(**PG_CONFIG)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT category, COUNT(*), COALESCE(SUM(price), 0)
+            FROM products
+            WHERE id != 'SAMPLE-000'
+            GROUP BY category
+        """)
+        pg_totals = {category: (count, round(float(total), 2)) for category, count, total in cursor.fetchall()}
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        print(f"✗ Aggregate check error: {e}")
+        return False
+    
+    mismatches = 0
+    for category in sorted(set(es_totals) | set(pg_totals), key=str):
+        es_value = es_totals.get(category, (0, 0.0))
+        pg_value = pg_totals.get(category, (0, 0.0))
+        # Prices are float in Elasticsearch and DECIMAL in PostgreSQL, so allow rounding noise
+        if es_value[0] != pg_value[0] or abs(es_value[1] - pg_value[1]) > 0.01 * max(1, es_value[0]):
+            mismatches += 1
+            print(f"⚠ {category}: ES {es_value[0]} docs / {es_value[1]} total price, "
+                  f"PG {pg_value[0]} rows / {pg_value[1]} total price")
+    
+    if mismatches:
+        print(f"⚠ {mismatches} categories differ")
+        return False
+    print(f"✓ Counts and price totals match for {len(es_totals)} categories")
+    return True
+
+
 def main():
     """Main test execution."""
     print("\n" + "=" * 60)
@@ -160,6 +213,8 @@ def main():
     
     if es_count > 0 or pg_count > 0:
         verify_data_integrity(es_count, pg_count)
+    if es_count > 0 and pg_count > 1:
+        verify_category_aggregates()
     
     print("\n" + "=" * 60)
     print("Test Summary")
@@ -0,0 +1,79 @@
+"""
+Tests for the Elasticsearch server's query-phase timing (TimedClient in mcp-servers/elasticsearch-mcp/server.py)
+Runs tools through the real AsyncElasticsearch client against fake_elasticsearch.py served over HTTP
+"""
+
+import asyncio
+import importlib.util
+import os
+import sys
+import threading
+
+import pytest
+
+from conftest import ROOT
+from fake_elasticsearch import FakeElasticsearch, FakeElasticsearchServer
+
+SERVER_DIR = os.path.join(ROOT, "mcp-servers", "elasticsearch-mcp")
+# Module names both servers use; postgres-mcp's copies stay the importable ones for the other tests
+SHARED_MODULES = ("cache", "encoding", "metrics")
+
+
+@pytest.fixture(scope="module")
+def stand_in():
+    server = FakeElasticsearchServer(("127.0.0.1", 0), FakeElasticsearch("bench_products", 200))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="module")
+def es_server(stand_in):
+    os.environ["ELASTICSEARCH_URL"] = stand_in
+    shadowed = {name: sys.modules.pop(name) for name in SHARED_MODULES if name in sys.modules}
+    sys.path.insert(0, SERVER_DIR)
+    try:
+        spec = importlib.util.spec_from_file_location("elasticsearch_server", os.path.join(SERVER_DIR, "server.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(SERVER_DIR)
+        for name in SHARED_MODULES:
+            sys.modules.pop(name, None)
+        sys.modules.update(shadowed)
+    yield module
+    os.environ.pop("ELASTICSEARCH_URL", None)
+
+
+def run_tools(es_server, calls):
+    async def main():
+        try:
+            for name, arguments in calls:
+                content = await es_server.call_tool(name, arguments)
+                assert not content[0].text.startswith("Error"), content[0].text
+        finally:
+            await es_server.es_client.close()
+            es_server.es_client._client._client = None
+    asyncio.run(main())
+    return es_server.tool_metrics.snapshot()
+
+
+def test_client_is_the_real_async_client(es_server):
+    from elasticsearch import AsyncElasticsearch
+
+    assert isinstance(es_server.es_client._client.client, AsyncElasticsearch)
+
+
+@pytest.mark.parametrize("name, arguments", [
+    ("search_documents", {"index": "bench_products", "size": 5}),
+    ("count_documents", {"index": "bench_products"}),
+    ("multi_get", {"index": "bench_products", "ids": ["BENCH-00000001", "BENCH-00000002"]}),
+    ("bulk_export", {"index": "bench_products", "batch_size": 50}),
+    ("bulk_export", {"index": "bench_products", "batch_size": 50, "slices": 2}),
+])
+def test_requests_are_booked_to_the_query_phase(es_server, name, arguments):
+    before = es_server.tool_metrics.snapshot().get(name, {}).get("phase_ms", {}).get("query", 0)
+    snapshot = run_tools(es_server, [(name, arguments)])
+    assert snapshot[name]["phase_ms"].get("query", 0) > before
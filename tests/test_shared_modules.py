@@ -0,0 +1,28 @@
+"""
+Tests that the modules both MCP servers carry have not drifted apart
+Each server builds its image from its own directory, so cache.py, encoding.py and metrics.py are copied into both
+"""
+
+import ast
+import os
+
+import pytest
+
+from conftest import ROOT
+
+SERVERS = ("elasticsearch-mcp", "postgres-mcp")
+
+
+def body(server, module):
+    """Source of a server's module after its docstring, which names the server."""
+    with open(os.path.join(ROOT, "mcp-servers", server, f"{module}.py")) as f:
+        source = f.read()
+    docstring = ast.parse(source).body[0]
+    assert isinstance(docstring, ast.Expr) and isinstance(docstring.value, ast.Constant)
+    return source.splitlines()[docstring.end_lineno:]
+
+
+@pytest.mark.parametrize("module", ["cache", "encoding", "metrics"])
+def test_copies_are_identical(module):
+    elasticsearch, postgres = (body(server, module) for server in SERVERS)
+    assert elasticsearch == postgres, f"mcp-servers/*/{module}.py differ; change both copies together"
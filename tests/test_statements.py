@@ -0,0 +1,141 @@
+"""
+Tests for the prepared statement cache (mcp-servers/postgres-mcp/statements.py)
+A small stand-in session follows PostgreSQL's rules for PREPARE/EXECUTE, savepoints and aborted transactions
+"""
+
+from collections import OrderedDict
+
+import pytest
+from psycopg2 import errors
+
+from statements import PreparedStatements, to_server_placeholders
+
+
+class Session:
+    """Server side of one connection: prepared statements, savepoints and whether the transaction failed."""
+
+    def __init__(self):
+        self.prepared = {}
+        self.savepoints = []
+        self.aborted = False
+        self.log = []
+        self.shape_changed = set()  # statements whose table has changed since PREPARE
+
+    def run(self, sql, params):
+        for statement in sql.split("; "):
+            self.log.append(statement)
+            verb = statement.split()[0]
+            if self.aborted and not statement.startswith("ROLLBACK"):
+                raise errors.InFailedSqlTransaction("current transaction is aborted")
+            try:
+                self._run(verb, statement, params)
+            except Exception:
+                self.aborted = True
+                raise
+
+    def _run(self, verb, statement, params):
+        if verb == "SAVEPOINT":
+            self.savepoints.append(statement.split()[1])
+        elif verb == "RELEASE":
+            name = statement.split()[-1]
+            del self.savepoints[self.savepoints.index(name):]
+        elif statement.startswith("ROLLBACK TO SAVEPOINT"):
+            name = statement.split()[-1]
+            del self.savepoints[self.savepoints.index(name) + 1:]
+            self.aborted = False
+        elif verb == "PREPARE":
+            self.prepared[statement.split()[1]] = statement
+        elif verb == "DEALLOCATE":
+            self.prepared.pop(statement.split()[1])
+        elif verb == "EXECUTE":
+            name = statement.split()[1]
+            if name not in self.prepared:
+                raise errors.InvalidSqlStatementName(f'prepared statement "{name}" does not exist')
+            if name in self.shape_changed:
+                raise errors.FeatureNotSupported("cached plan must not change result type")
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+        self.last = None  # what the cursor's results belong to
+
+    def execute(self, sql, params=None):
+        self.connection.session.run(sql, params)
+        self.rowcount = 1
+        self.last = sql.split("; ")[-1]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Connection:
+    def __init__(self):
+        self.session = Session()
+        self.prepared_statements = OrderedDict()
+        self.prepared_count = 0
+        self.stale_statements = []
+
+    def cursor(self):
+        return Cursor(self)
+
+
+INSERT = "INSERT INTO items (id, price) VALUES (%s, %s)"
+KEY = ("insert", "items", ("id", "price"))
+
+
+def insert(cache, cursor):
+    sql, _ = to_server_placeholders(INSERT)
+    cache.execute(cursor, KEY, sql, ["A1", 1], INSERT)
+
+
+def test_second_call_reuses_the_prepared_statement():
+    cache, conn = PreparedStatements(), Connection()
+    cursor = conn.cursor()
+    insert(cache, cursor)
+    insert(cache, cursor)
+    assert sum(statement.startswith("PREPARE") for statement in conn.session.log) == 1
+    assert cache.stats()["hits"] == 1
+    assert conn.session.savepoints == []
+
+
+def test_statement_lost_by_the_session_is_prepared_again_and_retried():
+    cache, conn = PreparedStatements(), Connection()
+    cursor = conn.cursor()
+    insert(cache, cursor)
+    conn.session.prepared.clear()  # DISCARD ALL
+
+    insert(cache, cursor)
+    session = conn.session
+    assert not session.aborted
+    assert session.savepoints == []
+    assert cursor.last == "EXECUTE mcp_stmt_2 (%s, %s)"
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_statement_whose_table_changed_shape_is_replaced_and_retried():
+    cache, conn = PreparedStatements(), Connection()
+    cursor = conn.cursor()
+    insert(cache, cursor)
+    conn.session.shape_changed.add("mcp_stmt_1")
+
+    insert(cache, cursor)
+    assert "DEALLOCATE mcp_stmt_1" in conn.session.log
+    assert list(conn.session.prepared) == ["mcp_stmt_2"]
+    assert not conn.session.aborted
+
+
+def test_a_second_failure_is_raised():
+    cache, conn = PreparedStatements(), Connection()
+    cursor = conn.cursor()
+    insert(cache, cursor)
+    conn.session.shape_changed.update({"mcp_stmt_1", "mcp_stmt_2"})
+
+    with pytest.raises(errors.FeatureNotSupported):
+        insert(cache, cursor)
+    assert cache.stats()["invalidations"] == 2
+    assert conn.prepared_statements == {}
@@ -0,0 +1,227 @@
+"""
+Tests for the schema-driven transform engine (mcp-servers/postgres-mcp/transform.py)
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from transform import CONVERTERS, LOAD_CONVERTERS, TransformPlan, parse_check
+
+
+def column(name, data_type, udt_name=None, length=None, precision=None, scale=None, nullable="YES"):
+    return {
+        "column_name": name,
+        "data_type": data_type,
+        "udt_name": udt_name or data_type,
+        "character_maximum_length": length,
+        "numeric_precision": precision,
+        "numeric_scale": scale,
+        "is_nullable": nullable
+    }
+
+
+SCHEMA = {
+    "table": "items",
+    "columns": [
+        column("id", "character varying", "varchar", length=8, nullable="NO"),
+        column("price", "numeric", "numeric", precision=6, scale=2, nullable="NO"),
+        column("ratings", "numeric", "numeric", precision=3, scale=2),
+        column("stock", "integer", "int4", precision=32, scale=0),
+        column("active", "boolean", "bool"),
+        column("attributes", "jsonb", "jsonb"),
+        column("created_at", "timestamp with time zone", "timestamptz"),
+        column("tags", "ARRAY", "_text"),
+    ],
+    "checks": [
+        {"conname": "items_price_check", "definition": "CHECK ((price >= (0)::numeric))"},
+        {"conname": "items_ratings_check",
+         "definition": "CHECK (((ratings >= (0)::numeric) AND (ratings <= (5)::numeric)))"},
+        {"conname": "items_name_check", "definition": "CHECK ((lower((id)::text) <> 'x'::text))"},
+    ]
+}
+
+
+def record(**values):
+    return {"id": "A1", "price": "9.99", **values}
+
+
+def convert(*records):
+    return TransformPlan(SCHEMA, columns=[info["column_name"] for info in SCHEMA["columns"]]).convert_records(
+        list(records))
+
+
+def reasons(rejects):
+    return [(reject["column"], reject["reason"]) for reject in rejects]
+
+
+# ---------------------------------------------------------------------------
+# Converters
+# ---------------------------------------------------------------------------
+
+def test_jsonb_text_is_passed_through_not_encoded_again():
+    assert LOAD_CONVERTERS["jsonb"]('{"color": "red"}') == '{"color": "red"}'
+    assert CONVERTERS["jsonb"]('{"color": "red"}') == '{"color": "red"}'
+
+
+def test_jsonb_objects_and_scalars_are_encoded():
+    assert LOAD_CONVERTERS["jsonb"]({"color": "red"}) == '{"color": "red"}'
+    assert LOAD_CONVERTERS["jsonb"]([1, 2]) == "[1, 2]"
+    assert LOAD_CONVERTERS["jsonb"](3) == "3"
+
+
+def test_jsonb_invalid_text_is_rejected():
+    rows, rejects = convert(record(attributes="{color: red"))
+    assert rows == []
+    assert reasons(rejects)[0][0] == "attributes"
+
+
+@pytest.mark.parametrize("text", ["t", "TRUE", " yes ", "y", "on", "1", "tru"])
+def test_boolean_true_spellings(text):
+    assert LOAD_CONVERTERS["boolean"](text) is True
+
+
+@pytest.mark.parametrize("text", ["f", "False", "no", "n", "off", "of", "0"])
+def test_boolean_false_spellings(text):
+    assert LOAD_CONVERTERS["boolean"](text) is False
+
+
+@pytest.mark.parametrize("value", ["garbage", "o", "", "2", 2, 1.5])
+def test_boolean_unknown_values_raise(value):
+    with pytest.raises((TypeError, ValueError)):
+        LOAD_CONVERTERS["boolean"](value)
+
+
+def test_boolean_garbage_row_is_rejected_not_loaded_as_false():
+    rows, rejects = convert(record(active="garbage"))
+    assert rows == []
+    assert reasons(rejects)[0][0] == "active"
+
+
+def test_integer_refuses_bool_and_fractions():
+    with pytest.raises(TypeError):
+        LOAD_CONVERTERS["integer"](True)
+    with pytest.raises(ValueError):
+        LOAD_CONVERTERS["integer"](1.5)
+    assert LOAD_CONVERTERS["integer"]("42") == 42
+    assert LOAD_CONVERTERS["integer"](3.0) == 3
+
+
+def test_timestamp_iso_and_epoch_millis_are_parsed():
+    assert LOAD_CONVERTERS["timestamptz"]("2024-01-15T10:30:00+00:00") == datetime(2024, 1, 15, 10, 30,
+                                                                                    tzinfo=timezone.utc)
+    assert LOAD_CONVERTERS["timestamptz"](0) == datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def test_timestamp_strings_postgres_accepts_are_passed_through():
+    rows, rejects = convert(record(created_at="2024-01-15 10:30:00 UTC"))
+    assert rejects == []
+    assert rows[0][6] == "2024-01-15 10:30:00 UTC"
+
+
+# ---------------------------------------------------------------------------
+# Column rules
+# ---------------------------------------------------------------------------
+
+def test_not_null_violation():
+    rows, rejects = convert({"id": "A1", "price": None})
+    assert rows == []
+    assert reasons(rejects) == [("price", "null value in NOT NULL column price")]
+
+
+def test_varchar_length():
+    rows, rejects = convert(record(id="TOO-LONG-ID"))
+    assert reasons(rejects) == [("id", "value too long for character varying(8)")]
+
+
+def test_numeric_scale_rounds_like_postgres():
+    rows, rejects = convert(record(price="1.005"))
+    assert rejects == []
+    assert rows[0][1] == Decimal("1.01")
+
+
+def test_numeric_precision_overflow():
+    rows, rejects = convert(record(price="10000"), record(id="A2", price="9999.99"))
+    assert [row[0] for row in rows] == ["A2"]
+    assert reasons(rejects) == [("price", "numeric field overflow for numeric(6, 2)")]
+
+
+def test_numeric_rounding_can_overflow():
+    # 9999.995 rounds to 10000.00, which numeric(6, 2) cannot hold
+    rows, rejects = convert(record(price="9999.995"))
+    assert reasons(rejects) == [("price", "numeric field overflow for numeric(6, 2)")]
+
+
+def test_integer_range():
+    rows, rejects = convert(record(stock=2 ** 31))
+    assert reasons(rejects) == [("stock", "out of range for type integer")]
+
+
+def test_check_constraints():
+    rows, rejects = convert(record(price="-1"), record(id="A2", ratings="5.5"), record(id="A3", ratings="5"))
+    assert [row[0] for row in rows] == ["A3"]
+    assert reasons(rejects) == [
+        ("price", "violates check constraint items_price_check (price >= 0)"),
+        ("ratings", "violates check constraint items_ratings_check (ratings <= 5)"),
+    ]
+
+
+def test_unparsed_checks_are_left_to_postgres():
+    plan = TransformPlan(SCHEMA, columns=["id", "price"])
+    assert plan.describe()["unchecked_constraints"] == ["items_name_check"]
+
+
+@pytest.mark.parametrize("definition, rules", [
+    ("CHECK ((price >= (0)::numeric))", [("price", ">=", Decimal(0))]),
+    ("CHECK ((0 < stock))", [("stock", ">", Decimal(0))]),
+    ("CHECK (((ratings >= (0)::numeric) AND (ratings <= (5)::numeric)))",
+     [("ratings", ">=", Decimal(0)), ("ratings", "<=", Decimal(5))]),
+    ("CHECK ((name IS NOT NULL))", [("name", None, None)]),
+    ("CHECK ((price > cost))", None),
+    ("CHECK (((price > (0)::numeric) OR (price IS NULL)))", None),
+])
+def test_parse_check(definition, rules):
+    assert parse_check(definition) == rules
+
+
+# ---------------------------------------------------------------------------
+# Reject reporting
+# ---------------------------------------------------------------------------
+
+def test_rejects_report_position_key_column_value_and_first_reason():
+    rows, rejects = convert(record(id="A1"), record(id="A2", stock="lots", price="-1"), record(id="A3"))
+    assert [row[0] for row in rows] == ["A1", "A3"]
+    assert rejects == [{
+        "row": 1,
+        "key": "A2",
+        "column": "price",
+        "value": "-1",
+        "reason": "violates check constraint items_price_check (price >= 0)"
+    }]
+
+
+def test_long_rejected_values_are_truncated():
+    rows, rejects = convert(record(id="x" * 500))
+    assert rejects[0]["value"] == "x" * 200 + "…"
+
+
+def test_convert_hits_reads_ids_and_nested_fields():
+    schema = {"table": "docs", "checks": [], "columns": [
+        column("id", "text", nullable="NO"),
+        column("brand", "text"),
+        column("stock", "integer", "int4"),
+    ]}
+    plan = TransformPlan(schema, mapping={"id": "_id", "brand": "maker.name", "stock": "stock"})
+    rows, rejects = plan.convert_hits([
+        {"_id": "d1", "_source": {"maker": {"name": "Acme"}, "stock": "7"}},
+        {"_id": "d2", "_source": {"stock": True}},
+    ])
+    assert rows == [("d1", "Acme", 7)]
+    assert [(reject["key"], reject["column"]) for reject in rejects] == [("d2", "stock")]
+
+
+def test_auto_mapping_from_source_fields():
+    plan = TransformPlan(SCHEMA, source_fields={"id": "keyword", "price": "float", "color": "keyword"})
+    assert plan.columns == ["id", "price"]
+    assert plan.describe()["ignored_fields"] == ["color"]